@@ -5,7 +5,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['psutil', 'pynvml'],
+    hiddenimports=['psutil', 'pynvml', 'numpy'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -9,6 +9,7 @@ a = Analysis(
     hiddenimports=[
         'psutil', 
         'pynvml', 
+        'numpy', 
         'config',
         'ui',
         'ui.components', 
@@ -18,6 +19,22 @@ a = Analysis(
         'utils.treemap_logic', 
         'utils.data_provider', 
         'utils.worker', 
+        'utils.snapshot', 
+        'utils.backends', 
+        'utils.backends.base', 
+        'utils.backends.windows', 
+        'utils.backends.linux', 
+        'utils.gpu_sampler', 
+        'utils.fanout', 
+        'utils.process_tree', 
+        'utils.process_table', 
+        'utils.memory_maps', 
+        'utils.unique_memory', 
+        'utils.history', 
+        'utils.recorder', 
+        'utils.replay', 
+        'utils.affinity', 
+        'utils.trimmer', 
         'utils.system_utils'
     ],
     hookspath=[],
@@ -1,5 +1,9 @@
 import os
+import copy
 import json
+import time
+import atexit
+import threading
 from PyQt6.QtGui import QColor
 
 # ---------------------------------------------------------
@@ -24,8 +28,27 @@ I18N = {
         'view_mode_label': "🔍 查看模式",
         'view_program': "按程序聚合",
         'view_process': "按进程独立",
+        'layout_mode_label': "🧱 布局模式",
+        'layout_stable': "稳定顺序",
+        'layout_squarify': "按大小排列",
+        'memory_metric_label': "📐 内存口径",
+        'metric_private': "私有 (RSS + 换出)",
+        'metric_pss': "PSS (共享页按比例分摊)",
+        'metric_uss': "USS (仅独占内存)",
+        'sample_budget_label': "采样预算 (每次刷新)",
+        'record_snapshots': "💾 录制快照到磁盘",
+        'replay_title': "回放",
+        'replay_speed_max': "最快",
         'auto_optimize_label': "🚀 自动释放空闲内存",
         'opt_interval_label': "⏱ 内存释放间隔 (秒)",
+        'trim_summary': "已执行 {passes} 轮 | 累计释放 {reclaimed:.1f} MB | 观察中 {pending} 个进程",
+        'trim_unsupported': "当前平台不支持释放进程工作集",
+        'trim_col_samples': "释放次数",
+        'trim_col_refault': "回填比例",
+        'trim_col_reclaimed': "累计释放",
+        'trim_col_status': "状态",
+        'trim_status_ok': "正常释放",
+        'trim_status_skip': "已跳过 (释放后立即回填)",
         'close_behavior_label': "🚪 关闭行为",
         'close_to_tray': "最小化到托盘",
         'close_quit': "直接退出程序",
@@ -42,6 +65,7 @@ I18N = {
         'gpu_mem': "显存",
         'gpu_used': "显存 (已用)",
         'gpu_free': "显存 (空闲)",
+        'gpu_stale': "未更新",
         'gpu_others': "显存常驻/其他",
         'status_format': "物理: {used:.1f}G/{total:.1f}G ({percent}%) | 显存: {gpu_percent}% | 缓存(磁盘): {sw_used:.1f}G/{sw_total:.1f}G ({sw_percent}%) | 提交: {v_used:.1f}G/{v_total:.1f}G ({v_percent}%) | 进程: {pids}",
         'menu_open_path': "📂 打开文件所在位置",
@@ -63,6 +87,16 @@ I18N = {
         'ancestry_chain': "父级调用链：\n",
         'children': "\n直接子进程：\n",
         'sys_cache_kernel': "系统内核/共享/缓存",
+        'breadcrumb_root': "全部",
+        'menu_details': "详细信息",
+        'map_heap': "堆",
+        'map_stack': "线程栈",
+        'map_anon': "匿名内存",
+        'map_file': "映射文件",
+        'map_lib': "共享库",
+        'map_others': "其他映射",
+        'map_loading': "正在分析内存映射…",
+        'loading': "正在加载…",
         'section_base': "🌐 基础设置",
         'section_display': "📊 监控显示",
         'section_optimize': "🚀 内存优化",
@@ -104,8 +138,27 @@ I18N = {
         'view_mode_label': "🔍 View Mode",
         'view_program': "Aggregate by Program",
         'view_process': "Individual Processes",
+        'layout_mode_label': "🧱 Layout Mode",
+        'layout_stable': "Stable Order",
+        'layout_squarify': "Sort by Size",
+        'memory_metric_label': "📐 Memory Metric",
+        'metric_private': "Private (RSS + Swapped)",
+        'metric_pss': "PSS (Proportional Shared)",
+        'metric_uss': "USS (Unique Only)",
+        'sample_budget_label': "Sampling Budget per Refresh",
+        'record_snapshots': "💾 Record Snapshots to Disk",
+        'replay_title': "Replay",
+        'replay_speed_max': "Max",
         'auto_optimize_label': "🚀 Auto Free Idle Memory",
         'opt_interval_label': "⏱ Optimize Interval (s)",
+        'trim_summary': "Passes: {passes} | Reclaimed: {reclaimed:.1f} MB | Observing: {pending} process(es)",
+        'trim_unsupported': "Working-set trimming is not supported on this platform",
+        'trim_col_samples': "Trims",
+        'trim_col_refault': "Re-fault",
+        'trim_col_reclaimed': "Reclaimed",
+        'trim_col_status': "Status",
+        'trim_status_ok': "Trimming",
+        'trim_status_skip': "Skipped (refills)",
         'close_behavior_label': "🚪 Close Behavior",
         'close_to_tray': "Minimize to Tray",
         'close_quit': "Quit Directly",
@@ -122,6 +175,7 @@ I18N = {
         'gpu_mem': "GPU Memory",
         'gpu_used': "GPU Used",
         'gpu_free': "GPU Free",
+        'gpu_stale': "not updated",
         'gpu_others': "GPU Others",
         'status_format': "RAM: {used:.1f}G/{total:.1f}G ({percent}%) | GPU: {gpu_percent}% | Cache(Disk): {sw_used:.1f}G/{sw_total:.1f}G ({sw_percent}%) | Commit: {v_used:.1f}G/{v_total:.1f}G ({v_percent}%) | Procs: {pids}",
         'menu_open_path': "📂 Open File Location",
@@ -143,6 +197,16 @@ I18N = {
         'ancestry_chain': "Ancestry Chain:\n",
         'children': "\nChildren:\n",
         'sys_cache_kernel': "System Cache/Kernel",
+        'breadcrumb_root': "All",
+        'menu_details': "Details",
+        'map_heap': "Heap",
+        'map_stack': "Stacks",
+        'map_anon': "Anonymous",
+        'map_file': "Mapped Files",
+        'map_lib': "Shared Libraries",
+        'map_others': "Other Mappings",
+        'map_loading': "Analyzing memory mappings…",
+        'loading': "Loading…",
         'section_base': "🌐 Basic Settings",
         'section_display': "📊 Monitoring & Display",
         'section_optimize': "🚀 Memory Optimization",
@@ -191,10 +255,19 @@ APP_CONFIG = {
     'show_gpu_used': True,
     'auto_startup': False,
     'view_mode': 'program',
+    'layout_mode': 'squarify',
+    'memory_metric': 'private',
+    'sample_budget_ms': 20,
+    'record_snapshots': False,
+    'record_dir': '',
+    'record_max_mb': 64,
+    'record_max_files': 8,
     'auto_optimize': False,
     'opt_interval': 300,
     'close_to_tray': True,
     'ignored_games': [],
+    # 自动释放内存时跳过的程序 (路径或文件名)
+    'trim_exclude': [],
     'colors': DEFAULT_COLORS.copy()
 }
 
@@ -227,56 +300,196 @@ def get_docs_dir():
 
 DOCS_APP_DIR = os.path.join(get_docs_dir(), "MemorySpaceExplorer")
 DOCS_CONFIG_FILE = os.path.join(DOCS_APP_DIR, "config.json")
+# 快照录制文件的默认目录
+RECORDINGS_DIR = os.path.join(DOCS_APP_DIR, "recordings")
 
-def load_settings():
-    settings = APP_CONFIG.copy()
-    
-    # 【强制】只从文档目录读取配置
-    if os.path.exists(DOCS_CONFIG_FILE):
+class SettingsStore:
+    """
+    进程内唯一的设置存储。
+    - 启动时读一次 config.json，之后所有读取都直接访问内存中的 data；
+    - save() 只合并改动并通知订阅者，真正的写盘在后台线程中按防抖间隔合并进行，
+      先写临时文件再 os.replace，断电或崩溃时不会留下写了一半的配置；
+    - reload_if_changed() 只 stat 一次文件，修改时间 / 大小变化 (外部编辑) 时才重新读取。
+    """
+
+    def __init__(self, path, defaults, debounce=0.5):
+        self.path = path
+        self.defaults = defaults
+        self.debounce = debounce
+        self._subscribers = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None          # 等待写盘的完整设置
+        self._deadline = 0.0
+        self._thread = None
+        self._file_state = self._stat()
+        self.data = self._read()
+        self._saved = copy.deepcopy(self.data)
+        if self._file_state is None:
+            # 没有任何配置文件时，在文档目录创建一个默认的
+            self._schedule(self._saved)
+
+    # ---------------- 读取 ----------------
+    def _stat(self):
         try:
-            with open(DOCS_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                loaded = json.load(f)
-                if isinstance(loaded, dict):
-                    # 深度合并，确保 colors 等嵌套字典被正确合并
-                    for k, v in loaded.items():
-                        if k == 'colors' and isinstance(v, dict):
-                            if 'colors' not in settings: settings['colors'] = {}
-                            settings['colors'].update(v)
-                        else:
-                            settings[k] = v
-        except:
-            pass
-    else:
-        # 如果没有任何配置文件，则立即在文档目录创建一个默认的
-        # 显式设置 merge_with_existing=False 以防止递归
-        save_settings(settings, merge_with_existing=False)
-            
-    # 最终确保 lang 合法
-    if settings.get('lang') not in I18N:
-        settings['lang'] = 'zh'
-        
-    return settings
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read(self):
+        settings = copy.deepcopy(self.defaults)
+        # 【强制】只从文档目录读取配置
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                    if isinstance(loaded, dict):
+                        # 深度合并，确保 colors 等嵌套字典被正确合并
+                        for k, v in loaded.items():
+                            if k == 'colors' and isinstance(v, dict):
+                                settings.setdefault('colors', {}).update(v)
+                            else:
+                                settings[k] = v
+            except:
+                pass
+        # 最终确保 lang 合法
+        if settings.get('lang') not in I18N:
+            settings['lang'] = 'zh'
+        return settings
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    # ---------------- 订阅 ----------------
+    def subscribe(self, callback):
+        """callback(changed_keys, external)：external 为 True 表示来自外部修改的重新加载"""
+        self._subscribers.append(callback)
+
+    def _notify(self, changed, external):
+        for callback in list(self._subscribers):
+            try:
+                callback(changed, external)
+            except Exception as e:
+                print(f"Settings subscriber error: {e}")
+
+    def _changed_keys(self, old, new):
+        return {k for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
 
-def save_settings(settings, merge_with_existing=True):
+    # ---------------- 写入 ----------------
+    def save(self, changes=None):
+        """
+        合并改动并安排写盘。
+        :param changes: 要修改的部分设置；为 None (或就是 data 本身) 时表示 data 已被原地修改
+        :return: 发生变化的键
+        """
+        if changes is not None and changes is not self.data:
+            self.data.update(changes)
+        changed = self._changed_keys(self._saved, self.data)
+        if not changed:
+            return changed
+        # 写盘线程只读取这份快照，界面线程之后对 data 的修改不会与之竞争
+        self._saved = copy.deepcopy(self.data)
+        self._schedule(self._saved)
+        self._notify(changed, False)
+        return changed
+
+    def _schedule(self, payload):
+        with self._cond:
+            self._pending = payload
+            self._deadline = time.monotonic() + self.debounce
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='SettingsWriter', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                # 防抖：间隔内的连续修改合并为一次写入
+                delay = self._deadline - time.monotonic()
+                while self._pending is not None and delay > 0:
+                    self._cond.wait(delay)
+                    delay = self._deadline - time.monotonic()
+            # 先持有写锁再取出待写内容：flush() 拿到写锁时，要么写入已完成，要么内容还在 _pending 中
+            with self._write_lock:
+                with self._cond:
+                    payload, self._pending = self._pending, None
+                if payload is not None:
+                    self._write(payload)
+
+    def _write(self, payload):
+        """调用方须持有 _write_lock"""
+        tmp = self.path + '.tmp'
+        try:
+            # 【强制】只保存到文档目录
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._file_state = self._stat()
+        except Exception as e:
+            print(f"Critical Error: Failed to save config to Documents: {e}")
+
+    def flush(self):
+        """立即写出尚未落盘的修改 (退出前调用)；写盘线程正在写入时等它完成"""
+        with self._write_lock:
+            with self._cond:
+                payload, self._pending = self._pending, None
+            if payload is not None:
+                self._write(payload)
+
+    # ---------------- 外部修改 ----------------
+    def reload_if_changed(self):
+        """
+        配置文件被外部修改时重新读取并通知订阅者。
+        本进程还有未写出的修改时以本进程为准，不重新读取。
+        :return: 是否重新加载
+        """
+        state = self._stat()
+        if state == self._file_state or state is None:
+            return False
+        with self._cond:
+            if self._pending is not None:
+                return False
+        with self._write_lock:
+            self._file_state = state
+            fresh = self._read()
+        changed = self._changed_keys(self.data, fresh)
+        if not changed:
+            return False
+        # 原地替换，持有 data 引用的界面代码看到的始终是最新设置
+        self.data.clear()
+        self.data.update(fresh)
+        self._saved = copy.deepcopy(fresh)
+        self._notify(changed, True)
+        return True
+
+
+_settings_store = None
+
+def get_settings_store():
+    """进程级共享的设置存储"""
+    global _settings_store
+    if _settings_store is None:
+        _settings_store = SettingsStore(DOCS_CONFIG_FILE, APP_CONFIG)
+        atexit.register(_settings_store.flush)
+    return _settings_store
+
+def load_settings():
+    """返回共享的设置字典 (启动后不再读盘)"""
+    return get_settings_store().data
+
+def save_settings(settings=None):
     """
     保存设置
-    :param settings: 要保存的设置字典
-    :param merge_with_existing: 是否与现有文件中的设置合并。如果是初次创建文件，应设为 False 以避免递归。
+    :param settings: 要修改的部分设置，或已被原地修改的完整设置字典
     """
-    if merge_with_existing:
-        full_settings = load_settings()
-        full_settings.update(settings)
-    else:
-        full_settings = settings
-    
-    try:
-        # 【强制】只保存到文档目录
-        if not os.path.exists(DOCS_APP_DIR):
-            os.makedirs(DOCS_APP_DIR)
-        with open(DOCS_CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(full_settings, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print(f"Critical Error: Failed to save config to Documents: {e}")
+    get_settings_store().save(settings)
 
 def get_text(key, lang='zh'):
     return I18N.get(lang, I18N['zh']).get(key, key)
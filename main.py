@@ -28,17 +28,19 @@ sys.excepthook = exception_hook
 # 2. 延迟导入业务模块
 try:
     import random
+    import time
     import subprocess
-    import json
     from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                                  QHBoxLayout, QLabel, QPushButton, QMenu, QSystemTrayIcon)
     from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread, QPointF
     from PyQt6.QtGui import QPainter, QColor, QBrush, QAction, QFont
 
-    from config import I18N, load_settings, save_settings
+    from config import I18N, save_settings, get_settings_store
     from utils.treemap_logic import TreeMapItem
     from utils.data_provider import GPUMonitor
+    from utils.memory_maps import memory_map_children
     from utils.worker import DataWorker
+    from utils.affinity import get_affinity_enforcer
     from utils.system_utils import check_startup_status, update_startup_registry, set_process_priority
     from ui.treemap_widget import TreeMapWidget
     from ui.dialogs import SettingsDialog, DetailWindow, ProcessChainWindow, AffinityDialog
@@ -51,11 +53,14 @@ except Exception as e:
 class MainWindow(QMainWindow):
     request_data = pyqtSignal(dict)
 
-    def __init__(self):
+    def __init__(self, replay_path=None):
         super().__init__()
-        # 1. 加载配置
-        from config import load_settings
-        self.settings = load_settings()
+        # 回放模式：数据来自录制文件而不是实时采集
+        self.replay = None
+        # 1. 加载配置 (共享的设置字典，外部修改配置文件时原地更新)
+        self.settings_store = get_settings_store()
+        self.settings = self.settings_store.data
+        self.settings_store.subscribe(self.on_settings_store_changed)
         # 2. 状态锁初始化 (从配置读取)
         self._last_is_game = self.settings.get('game_mode_manual', False)
         
@@ -73,7 +78,9 @@ class MainWindow(QMainWindow):
         self.worker_thread = QThread()
         self.worker = DataWorker()
         self.worker.moveToThread(self.worker_thread)
-        self.request_data.connect(self.worker.fetch_data)
+        # worker 线程运行 asyncio 事件循环，不处理 Qt 事件；请求直接调用 (只是把设置交给事件循环)
+        self.worker_thread.started.connect(self.worker.run)
+        self.request_data.connect(self.worker.fetch_data, Qt.ConnectionType.DirectConnection)
         self.worker.data_ready.connect(self.on_data_received)
         self.worker_thread.start()
 
@@ -134,11 +141,24 @@ class MainWindow(QMainWindow):
         top_bar.addWidget(self.settings_btn)
         layout.addLayout(top_bar)
 
+        # 下钻面包屑 (顶层时隐藏)
+        from ui.components import BreadcrumbBar
+        self.breadcrumb = BreadcrumbBar()
+        self.breadcrumb.setVisible(False)
+        layout.addWidget(self.breadcrumb)
+
         self.treemap = TreeMapWidget()
+        # 进入进程块时才解析它的内存映射；重新进入时超过 10 秒的结果会刷新
+        self.treemap.child_provider = lambda item: memory_map_children(item, self.settings.get('lang', 'zh'), max_age=10)
         self.treemap.itemDoubleClicked.connect(self.show_details)
         self.treemap.itemRightClicked.connect(self.on_context_menu)
+        self.treemap.pathChanged.connect(self.on_drill_path_changed)
+        self.breadcrumb.levelClicked.connect(self.treemap.drill_to)
         layout.addWidget(self.treemap, 1)
 
+        if replay_path:
+            self._init_replay(replay_path, layout)
+
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_data)
         self.timer.start(self.settings.get('refresh_rate', 2000))
@@ -146,12 +166,9 @@ class MainWindow(QMainWindow):
         self.init_tray()
         self.apply_i18n()
         self.treemap.set_colors(self.settings.get('colors', {}))
+        self.treemap.set_layout_mode(self.settings.get('layout_mode', 'squarify'))
         
-        if self.settings.get('auto_apply_cpu_affinity', False):
-            QTimer.singleShot(2000, self.apply_saved_cpu_affinity)
-            self.cpu_affinity_timer = QTimer()
-            self.cpu_affinity_timer.timeout.connect(self.apply_saved_cpu_affinity)
-            self.cpu_affinity_timer.start(30000)
+        self.apply_saved_cpu_affinity()
         
         self.update_data()
 
@@ -205,26 +222,12 @@ class MainWindow(QMainWindow):
             painter.drawText(self._game_icon_pixmap.rect(), Qt.AlignmentFlag.AlignCenter, "🎮")
 
     def apply_saved_cpu_affinity(self):
-        try:
-            from config import DOCS_CONFIG_FILE
-            if not os.path.exists(DOCS_CONFIG_FILE): return
-            with open(DOCS_CONFIG_FILE, 'r', encoding='utf-8') as f: config = json.load(f)
-            cpu_configs = config.get('cpu_affinity', {})
-            if not cpu_configs: return
-            applied_count = 0
-            for proc_path, cfg in cpu_configs.items():
-                if not os.path.exists(proc_path): continue
-                cpus = cfg.get('cpus', [])
-                if not cpus: continue
-                for proc in psutil.process_iter(['pid', 'exe']):
-                    try:
-                        if proc.info['exe'] and os.path.normpath(proc.info['exe']) == os.path.normpath(proc_path):
-                            p = psutil.Process(proc.info['pid'])
-                            if set(p.cpu_affinity()) != set(cpus):
-                                p.cpu_affinity(cpus); applied_count += 1
-                    except: continue
-            if applied_count > 0: print(f"Applied CPU affinity to {applied_count} process(es)")
-        except: pass
+        """把保存的规则交给事件驱动的执行器 (只在启用或规则变化时调用，新进程由执行器自行处理)"""
+        enforcer = get_affinity_enforcer()
+        if self.settings.get('auto_apply_cpu_affinity', False) and self.replay is None:
+            enforcer.set_rules(self.settings.get('cpu_affinity', {}))
+        else:
+            enforcer.stop()
 
     def update_tray_icon(self, ram_percent, gpu_percent, v_percent=0):
         try:
@@ -270,19 +273,27 @@ class MainWindow(QMainWindow):
     def show_normal(self):
         self.show(); self.activateWindow()
 
+    def stop_worker(self):
+        self.worker.stop(); self.worker_thread.quit(); self.worker_thread.wait()
+
     def really_quit(self):
+        self.stop_worker(); self.settings_store.flush()
         self.tray_icon.hide(); QApplication.quit()
 
     def apply_i18n(self):
         lang = self.settings.get('lang', 'zh')
         if lang not in I18N: lang = 'zh'
         t = I18N[lang]
-        self.setWindowTitle(t.get('title', 'Memory Space Explorer'))
+        title = t.get('title', 'Memory Space Explorer')
+        if getattr(self, 'replay', None) is not None:
+            title += f" [{t.get('replay_title', 'Replay')}: {os.path.basename(self.replay.reader.path)}]"
+        self.setWindowTitle(title)
         if hasattr(self, 'settings_btn'): self.settings_btn.setText(t.get('settings_btn', 'Settings'))
         if hasattr(self, 'action_show'): self.action_show.setText(t.get('tray_show', 'Show'))
         if hasattr(self, 'action_exit'): self.action_exit.setText(t.get('tray_exit', 'Exit'))
         if hasattr(self, 'game_mode_lbl'): self.game_mode_lbl.setText(t.get('game_mode_manual', 'Game Mode'))
         if hasattr(self, 'ignore_game_btn'): self.ignore_game_btn.setText(t.get('game_mode_ignore', 'Ignore'))
+        if hasattr(self, 'breadcrumb'): self.on_drill_path_changed(self.treemap.path_names())
 
     def _show_ignore_button(self, show):
         if hasattr(self, 'ignore_game_btn'):
@@ -307,39 +318,85 @@ class MainWindow(QMainWindow):
         dialog.exec()
 
     def on_settings_changed(self):
-        self.apply_i18n(); save_settings(self.settings)
+        save_settings(self.settings)
+        self.apply_settings()
+
+    def on_settings_store_changed(self, changed, external):
+        """设置存储的变更通知：相关性规则变化时更新执行器，配置文件被外部修改时重新应用全部设置"""
+        if changed & {'cpu_affinity', 'auto_apply_cpu_affinity'}:
+            self.apply_saved_cpu_affinity()
+        if external:
+            self._last_is_game = self.settings.get('game_mode_manual', False)
+            self.apply_settings()
+
+    def apply_settings(self):
+        self.apply_i18n()
         if hasattr(self, 'game_mode_switch'):
             self.game_mode_switch.blockSignals(True)
             self.game_mode_switch.setChecked(self.settings.get('game_mode_manual', False))
             self.game_mode_switch.blockSignals(False)
-        if hasattr(self, 'treemap'): self.treemap.set_colors(self.settings.get('colors', {}))
+        if hasattr(self, 'treemap'):
+            self.treemap.set_colors(self.settings.get('colors', {}))
+            self.treemap.set_layout_mode(self.settings.get('layout_mode', 'squarify'))
         update_startup_registry(self.settings.get('auto_startup', False))
         self.timer.stop(); self.timer.start(self.settings.get('refresh_rate', 2000))
-        if self.settings.get('auto_apply_cpu_affinity', False):
-            if not hasattr(self, 'cpu_affinity_timer'):
-                self.cpu_affinity_timer = QTimer()
-                self.cpu_affinity_timer.timeout.connect(self.apply_saved_cpu_affinity)
-            if not self.cpu_affinity_timer.isActive(): self.cpu_affinity_timer.start(30000)
-            QTimer.singleShot(1000, self.apply_saved_cpu_affinity)
-        elif hasattr(self, 'cpu_affinity_timer') and self.cpu_affinity_timer.isActive():
-            self.cpu_affinity_timer.stop()
         self.update_data()
 
+    def _init_replay(self, path, layout):
+        """用 ReplayWorker 代替实时采集驱动界面，信号与 DataWorker.data_ready 相同"""
+        from utils.replay import ReplayWorker, SPEEDS
+        from ui.components import ReplayBar
+        self.replay = ReplayWorker(path, self)
+        t = I18N.get(self.settings.get('lang', 'zh'), I18N['zh'])
+        self.replay_bar = ReplayBar(SPEEDS, t.get('replay_speed_max', 'Max'))
+        layout.addWidget(self.replay_bar)
+        # 录制中的进程已经不存在，不再读取实时的内存映射
+        self.treemap.child_provider = None
+        self._replay_clock = []
+        self.replay.data_ready.connect(self.on_data_received)
+        self.replay.position_changed.connect(self.on_replay_position)
+        self.replay.state_changed.connect(self.replay_bar.set_playing)
+        self.replay_bar.playToggled.connect(self.replay.toggle)
+        self.replay_bar.speedChanged.connect(self.replay.set_speed)
+        self.replay_bar.seekRequested.connect(self.replay.seek)
+        QTimer.singleShot(0, self.replay.play)
+
+    def on_replay_position(self, index, count):
+        # 最近 30 帧的实际出帧速率，最快速度回放时即为树图与渲染管线的吞吐
+        now = time.perf_counter()
+        clock = self._replay_clock
+        clock.append(now)
+        del clock[:-30]
+        fps = (len(clock) - 1) / (now - clock[0]) if len(clock) > 1 and now > clock[0] else 0.0
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.replay.reader.timestamp(index)))
+        self.replay_bar.set_position(index, count, f"{stamp}  {fps:.1f} fps")
+
     def show_details(self, item):
-        dialog = DetailWindow(self, item, self.settings.get('lang', 'zh'))
+        # 回放中的 PID 可能已被其他进程复用，详细信息只使用录制的数据
+        dialog = DetailWindow(self, item, self.settings.get('lang', 'zh'), live=self.replay is None)
         dialog.show()
 
+    def on_drill_path_changed(self, names):
+        lang = self.settings.get('lang', 'zh'); t = I18N.get(lang, I18N['zh'])
+        self.breadcrumb.set_path(names, t.get('breadcrumb_root', 'All'))
+
     def on_context_menu(self, item, pos):
         pids = []
         if item.data.get('is_group') and item.children: pids = [c.data.get('pid') for c in item.children if c.data.get('pid')]
         else:
             pid = item.data.get('pid')
             if pid: pids = [pid]
-        if not pids: return
-        main_pid = pids[0]
         lang = self.settings.get('lang', 'zh'); t = I18N.get(lang, I18N['zh'])
         menu = QMenu(self)
         menu.setStyleSheet("QMenu { background-color: #252526; color: white; border: 1px solid #444; } QMenu::item { padding: 8px 25px; } QMenu::item:selected { background-color: #094771; }")
+        # 双击用于下钻，详细信息窗口从右键菜单打开
+        action_details = menu.addAction(t.get('menu_details', 'Details'))
+        # 回放时录制的 PID 对应的已不是同一个进程，不提供结束、路径等实时操作
+        if not pids or self.replay is not None:
+            if menu.exec(pos.toPoint()) == action_details: self.show_details(item)
+            return
+        main_pid = pids[0]
+        menu.addSeparator()
         action_path = menu.addAction(t.get('menu_open_path', 'Path'))
         action_chain = menu.addAction(t.get('menu_chain', 'Chain'))
         action_props = menu.addAction(t.get('menu_properties', 'Props'))
@@ -347,7 +404,8 @@ class MainWindow(QMainWindow):
         menu.addSeparator()
         action_kill = menu.addAction(t.get('menu_kill', 'Kill'))
         selected = menu.exec(pos.toPoint())
-        if selected == action_path: self.open_process_path(main_pid)
+        if selected == action_details: self.show_details(item)
+        elif selected == action_path: self.open_process_path(main_pid)
         elif selected == action_props: self.open_process_properties(main_pid)
         elif selected == action_kill: self.kill_process(pids, item.name)
         elif selected == action_chain: self.show_process_chain(main_pid)
@@ -396,6 +454,10 @@ class MainWindow(QMainWindow):
         dialog.exec()
 
     def update_data(self):
+        # 只 stat 一次配置文件，外部修改时才重新读取
+        self.settings_store.reload_if_changed()
+        if self.replay is not None:
+            return
         # 1. 优先使用手动设置，否则执行自动检测
         is_game = self.settings.get('game_mode_manual', False)
         trigger_name = ""
@@ -531,35 +593,45 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         if self.settings.get('close_to_tray', True) and self.tray_icon.isVisible():
             self.hide(); event.ignore(); return
-        self.worker_thread.quit(); self.worker_thread.wait(); self.tray_icon.hide()
+        self.stop_worker(); self.tray_icon.hide()
+        self.settings_store.flush()
         super().closeEvent(event)
 
 if __name__ == "__main__":
-    sys.setrecursionlimit(2000)
     app = QApplication(sys.argv)
+
+    # --replay <录制文件>：回放录制的快照，不做实时采集，可与正在运行的实例并存
+    replay_path = None
+    if "--replay" in sys.argv:
+        idx = sys.argv.index("--replay")
+        replay_path = sys.argv[idx + 1] if idx + 1 < len(sys.argv) else None
+        if not replay_path or not os.path.exists(replay_path):
+            print("Usage: main.py --replay <recording.msr>")
+            sys.exit(2)
     
     # --- 单实例检查 ---
     from PyQt6.QtNetwork import QLocalServer, QLocalSocket
     server_name = "MemorySpaceExplorer_SingleInstance_Server"
     
-    # 尝试连接现有实例
-    socket = QLocalSocket()
-    socket.connectToServer(server_name)
-    if socket.waitForConnected(500):
-        # 如果连接成功，说明已有实例在运行
-        print("Another instance is already running. Exiting.")
-        sys.exit(0)
-    
-    # 如果没连接上，创建一个服务器监听，标记自己是第一个实例
-    local_server = QLocalServer()
-    if not local_server.listen(server_name):
-        # 即使没连上但也监听失败（可能是上次非正常退出的残余），清理后再试
-        QLocalServer.removeServer(server_name)
-        local_server.listen(server_name)
+    if not replay_path:
+        # 尝试连接现有实例
+        socket = QLocalSocket()
+        socket.connectToServer(server_name)
+        if socket.waitForConnected(500):
+            # 如果连接成功，说明已有实例在运行
+            print("Another instance is already running. Exiting.")
+            sys.exit(0)
+        
+        # 如果没连接上，创建一个服务器监听，标记自己是第一个实例
+        local_server = QLocalServer()
+        if not local_server.listen(server_name):
+            # 即使没连上但也监听失败（可能是上次非正常退出的残余），清理后再试
+            QLocalServer.removeServer(server_name)
+            local_server.listen(server_name)
     
     app.setQuitOnLastWindowClosed(False)
     try:
-        window = MainWindow()
+        window = MainWindow(replay_path)
         if "--minimized" not in sys.argv: window.show()
         sys.exit(app.exec())
     except Exception as e:
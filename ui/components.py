@@ -1,5 +1,5 @@
-from PyQt6.QtWidgets import QCheckBox, QDoubleSpinBox
-from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, pyqtProperty, QPointF
+from PyQt6.QtWidgets import QCheckBox, QDoubleSpinBox, QWidget, QHBoxLayout, QPushButton, QLabel, QSlider
+from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, pyqtProperty, QPointF, pyqtSignal
 from PyQt6.QtGui import QPainter, QColor, QPen, QLinearGradient, QBrush
 
 class SafeDoubleSpinBox(QDoubleSpinBox):
@@ -80,3 +80,97 @@ class SwitchButton(QCheckBox):
         painter.setPen(QPen(QColor(0, 0, 0, 60), 0.5))
         painter.drawEllipse(QPointF(curr_x, h / 2), radius, radius)
 
+class BreadcrumbBar(QWidget):
+    """树图下钻的面包屑导航：点击任意一级返回该层"""
+    levelClicked = pyqtSignal(int) # 0 为顶层
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._layout = QHBoxLayout(self)
+        self._layout.setContentsMargins(5, 0, 5, 2)
+        self._layout.setSpacing(2)
+        self.setFixedHeight(24)
+
+    def set_path(self, names, root_label):
+        """:param names: 从顶层往下每一级的名称 (不含顶层)"""
+        while self._layout.count():
+            w = self._layout.takeAt(0).widget()
+            if w: w.deleteLater()
+        labels = [root_label] + list(names)
+        for level, text in enumerate(labels):
+            if level > 0:
+                sep = QLabel("›")
+                sep.setStyleSheet("color: #777; font-size: 12px;")
+                self._layout.addWidget(sep)
+            btn = QPushButton(text)
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            btn.setFlat(True)
+            is_current = level == len(labels) - 1
+            btn.setStyleSheet(f"""
+                QPushButton {{ color: {'#FFF' if is_current else '#6CB4FF'}; border: none; font-size: 12px; padding: 1px 4px; }}
+                QPushButton:hover {{ color: white; background-color: #3E3E42; border-radius: 3px; }}
+            """)
+            btn.clicked.connect(lambda _, lv=level: self.levelClicked.emit(lv))
+            self._layout.addWidget(btn)
+        self._layout.addStretch()
+        self.setVisible(len(labels) > 1)
+
+
+class ReplayBar(QWidget):
+    """回放控制条：播放 / 暂停、速度切换与进度拖动"""
+    playToggled = pyqtSignal()
+    speedChanged = pyqtSignal(int)     # 倍数，0 为最快
+    seekRequested = pyqtSignal(int)
+
+    def __init__(self, speeds=(1, 10, 0), max_label="Max", parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(5, 2, 5, 2)
+        layout.setSpacing(6)
+        btn_style = """
+            QPushButton { background-color: #3E3E42; color: #CCC; border: none; font-size: 12px; border-radius: 3px; padding: 2px 8px; }
+            QPushButton:hover { background-color: #505050; color: white; }
+            QPushButton:checked { background-color: #094771; color: white; }
+        """
+        self.btn_play = QPushButton("▶")
+        self.btn_play.setFixedWidth(32)
+        self.btn_play.setStyleSheet(btn_style)
+        self.btn_play.clicked.connect(self.playToggled.emit)
+        layout.addWidget(self.btn_play)
+
+        self.speed_buttons = []
+        for speed in speeds:
+            btn = QPushButton(f"{speed}×" if speed else max_label)
+            btn.setCheckable(True)
+            btn.setStyleSheet(btn_style)
+            btn.clicked.connect(lambda _, s=speed: self.set_speed(s, emit=True))
+            self.speed_buttons.append((speed, btn))
+            layout.addWidget(btn)
+
+        self.slider = QSlider(Qt.Orientation.Horizontal)
+        self.slider.setRange(0, 0)
+        # valueChanged 覆盖拖动、点击滑轨与键盘；set_position 的程序更新屏蔽了信号，不会回传
+        self.slider.valueChanged.connect(self.seekRequested.emit)
+        layout.addWidget(self.slider, 1)
+
+        self.lbl_pos = QLabel("")
+        self.lbl_pos.setStyleSheet("color: #BBB; font-family: Consolas; font-size: 12px;")
+        layout.addWidget(self.lbl_pos)
+        self.set_speed(speeds[0])
+
+    def set_speed(self, speed, emit=False):
+        for s, btn in self.speed_buttons:
+            btn.setChecked(s == speed)
+        if emit:
+            self.speedChanged.emit(speed)
+
+    def set_playing(self, playing):
+        self.btn_play.setText("⏸" if playing else "▶")
+
+    def set_position(self, index, count, text=""):
+        self.slider.blockSignals(True)
+        self.slider.setMaximum(max(0, count - 1))
+        if not self.slider.isSliderDown():
+            self.slider.setValue(index)
+        self.slider.blockSignals(False)
+        self.lbl_pos.setText(f"{text}  {index + 1}/{count}")
@@ -1,5 +1,4 @@
 import os
-import json
 import psutil
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                              QCheckBox, QGridLayout, QTableWidget, QTableWidgetItem, 
@@ -8,7 +7,10 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushBut
 from PyQt6.QtCore import Qt, pyqtSignal, QPointF, QTimer
 from PyQt6.QtGui import QColor, QFontMetrics
 from ui.components import SwitchButton, SafeDoubleSpinBox
-from config import I18N, save_settings, DOCS_CONFIG_FILE
+from ui.treemap_widget import TreeMapWidget
+from utils.process_tree import get_process_tree
+from utils.memory_maps import get_memory_map_analyzer
+from config import I18N, save_settings, get_settings_store
 
 class ProcessChainWindow(QDialog):
     def __init__(self, parent, pid, lang='zh'):
@@ -29,23 +31,29 @@ class ProcessChainWindow(QDialog):
 
     def get_process_chain(self, pid, lang):
         try:
-            p = psutil.Process(pid)
-            chain = []
-            curr = p
-            while curr:
-                chain.insert(0, f"[{curr.pid}] {curr.name()}")
-                curr = curr.parent()
+            # 优先使用 worker 维护的进程树，不在树中 (尚未采集或已退出) 时再直接查询 psutil
+            tree = get_process_tree()
+            if pid in tree:
+                chain = [f"[{r.pid}] {r.name}" for r in tree.ancestors(pid)]
+                children = [(r.pid, r.name) for r in tree.children_of(pid)]
+            else:
+                p = psutil.Process(pid)
+                chain = []
+                curr = p
+                while curr:
+                    chain.insert(0, f"[{curr.pid}] {curr.name()}")
+                    curr = curr.parent()
+                children = [(c.pid, c.name()) for c in p.children()]
             
             t = I18N[lang]
             result = t['ancestry_chain']
             for i, name in enumerate(chain):
                 result += "  " * i + ("└─ " if i > 0 else "") + name + "\n"
             
-            children = p.children()
             if children:
                 result += t['children']
-                for child in children:
-                    result += f"  └─ [{child.pid}] {child.name()}\n"
+                for child_pid, child_name in children:
+                    result += f"  └─ [{child_pid}] {child_name}\n"
             
             return result
         except:
@@ -160,11 +168,7 @@ class AffinityDialog(QDialog):
         try:
             if not self.process_path:
                 return None
-            if not os.path.exists(DOCS_CONFIG_FILE):
-                return None
-            with open(DOCS_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            cpu_configs = config.get('cpu_affinity', {})
+            cpu_configs = get_settings_store().get('cpu_affinity', {})
             if self.process_path in cpu_configs:
                 cpus = cpu_configs[self.process_path].get('cpus', [])
                 return set(cpus) if cpus else None
@@ -177,29 +181,27 @@ class AffinityDialog(QDialog):
             if not self.process_path:
                 return
             
-            # 加载现有配置
-            config = {}
-            if os.path.exists(DOCS_CONFIG_FILE):
-                with open(DOCS_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-            
-            if 'cpu_affinity' not in config:
-                config['cpu_affinity'] = {}
-                
-            config['cpu_affinity'][self.process_path] = {
+            # 复制一份再修改，由 save_settings 合并并通知订阅者
+            cpu_configs = dict(get_settings_store().get('cpu_affinity', {}))
+            cpu_configs[self.process_path] = {
                 'name': self.process_name,
                 'cpus': cpus
             }
             
             # 传递更新后的 cpu_affinity
-            save_settings({'cpu_affinity': config['cpu_affinity']})
+            save_settings({'cpu_affinity': cpu_configs})
         except:
             pass
 
 class DetailWindow(QDialog):
-    def __init__(self, parent, item, lang='zh'):
+    # 后台解析的内存映射完成 (Future)，从工作线程转回界面线程
+    _mapReady = pyqtSignal(object)
+
+    def __init__(self, parent, item, lang='zh', live=True):
+        """:param live: False 时 (回放) 只显示 item 中记录的数据，不读取实时的内存映射"""
         super().__init__(parent)
         self.item = item
+        self.lang = lang
         t = I18N[lang]
         self.setWindowTitle(f"{item.name} - {t['detail_title']}")
         self.resize(600, 500)
@@ -221,9 +223,11 @@ class DetailWindow(QDialog):
         """)
         
         layout = QVBoxLayout(self)
+        self.main_layout = layout
         header = QLabel(f"{item.name} | {t['display_label']}: {item.formatted_size()}")
         header.setStyleSheet("font-size: 16px; font-weight: bold; color: #00FF00; margin-bottom: 10px;")
         layout.addWidget(header)
+        self.loading_label = None
         
         self.table = QTableWidget()
         self.table.setColumnCount(2)
@@ -234,8 +238,60 @@ class DetailWindow(QDialog):
         self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
         self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
+        self.fill_table(item.children if item.children else [item])
+        layout.addWidget(self.table, 1)
         
-        display_list = item.children if item.children else [item]
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        close_btn.setStyleSheet("""
+            QPushButton { background-color: #3E3E42; color: white; padding: 10px; border: none; }
+            QPushButton:hover { background-color: #505050; }
+        """)
+        layout.addWidget(close_btn)
+
+        # 单个进程：按映射类型 (堆、栈、匿名、映射文件、共享库) 嵌套显示内存映射；
+        # 映射在后台线程中解析，完成前显示提示，不阻塞界面
+        pid = item.data.get('pid')
+        if live and pid is not None and not item.data.get('is_group') and item.type == 'system':
+            future = get_memory_map_analyzer().submit(pid)
+            if future.done():
+                self.on_map_ready(future)
+            else:
+                self.loading_label = QLabel(t.get('map_loading', "Analyzing memory mappings…"))
+                self.loading_label.setStyleSheet("color: #888; padding: 6px;")
+                layout.insertWidget(1, self.loading_label)
+                self._mapReady.connect(self.on_map_ready, Qt.ConnectionType.QueuedConnection)
+                future.add_done_callback(self._emit_map_ready)
+
+    def _emit_map_ready(self, future):
+        try:
+            self._mapReady.emit(future)
+        except RuntimeError:
+            # 窗口已关闭
+            pass
+
+    def on_map_ready(self, future):
+        if self.loading_label is not None:
+            self.loading_label.deleteLater()
+            self.loading_label = None
+        try:
+            memory_map = future.result()
+        except Exception:
+            memory_map = None
+        map_items = memory_map.to_tree_items(self.lang) if memory_map is not None else []
+        if not map_items:
+            return
+        self.resize(800, 700)
+        self.map_view = TreeMapWidget()
+        self.map_view.setMinimumHeight(300)
+        parent = self.parent()
+        if parent is not None and hasattr(parent, 'settings'):
+            self.map_view.set_colors(parent.settings.get('colors', {}))
+        self.map_view.set_data(map_items, self.lang)
+        self.main_layout.insertWidget(1, self.map_view, 2)
+        self.fill_table([entry for group in map_items for entry in group.children])
+
+    def fill_table(self, display_list):
         display_list = sorted(display_list, key=lambda x: x.value, reverse=True)
         self.display_list = display_list
         
@@ -248,15 +304,6 @@ class DetailWindow(QDialog):
             size_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
             size_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
             self.table.setItem(i, 1, size_item)
-        layout.addWidget(self.table)
-        
-        close_btn = QPushButton("Close")
-        close_btn.clicked.connect(self.accept)
-        close_btn.setStyleSheet("""
-            QPushButton { background-color: #3E3E42; color: white; padding: 10px; border: none; }
-            QPushButton:hover { background-color: #505050; }
-        """)
-        layout.addWidget(close_btn)
 
     def show_context_menu(self, pos):
         row = self.table.currentRow()
@@ -333,6 +380,32 @@ class SettingsDialog(QDialog):
         self.lbl_mode_text = QLabel(); self.lbl_mode_text.setStyleSheet("background-color: transparent; color: #EEE;")
         mode_h.addStretch(); mode_h.addWidget(self.lbl_mode_text); mode_h.addWidget(self.btn_view_mode)
         self._add_row(layout_disp, self.lbl_view_mode, mode_container)
+
+        self.lbl_layout_mode = QLabel()
+        layout_mode_container = QWidget(); layout_mode_container.setStyleSheet("background-color: transparent;")
+        layout_mode_h = QHBoxLayout(layout_mode_container); layout_mode_h.setContentsMargins(0,0,0,0)
+        self.btn_layout_mode = SwitchButton(); self.btn_layout_mode.setChecked(self.settings.get('layout_mode') == 'stable')
+        self.lbl_layout_mode_text = QLabel(); self.lbl_layout_mode_text.setStyleSheet("background-color: transparent; color: #EEE;")
+        layout_mode_h.addStretch(); layout_mode_h.addWidget(self.lbl_layout_mode_text); layout_mode_h.addWidget(self.btn_layout_mode)
+        self._add_row(layout_disp, self.lbl_layout_mode, layout_mode_container)
+
+        self.lbl_metric = QLabel()
+        self.combo_metric = QComboBox()
+        for key in ('private', 'pss', 'uss'): self.combo_metric.addItem(key, key)
+        self.combo_metric.setCurrentIndex(max(0, self.combo_metric.findData(self.settings.get('memory_metric', 'private'))))
+        self._add_row(layout_disp, self.lbl_metric, self.combo_metric)
+        self.lbl_sample_budget = QLabel()
+        self.spin_sample_budget = SafeDoubleSpinBox(); self.spin_sample_budget.setRange(1.0, 500.0); self.spin_sample_budget.setDecimals(0)
+        self.spin_sample_budget.setValue(self.settings.get('sample_budget_ms', 20))
+        self._add_row(layout_disp, self.lbl_sample_budget, self.spin_sample_budget)
+
+        self.lbl_record = QLabel()
+        record_container = QWidget(); record_container.setStyleSheet("background-color: transparent;")
+        record_h = QHBoxLayout(record_container); record_h.setContentsMargins(0,0,0,0)
+        self.btn_record = SwitchButton(); self.btn_record.setChecked(self.settings.get('record_snapshots', False))
+        self.lbl_record_text = QLabel(); self.lbl_record_text.setStyleSheet("background-color: transparent; color: #EEE;")
+        record_h.addStretch(); record_h.addWidget(self.lbl_record_text); record_h.addWidget(self.btn_record)
+        self._add_row(layout_disp, self.lbl_record, record_container)
         
         self.lbl_free = QLabel()
         free_container = QWidget(); free_container.setStyleSheet("background-color: transparent;")
@@ -378,6 +451,27 @@ class SettingsDialog(QDialog):
         self.spin_opt_interval = SafeDoubleSpinBox(); self.spin_opt_interval.setRange(1.0, 3600.0)
         self.spin_opt_interval.setValue(self.settings.get('optimize_interval', 30000) / 1000.0)
         self._add_row(layout_opt, self.lbl_opt_interval, self.spin_opt_interval)
+        # 释放效果统计：按程序的回填比例，回填过高的程序会被自动跳过
+        self.lbl_trim_stats = QLabel(); self.lbl_trim_stats.setWordWrap(True)
+        layout_opt.addWidget(self.lbl_trim_stats)
+        self.trim_stats_list = QTableWidget()
+        self.trim_stats_list.setColumnCount(5)
+        self.trim_stats_list.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for col in range(1, 5):
+            self.trim_stats_list.horizontalHeader().setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        self.trim_stats_list.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.trim_stats_list.setStyleSheet("""
+            QTableWidget { background-color: #252526; color: #EEE; gridline-color: #333; border: 1px solid #333; }
+            QHeaderView::section { background-color: #333; color: white; padding: 5px; border: 1px solid #444; }
+        """)
+        self._set_table_min_rows(self.trim_stats_list, 4)
+        layout_opt.addWidget(self.trim_stats_list)
+        trim_btn_layout = QHBoxLayout()
+        self.btn_refresh_trim = QPushButton(t.get('cpu_refresh', "Refresh"))
+        self.btn_refresh_trim.clicked.connect(self.refresh_trim_stats)
+        trim_btn_layout.addWidget(self.btn_refresh_trim)
+        trim_btn_layout.addStretch()
+        layout_opt.addLayout(trim_btn_layout)
 
         layout_close, self.sec_close = self._add_section(t.get('section_exit', "🚪 退出行为"))
         self.lbl_close_behavior = QLabel()
@@ -477,6 +571,10 @@ class SettingsDialog(QDialog):
         self.spin_refresh.valueChanged.connect(self.sync_settings)
         self.btn_game_manual.clicked.connect(self.sync_settings)
         self.btn_view_mode.clicked.connect(self.sync_settings)
+        self.btn_layout_mode.clicked.connect(self.sync_settings)
+        self.combo_metric.currentIndexChanged.connect(self.sync_settings)
+        self.spin_sample_budget.valueChanged.connect(self.sync_settings)
+        self.btn_record.clicked.connect(self.sync_settings)
         self.btn_close_behavior.clicked.connect(self.sync_settings)
         self.btn_auto_opt.clicked.connect(self.sync_settings)
         self.spin_opt_interval.valueChanged.connect(self.sync_settings)
@@ -487,6 +585,7 @@ class SettingsDialog(QDialog):
         self.btn_auto_apply_cpu.clicked.connect(self.sync_settings)
 
         self.retranslate_ui()
+        self.refresh_trim_stats()
         self.refresh_cpu_configs()
         self.refresh_ignored_games()
 
@@ -555,6 +654,7 @@ class SettingsDialog(QDialog):
     def on_lang_changed(self):
         self.settings['lang'] = self.combo_lang.currentData()
         self.retranslate_ui()
+        self.refresh_trim_stats()
         self.settingsChanged.emit()
 
     def pick_color(self, key):
@@ -575,9 +675,18 @@ class SettingsDialog(QDialog):
         self.lbl_lang.setText(t['lang_label']); self.lbl_refresh.setText(t['refresh_label'])
         self.lbl_game_manual.setText(t.get('game_mode_manual', "Manual Game Mode"))
         self.spin_refresh.setSuffix(" s"); self.lbl_view_mode.setText(t['view_mode_label'])
+        self.lbl_layout_mode.setText(t.get('layout_mode_label', "Layout Mode"))
+        self.lbl_metric.setText(t.get('memory_metric_label', "Memory Metric"))
+        self.lbl_sample_budget.setText(t.get('sample_budget_label', "Sampling Budget per Refresh"))
+        self.spin_sample_budget.setSuffix(" ms")
+        self.lbl_record.setText(t.get('record_snapshots', "Record Snapshots to Disk"))
         self.lbl_auto_opt.setText(t.get('auto_optimize_label', 'Auto Optimize'))
         self.lbl_opt_interval.setText(t.get('opt_interval_label', 'Interval'))
         self.spin_opt_interval.setSuffix(" s")
+        self.trim_stats_list.setHorizontalHeaderLabels([t.get('cpu_col_name', "Program"), t.get('trim_col_samples', "Trims"),
+                                                        t.get('trim_col_refault', "Re-fault"), t.get('trim_col_reclaimed', "Reclaimed"),
+                                                        t.get('trim_col_status', "Status")])
+        self.btn_refresh_trim.setText(t.get('cpu_refresh', "Refresh"))
         self.lbl_free.setText(t['show_free']); self.lbl_gpu_free.setText(t['show_gpu_free'])
         self.lbl_gpu_used.setText(t['show_gpu_used']); self.lbl_startup.setText(t['auto_startup'])
         self.lbl_close_behavior.setText(t['close_behavior_label'])
@@ -610,6 +719,9 @@ class SettingsDialog(QDialog):
         self.combo_lang.blockSignals(True)
         self.combo_lang.setItemText(0, t['lang_zh']); self.combo_lang.setItemText(1, t['lang_en'])
         self.combo_lang.blockSignals(False)
+        self.combo_metric.blockSignals(True)
+        for i, key in enumerate(('metric_private', 'metric_pss', 'metric_uss')): self.combo_metric.setItemText(i, t.get(key, key))
+        self.combo_metric.blockSignals(False)
         self.update_toggle_text()
 
     def update_toggle_text(self):
@@ -617,6 +729,7 @@ class SettingsDialog(QDialog):
         if lang not in I18N: lang = 'zh'
         t = I18N[lang]
         if hasattr(self, 'lbl_mode_text'): self.lbl_mode_text.setText(t['view_program'] if self.btn_view_mode.isChecked() else t['view_process'])
+        if hasattr(self, 'lbl_layout_mode_text'): self.lbl_layout_mode_text.setText(t.get('layout_stable', "Stable Order") if self.btn_layout_mode.isChecked() else t.get('layout_squarify', "Sort by Size"))
         if hasattr(self, 'lbl_close_text'): self.lbl_close_text.setText(t['close_to_tray'] if self.btn_close_behavior.isChecked() else t['close_quit'])
         if hasattr(self, 'lbl_game_manual_text'): self.lbl_game_manual_text.setText(t.get('on', "ON") if self.btn_game_manual.isChecked() else t.get('off', "OFF"))
         
@@ -626,6 +739,7 @@ class SettingsDialog(QDialog):
             (getattr(self, 'lbl_gpu_free_text', None), self.btn_gpu_free),
             (getattr(self, 'lbl_gpu_used_text', None), self.btn_gpu_used),
             (getattr(self, 'lbl_startup_text', None), self.btn_startup),
+            (getattr(self, 'lbl_record_text', None), self.btn_record),
             (getattr(self, 'lbl_auto_apply_cpu_text', None), self.btn_auto_apply_cpu)
         ]
         
@@ -637,6 +751,10 @@ class SettingsDialog(QDialog):
         self.settings['refresh_rate'] = int(self.spin_refresh.value() * 1000)
         self.settings['game_mode_manual'] = self.btn_game_manual.isChecked()
         self.settings['view_mode'] = 'program' if self.btn_view_mode.isChecked() else 'process'
+        self.settings['layout_mode'] = 'stable' if self.btn_layout_mode.isChecked() else 'squarify'
+        self.settings['memory_metric'] = self.combo_metric.currentData()
+        self.settings['sample_budget_ms'] = int(self.spin_sample_budget.value())
+        self.settings['record_snapshots'] = self.btn_record.isChecked()
         self.settings['close_to_tray'] = self.btn_close_behavior.isChecked()
         self.settings['auto_optimize'] = self.btn_auto_opt.isChecked()
         self.settings['optimize_interval'] = int(self.spin_opt_interval.value() * 1000)
@@ -647,11 +765,33 @@ class SettingsDialog(QDialog):
         self.settings['auto_apply_cpu_affinity'] = self.btn_auto_apply_cpu.isChecked()
         self.update_toggle_text(); self.settingsChanged.emit()
 
+    def refresh_trim_stats(self):
+        try:
+            from utils.trimmer import get_trimmer
+            lang = self.settings.get('lang', 'zh')
+            t = I18N.get(lang, I18N['zh'])
+            trimmer = get_trimmer()
+            tracker = trimmer.tracker
+            if not trimmer.supported:
+                self.lbl_trim_stats.setText(t.get('trim_unsupported', "Working-set trimming is not supported on this platform"))
+            else:
+                self.lbl_trim_stats.setText(t.get('trim_summary', "Passes: {passes} | Reclaimed: {reclaimed:.1f} MB | Observing: {pending}").format(
+                    passes=trimmer.passes, reclaimed=trimmer.total_reclaimed / 1024 / 1024, pending=tracker.pending))
+            stats = tracker.stats()
+            self.trim_stats_list.setRowCount(len(stats))
+            for row, st in enumerate(stats):
+                status = t.get('trim_status_skip', "Skipped (refills)") if tracker.should_skip(st.name) else t.get('trim_status_ok', "Trimming")
+                cells = [st.name, str(st.samples), f"{st.ratio * 100:.0f}%",
+                         f"{st.reclaimed / 1024 / 1024:.1f} MB", status]
+                for col, text in enumerate(cells):
+                    it = QTableWidgetItem(text); it.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
+                    if col == 4 and st.faults: it.setToolTip(f"{st.faults} page faults")
+                    self.trim_stats_list.setItem(row, col, it)
+        except: pass
+
     def refresh_cpu_configs(self):
         try:
-            if not os.path.exists(DOCS_CONFIG_FILE): return
-            with open(DOCS_CONFIG_FILE, 'r', encoding='utf-8') as f: config = json.load(f)
-            cpu_configs = config.get('cpu_affinity', {})
+            cpu_configs = get_settings_store().get('cpu_affinity', {})
             self.cpu_config_list.setRowCount(len(cpu_configs))
             for row, (path, cfg) in enumerate(cpu_configs.items()):
                 name = cfg.get('name', os.path.basename(path))
@@ -669,13 +809,10 @@ class SettingsDialog(QDialog):
             path = self.cpu_config_list.item(row, 1).text()
             
             # 使用 save_settings 的合并功能，只传递需要修改的部分
-            # 但 cpu_affinity 是嵌套的，所以我们需要先加载
-            if not os.path.exists(DOCS_CONFIG_FILE): return
-            with open(DOCS_CONFIG_FILE, 'r', encoding='utf-8') as f: config = json.load(f)
-            
-            if 'cpu_affinity' in config and path in config['cpu_affinity']:
-                del config['cpu_affinity'][path]
-                save_settings({'cpu_affinity': config['cpu_affinity']})
+            cpu_configs = dict(get_settings_store().get('cpu_affinity', {}))
+            if path in cpu_configs:
+                del cpu_configs[path]
+                save_settings({'cpu_affinity': cpu_configs})
                 self.refresh_cpu_configs()
         except: pass
 
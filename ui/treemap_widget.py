@@ -1,14 +1,25 @@
+import math
+from collections import OrderedDict
+from concurrent.futures import Future
+
 from PyQt6.QtWidgets import QWidget, QMenu
 from PyQt6.QtCore import Qt, QRectF, QPointF, pyqtSignal
-from PyQt6.QtGui import QPainter, QColor, QPen, QBrush, QFont, QLinearGradient, QFontMetrics, QAction
-from utils.treemap_logic import squarify_layout
+from PyQt6.QtGui import QPainter, QColor, QPen, QBrush, QFont, QLinearGradient, QFontMetrics, QAction, QRegion, QPixmap
+from utils.treemap_logic import LayoutCache, HitGrid, TreeMapItem
 from config import I18N
 
+# 块缓存的像素预算 (按设备像素计)，超出后按 LRU 淘汰
+_TILE_CACHE_PIXELS = 8 * 1024 * 1024
+
 class TreeMapWidget(QWidget):
     # 定义双击信号，传递被双击的项目
     itemDoubleClicked = pyqtSignal(object)
     # 定义右键信号
     itemRightClicked = pyqtSignal(object, QPointF)
+    # 下钻路径变化：从顶层往下每一级的名称
+    pathChanged = pyqtSignal(list)
+    # 后台准备的子项完成 (路径, Future)，从工作线程转回界面线程
+    _childrenReady = pyqtSignal(object, object)
 
     def __init__(self):
         super().__init__()
@@ -17,6 +28,29 @@ class TreeMapWidget(QWidget):
         self.is_game_mode = False
         self.setMouseTracking(True)
         self.hovered_item = None
+        # 布局缓存：数值没有明显变化、窗口大小不变时直接复用上一次的矩形
+        self.layout_cache = LayoutCache()
+        # 'squarify': 按面积排序；'stable': 按首次出现的先后保持固定顺序 (以 PID / 程序组为键)
+        self.layout_mode = 'squarify'
+        self._order = {}
+        self._next_rank = 0
+        self._seen = set()
+        # 保留模式渲染：每个块只光栅化一次，之后直接贴图
+        self._tile_cache = OrderedDict()   # 绘制参数 -> (QPixmap, 设备像素数)
+        self._tile_cache_pixels = 0
+        self._colors_version = 0
+        self._fonts = {}                   # (字号, 粗体) -> (QFont, QFontMetrics)
+        # 命中测试用的空间索引，每次布局后重建
+        self._hit_index = None
+        # 下钻：_path 为从顶层往下每一级的项目键，_focus 为当前全屏显示的项目
+        self._path = []
+        self._focus = None
+        # 按需提供子项的回调 (如进程的内存映射)，只在进入该层时调用；
+        # 可以直接返回子项列表，也可以返回 Future，完成前显示一个占位块
+        self.child_provider = None
+        self._expanded = {}                # 路径 -> 按需生成的子项
+        self._childrenReady.connect(self._on_children_ready, Qt.ConnectionType.QueuedConnection)
+        self.setFocusPolicy(Qt.FocusPolicy.ClickFocus)
         
         # 配色方案 (初始默认值，稍后会由 MainWindow 同步)
         self.colors = {
@@ -36,20 +70,278 @@ class TreeMapWidget(QWidget):
         for key, hex_val in color_map.items():
             if key in self.colors:
                 self.colors[key] = QColor(hex_val)
+        self._colors_version += 1
+        self._clear_tile_cache()
         self.update()
 
     def set_data(self, root_items, lang='zh'):
+        before = self._tile_signatures()
         self.root_items = root_items
         self.lang = lang
+        self._resolve_focus()
+        self._layout_items()
+        self._update_dirty(before)
+
+    def set_layout_mode(self, mode):
+        mode = 'stable' if mode == 'stable' else 'squarify'
+        if mode != self.layout_mode:
+            self.layout_mode = mode
+            self._order.clear()
+            self.recalculate_layout()
+
+    @staticmethod
+    def _item_key(item):
+        """跨刷新稳定的项目标识：进程按 PID，程序组按根进程 PID，其余按类型 + 名称"""
+        data = item.data
+        if 'pid' in data:
+            return ('pid', data['pid'])
+        if 'root_pid' in data:
+            return ('group', data['root_pid'])
+        return (item.type, item.name)
+
+    def _ordered(self, items):
+        """稳定模式下按持久化的顺序排列；新出现的项目排在末尾"""
+        order = self._order
+        for item in items:
+            key = self._item_key(item)
+            self._seen.add(key)
+            if key not in order:
+                order[key] = self._next_rank
+                self._next_rank += 1
+        return sorted(items, key=lambda i: order[self._item_key(i)])
+
+    # ---------------- 下钻 ----------------
+    def _view_items(self):
+        """当前视图的顶层项目：下钻时只有焦点项目本身"""
+        return [self._focus] if self._focus is not None else self.root_items
+
+    def _resolve_focus(self):
+        """
+        新数据到达后沿路径重新找到焦点项目；按需生成的子项从缓存挂回新对象上。
+        路径中某一级已经消失 (进程退出等) 时退回到仍然存在的那一级。
+        """
+        focus = None
+        items = self.root_items
+        for depth, key in enumerate(self._path):
+            item = next((i for i in items if self._item_key(i) == key), None)
+            if item is None:
+                self._set_path(self._path[:depth], None)
+                self._resolve_focus()
+                return
+            lazy = self._expanded.get(tuple(self._path[:depth + 1]))
+            if lazy is not None and not item.children:
+                item.children = lazy
+            focus = item
+            items = item.children
+        self._focus = focus
+
+    def _set_path(self, path, focus):
+        changed = path != self._path
+        self._path = path
+        self._focus = focus
+        # 只保留当前路径上的按需子项
+        self._expanded = {k: v for k, v in self._expanded.items() if list(k) == path[:len(k)]}
+        self.hovered_item = None
+        if changed:
+            self.pathChanged.emit(self.path_names())
+
+    def path_names(self):
+        """当前下钻路径上每一级的名称"""
+        names = []
+        items = self.root_items
+        for key in self._path:
+            item = next((i for i in items if self._item_key(i) == key), None)
+            if item is None:
+                break
+            names.append(item.name)
+            items = item.children
+        return names
+
+    def can_drill(self, item):
+        """分组可以进入；单个进程在提供了子项回调时也可以进入"""
+        if item is None or item is self._focus:
+            return False
+        if item.children:
+            return True
+        return (self.child_provider is not None and item.type == 'system'
+                and 'pid' in item.data and not item.data.get('is_group'))
+
+    def drill_into(self, item):
+        """把 item 作为焦点全屏显示；成功返回 True"""
+        if not self.can_drill(item):
+            return False
+        path = self._view_path(item)
+        if path is None:
+            return False
+        if not item.children or self._is_placeholder(item.children):
+            # 更深的一层只在进入时才计算
+            children = self.child_provider(item)
+            if isinstance(children, Future):
+                if children.done():
+                    children = self._future_children(children)
+                else:
+                    key = tuple(path)
+                    children.add_done_callback(lambda f: self._emit_children(key, f))
+                    children = [TreeMapItem(I18N.get(self.lang, I18N['zh']).get('loading', "Loading…"),
+                                            item.value, item.type, data={'loading': True})]
+            if not children:
+                return False
+            item.children = children
+            self._expanded[tuple(path)] = children
+        self._set_path(path, item)
+        self.recalculate_layout()
+        return True
+
+    @staticmethod
+    def _is_placeholder(children):
+        return len(children) == 1 and children[0].data.get('loading', False)
+
+    @staticmethod
+    def _future_children(future):
+        try:
+            return future.result() or []
+        except Exception as e:
+            print(f"Child provider error: {e}")
+            return []
+
+    def _emit_children(self, key, future):
+        try:
+            self._childrenReady.emit(key, future)
+        except RuntimeError:
+            # 控件已销毁
+            pass
+
+    def _on_children_ready(self, key, future):
+        """后台子项完成：仍停留在该层时替换占位块，已经离开时丢弃"""
+        pending = self._expanded.get(key)
+        if pending is None or not self._is_placeholder(pending):
+            return
+        children = self._future_children(future)
+        item = self._item_at(key)
+        if not children:
+            # 进程已退出或无权读取：去掉占位块并退回上一级
+            if item is not None:
+                item.children = []
+            self.drill_to(len(key) - 1)
+            return
+        self._expanded[key] = children
+        if item is not None:
+            item.children = children
         self.recalculate_layout()
 
+    def _item_at(self, path):
+        items, item = self.root_items, None
+        for key in path:
+            item = next((i for i in items if self._item_key(i) == key), None)
+            if item is None:
+                return None
+            items = item.children
+        return item
+
+    def _view_path(self, item):
+        """item 在当前视图中的完整路径 (项目键列表)；视图中最多显示到孙级"""
+        key = self._item_key
+        if self._focus is not None:
+            base, roots = list(self._path[:-1]), [self._focus]
+        else:
+            base, roots = [], self.root_items
+        for root in roots:
+            if root is item:
+                return base + [key(root)]
+            for child in root.children:
+                if child is item:
+                    return base + [key(root), key(child)]
+                if item in child.children:
+                    return base + [key(root), key(child), key(item)]
+        return None
+
+    def drill_to(self, level):
+        """返回路径上的第 level 级 (0 为顶层)"""
+        if level >= len(self._path):
+            return
+        path = self._path[:level]
+        self._set_path(path, None)
+        self._resolve_focus()
+        self.recalculate_layout()
+
+    def drill_up(self):
+        if self._path:
+            self.drill_to(len(self._path) - 1)
+
+    def _tile_signatures(self):
+        """{项目键: (矩形, 绘制内容)}，用于计算需要重绘的区域"""
+        sigs = {}
+        for group in self._view_items():
+            gkey = self._item_key(group)
+            sigs[(gkey,)] = self._tile_signature(group)
+            for child in group.children:
+                ckey = (gkey, self._item_key(child))
+                sigs[ckey] = self._tile_signature(child)
+                if group is self._focus:
+                    for sub in child.children:
+                        sigs[ckey + (self._item_key(sub),)] = self._tile_signature(sub)
+        return sigs
+
+    def _tile_signature(self, item):
+        data = item.data
+        return ((item.x, item.y, item.w, item.h), item.name, item.type, item.formatted_size(),
+                self._fmt_mini(data.get('vmem', 0)), self._fmt_mini(data.get('rss', 0)), data.get('stale', False))
+
+    def _update_dirty(self, before):
+        """只重绘位置或内容发生变化的块"""
+        after = self._tile_signatures()
+        if not before or not after:
+            self.update()
+            return
+        region = QRegion()
+        changed = 0
+        for key in before.keys() | after.keys():
+            old, new = before.get(key), after.get(key)
+            if old == new:
+                continue
+            changed += 1
+            for sig in (old, new):
+                if sig is not None:
+                    x, y, w, h = sig[0]
+                    region += QRectF(x, y, w, h).toAlignedRect().adjusted(-1, -1, 1, 1)
+        if changed * 2 > len(after):
+            self.update()
+        elif changed:
+            self.update(region)
+
+    def layout_cache_stats(self):
+        """布局缓存的命中统计"""
+        return self.layout_cache.stats()
+
     def recalculate_layout(self):
+        self._layout_items()
+        self.update()
+
+    def _layout_items(self):
+        self._hit_index = None
         if not self.root_items:
-            self.update()
             return
             
         w, h = self.width(), self.height()
         if w <= 0 or h <= 0: return
+        if self.layout_mode == 'stable':
+            # 已经消失的项目不再保留顺序，避免映射表随 PID 变化无限增长
+            if len(self._order) > 2 * len(self._seen) + 256:
+                self._order = {k: v for k, v in self._order.items() if k in self._seen}
+            self._seen = set()
+            def squarify(items, x, y, width, height):
+                return self.layout_cache.layout(self._ordered(items), x, y, width, height, ordered=True)
+        else:
+            squarify = self.layout_cache.layout
+
+        if self._focus is not None:
+            # 下钻视图：焦点项目占满整个控件，子项带分组时再嵌套一层
+            self._focus.set_geometry(0, 0, w, h)
+            self._layout_children(self._focus, squarify)
+            for child in self._focus.children:
+                self._layout_children(child, squarify)
+            self._hit_index = HitGrid.build([self._focus], w, h)
+            return
 
         # 1. 第一级：拆分系统和 GPU
         sys_items = [i for i in self.root_items if not i.type.startswith('gpu')]
@@ -62,7 +354,8 @@ class TreeMapWidget(QWidget):
 
         if gpu_items and sys_items:
             gpu_ratio = max(0.15, min(0.5, gpu_val / (sys_val + gpu_val) if (sys_val + gpu_val) > 0 else 0.3))
-            sys_w = w * (1 - gpu_ratio)
+            # 分割线对齐到整像素，数值微小变化时各区域的几何保持不变，布局缓存才能命中
+            sys_w = round(w * (1 - gpu_ratio))
             gpu_w = w - sys_w
         else:
             sys_w, gpu_w = (w, 0) if sys_items else (0, w)
@@ -77,11 +370,11 @@ class TreeMapWidget(QWidget):
                 free_ratio = sum(i.value for i in sys_free) / total_sys
                 # 限制空闲区域比例
                 free_ratio = max(0.1, min(0.8, free_ratio))
-                used_w = sys_w * (1 - free_ratio)
-                squarify_layout(sys_used, 0, 0, used_w, h)
-                squarify_layout(sys_free, used_w, 0, sys_w - used_w, h)
+                used_w = round(sys_w * (1 - free_ratio))
+                squarify(sys_used, 0, 0, used_w, h)
+                squarify(sys_free, used_w, 0, sys_w - used_w, h)
             else:
-                squarify_layout(sys_items, 0, 0, sys_w, h)
+                squarify(sys_items, 0, 0, sys_w, h)
 
         # 3. 第二级：GPU 区域内部拆分 (占用 vs 空闲) - 上下布局
         if gpu_w > 0:
@@ -96,33 +389,38 @@ class TreeMapWidget(QWidget):
                 free_ratio = val_free / total_gpu_val
                 # 只有当两者都有值时，才执行比例限制 (10% - 90%)
                 free_ratio = max(0.1, min(0.9, free_ratio))
-                free_h = h * free_ratio
+                free_h = round(h * free_ratio)
                 used_h = h - free_h
-                squarify_layout(gpu_used_list, sys_w, 0, gpu_w, used_h)
-                squarify_layout(gpu_free_list, sys_w, used_h, gpu_w, free_h)
+                squarify(gpu_used_list, sys_w, 0, gpu_w, used_h)
+                squarify(gpu_free_list, sys_w, used_h, gpu_w, free_h)
             elif val_used > 0:
                 # 只有占用
-                squarify_layout(gpu_used_list, sys_w, 0, gpu_w, h)
+                squarify(gpu_used_list, sys_w, 0, gpu_w, h)
             elif val_free > 0:
                 # 只有空闲
-                squarify_layout(gpu_free_list, sys_w, 0, gpu_w, h)
+                squarify(gpu_free_list, sys_w, 0, gpu_w, h)
             else:
                 # 兜底
-                squarify_layout(gpu_items, sys_w, 0, gpu_w, h)
+                squarify(gpu_items, sys_w, 0, gpu_w, h)
         
         # 4. 第三级布局：每个分组内部的进程
         for group in self.root_items:
-            if group.children:
-                # 为分组头部留出一点空间
-                header_h = 20 if group.rect.height() > 40 else 0
-                padding = 2
-                inner_rect = group.rect.adjusted(padding, header_h + padding, -padding, -padding)
-                
-                if inner_rect.width() > 5 and inner_rect.height() > 5:
-                    squarify_layout(group.children, inner_rect.x(), inner_rect.y(), 
-                                   inner_rect.width(), inner_rect.height())
+            self._layout_children(group, squarify)
 
-        self.update()
+        self._hit_index = HitGrid.build(self.root_items, w, h)
+
+    @staticmethod
+    def _layout_children(group, squarify):
+        if group.children:
+            # 为分组头部留出一点空间
+            header_h = 20 if group.h > 40 else 0
+            padding = 2
+            inner_w = group.w - 2 * padding
+            inner_h = group.h - header_h - 2 * padding
+            
+            if inner_w > 5 and inner_h > 5:
+                squarify(group.children, group.x + padding, group.y + header_h + padding, 
+                         inner_w, inner_h)
 
     def resizeEvent(self, event):
         self.recalculate_layout()
@@ -130,14 +428,92 @@ class TreeMapWidget(QWidget):
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.fillRect(self.rect(), self.colors['bg'])
+        dirty = event.rect()
+        painter.fillRect(dirty, self.colors['bg'])
+        dx0, dy0 = dirty.x(), dirty.y()
+        dx1, dy1 = dx0 + dirty.width(), dy0 + dirty.height()
 
-        for group in self.root_items:
-            self._draw_item(painter, group, is_group=True)
-            if group.children:
+        def visible(i):
+            return i.x < dx1 and dx0 < i.x + i.w and i.y < dy1 and dy0 < i.y + i.h
+
+        # 只贴与重绘区域相交的块；分组先于子项绘制，子项覆盖在分组上
+        for group in self._view_items():
+            if visible(group):
+                self._blit_item(painter, group, is_group=True)
+                # 下钻视图中焦点的子分组也画成分组，再画出其中的子项
+                nested = group is self._focus
                 for child in group.children:
-                    self._draw_item(painter, child, is_group=False)
+                    if visible(child):
+                        self._blit_item(painter, child, is_group=nested and bool(child.children))
+                        if nested:
+                            for sub in child.children:
+                                if visible(sub):
+                                    self._blit_item(painter, sub, is_group=False)
+
+    def _blit_item(self, painter, item, is_group):
+        if item.w < 1 or item.h < 1: return
+        # 带子项的分组没有悬停效果
+        hovered = item is self.hovered_item and not (is_group and item.children)
+        # 画笔会越过矩形边缘半个像素，四周各留 1 像素
+        ox, oy = math.floor(item.x) - 1, math.floor(item.y) - 1
+        key = self._tile_key(item, is_group, hovered, item.x - ox, item.y - oy)
+        entry = self._tile_cache.get(key)
+        if entry is None:
+            w = math.ceil(item.x + item.w) + 1 - ox
+            h = math.ceil(item.y + item.h) + 1 - oy
+            dpr = self.devicePixelRatioF()
+            pixmap = QPixmap(max(1, math.ceil(w * dpr)), max(1, math.ceil(h * dpr)))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            p = QPainter(pixmap)
+            p.setRenderHint(QPainter.RenderHint.Antialiasing)
+            p.translate(-ox, -oy)
+            self._draw_item(p, item, is_group, hovered)
+            p.end()
+            entry = (pixmap, pixmap.width() * pixmap.height())
+            self._store_tile(key, entry)
+        else:
+            self._tile_cache.move_to_end(key)
+        painter.drawPixmap(ox, oy, entry[0])
+
+    def _tile_key(self, item, is_group, hovered, fx, fy):
+        """决定一个块外观的全部参数；矩形只按尺寸和亚像素偏移计入，平移后的块可以直接复用"""
+        data = item.data
+        vmem = data.get('vmem', 0)
+        rss = data.get('rss', item.value - vmem)
+        v_ratio = round(vmem / item.value, 3) if item.value else 0
+        return (is_group and bool(item.children), item.w, item.h, fx, fy, hovered,
+                item.name, item.type, item.formatted_size(), self._fmt_mini(rss), self._fmt_mini(vmem), v_ratio,
+                data.get('stale', False), self.lang, self._colors_version, self.devicePixelRatioF())
+
+    def _store_tile(self, key, entry):
+        cache = self._tile_cache
+        cache[key] = entry
+        self._tile_cache_pixels += entry[1]
+        while self._tile_cache_pixels > _TILE_CACHE_PIXELS and len(cache) > 1:
+            _, (_, pixels) = cache.popitem(last=False)
+            self._tile_cache_pixels -= pixels
+
+    def _clear_tile_cache(self):
+        self._tile_cache.clear()
+        self._tile_cache_pixels = 0
+
+    def _font(self, point_size, bold=False):
+        """跨帧复用的字体与字体度量"""
+        key = (point_size, bold)
+        entry = self._fonts.get(key)
+        if entry is None:
+            font = QFont(self.font())
+            font.setPointSize(point_size); font.setBold(bold)
+            entry = (font, QFontMetrics(font))
+            self._fonts[key] = entry
+        return entry
+
+    def changeEvent(self, event):
+        if event.type() == event.Type.FontChange:
+            self._fonts.clear()
+            self._clear_tile_cache()
+        super().changeEvent(event)
 
     def _draw_game_icon(self, painter):
         """在右下角绘制游戏图标标识"""
@@ -160,12 +536,15 @@ class TreeMapWidget(QWidget):
         painter.setPen(QColor(255, 255, 255))
         painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "🎮")
 
-    def _draw_item(self, painter, item, is_group=False):
+    def _draw_item(self, painter, item, is_group=False, hovered=False):
         rect = item.rect
         if rect.width() < 1 or rect.height() < 1: return
 
-        # 1. 基础颜色获取
-        base_color = self.colors.get(item.type, Qt.GlobalColor.gray)
+        # 1. 基础颜色获取；数据源超时、沿用旧值的块 (stale) 降低亮度
+        base_color = QColor(self.colors.get(item.type, Qt.GlobalColor.gray))
+        stale = item.data.get('stale', False)
+        if stale:
+            base_color = base_color.darker(170)
         draw_rect = rect.adjusted(0.5, 0.5, -0.5, -0.5)
 
         # 判断是否为叶子节点（真正显示内容的节点）
@@ -183,11 +562,11 @@ class TreeMapWidget(QWidget):
                 header_rect = QRectF(rect.x(), rect.y(), rect.width(), header_h)
                 painter.fillRect(header_rect, self.colors['header'])
                 painter.setPen(Qt.GlobalColor.white)
-                font = painter.font()
-                font.setBold(True); font.setPointSize(9)
+                font, metrics = self._font(9, bold=True)
                 painter.setFont(font)
-                metrics = QFontMetrics(font)
                 title = f"{item.name} ({item.formatted_size()})"
+                if stale:
+                    title += f" [{self._stale_text()}]"
                 elided_title = metrics.elidedText(title, Qt.TextElideMode.ElideRight, int(rect.width() - 10))
                 painter.drawText(header_rect.adjusted(5, 0, -5, 0), Qt.AlignmentFlag.AlignVCenter, elided_title)
         else:
@@ -207,8 +586,8 @@ class TreeMapWidget(QWidget):
                 header_rect = QRectF(draw_rect.x(), draw_rect.y(), draw_rect.width(), header_h)
                 painter.fillRect(header_rect, self.colors['header'].lighter(130))
                 painter.setPen(Qt.GlobalColor.white)
-                font = painter.font(); font.setPointSize(8); font.setBold(True); painter.setFont(font)
-                name_text = QFontMetrics(font).elidedText(item.name, Qt.TextElideMode.ElideRight, int(draw_rect.width() - 5))
+                font, metrics = self._font(8, bold=True); painter.setFont(font)
+                name_text = metrics.elidedText(item.name, Qt.TextElideMode.ElideRight, int(draw_rect.width() - 5))
                 painter.drawText(header_rect.adjusted(4, 0, -4, 0), Qt.AlignmentFlag.AlignVCenter, name_text)
                 
                 # 计算内部切分
@@ -232,7 +611,7 @@ class TreeMapWidget(QWidget):
                     # 子块渐变
                     grad = QLinearGradient(r.topLeft(), r.bottomRight())
                     sub_color = c
-                    if item == self.hovered_item:
+                    if hovered:
                         sub_color = sub_color.lighter(130)
                     
                     grad.setColorAt(0, sub_color.lighter(110))
@@ -246,7 +625,7 @@ class TreeMapWidget(QWidget):
                     # 子块标注
                     if r.width() > 30 and r.height() > 15:
                         painter.setPen(Qt.GlobalColor.white)
-                        font.setBold(False); font.setPointSize(7); painter.setFont(font)
+                        painter.setFont(self._font(7)[0])
                         
                         lang = self.lang if self.lang in I18N else 'zh'
                         t = I18N[lang]
@@ -254,7 +633,7 @@ class TreeMapWidget(QWidget):
                         painter.drawText(r, Qt.AlignmentFlag.AlignCenter, f"{t_label}\n{self._fmt_mini(val)}")
             else:
                 # 普通绘制 (无虚拟内存或空间太小)
-                color = base_color.lighter(130) if item == self.hovered_item else base_color
+                color = base_color.lighter(130) if hovered else base_color
                 gradient = QLinearGradient(draw_rect.topLeft(), draw_rect.bottomRight())
                 gradient.setColorAt(0, color.lighter(110)); gradient.setColorAt(1, color.darker(110))
                 
@@ -264,10 +643,8 @@ class TreeMapWidget(QWidget):
                 
                 if draw_rect.width() > 30 and draw_rect.height() > 20:
                     painter.setPen(Qt.GlobalColor.white)
-                    font = painter.font(); font.setBold(False)
-                    font.setPointSize(min(10, max(6, int(draw_rect.height() / 4))))
+                    font, metrics = self._font(min(10, max(6, int(draw_rect.height() / 4))))
                     painter.setFont(font)
-                    metrics = QFontMetrics(font)
                     
                     name_rect = draw_rect.adjusted(2, 2, -2, -draw_rect.height()/2)
                     painter.drawText(name_rect, Qt.AlignmentFlag.AlignCenter, metrics.elidedText(item.name, Qt.TextElideMode.ElideRight, int(draw_rect.width())))
@@ -291,34 +668,48 @@ class TreeMapWidget(QWidget):
     def mouseDoubleClickEvent(self, event):
         pos = QPointF(event.pos())
         item = self._get_item_at(pos)
-        if item:
+        if item is not None and item is self._focus:
+            # 双击焦点的标题栏返回上一级
+            self.drill_up()
+        elif item and not self.drill_into(item):
             self.itemDoubleClicked.emit(item)
 
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.BackButton:
+            self.drill_up()
+        else:
+            super().mousePressEvent(event)
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key.Key_Backspace, Qt.Key.Key_Escape) and self._path:
+            self.drill_up()
+        else:
+            super().keyPressEvent(event)
+
     def mouseMoveEvent(self, event):
         pos = QPointF(event.pos())
         item = self._get_item_at(pos)
         if item != self.hovered_item:
+            # 只重绘旧、新两个悬停块
+            for old_new in (self.hovered_item, item):
+                if old_new is not None and not (old_new.children and old_new in self._view_items()):
+                    self.update(old_new.rect.toAlignedRect().adjusted(-1, -1, 1, 1))
             self.hovered_item = item
-            self.update()
         
         if item and not item.children:
-            self.setToolTip(f"{item.name}\n{item.formatted_size()}")
+            stale = f"\n({self._stale_text()})" if item.data.get('stale') else ""
+            self.setToolTip(f"{item.name}\n{item.formatted_size()}{stale}")
         else:
             self.setToolTip("")
 
+    def _stale_text(self):
+        return I18N.get(self.lang, I18N['zh']).get('gpu_stale', "not updated")
+
     def _get_item_at(self, pos):
-        # 确保 pos 是 QPointF 类型，以匹配 QRectF.contains
+        # 确保 pos 是 QPointF 类型
         if not isinstance(pos, QPointF):
             pos = QPointF(pos)
-            
-        # 优先检测子节点（进程）
-        for group in self.root_items:
-            if group.children:
-                for child in group.children:
-                    if child.rect.contains(pos):
-                        return child
-        # 其次检测顶级分组
-        for group in self.root_items:
-            if group.rect.contains(pos):
-                return group
-        return None
+        if self._hit_index is None:
+            return None
+        # 空间索引返回包含该点的最深层项目：优先子节点（进程），其次顶级分组
+        return self._hit_index.item_at(pos.x(), pos.y())
@@ -0,0 +1,268 @@
+import os
+import errno
+import socket
+import struct
+import threading
+
+import psutil
+
+# ---------------- Linux 进程事件连接器 (netlink proc connector) ----------------
+_NETLINK_CONNECTOR = 11
+_CN_IDX_PROC = 1
+_CN_VAL_PROC = 1
+_PROC_CN_MCAST_LISTEN = 1
+_PROC_EVENT_EXEC = 0x00000002
+_PROC_EVENT_EXIT = 0x80000000
+_NLMSG_DONE = 3
+
+_NLMSG_HEAD = struct.Struct('=IHHII')       # len, type, flags, seq, pid
+_CN_MSG_HEAD = struct.Struct('=IIIIHH')     # idx, val, seq, ack, len, flags
+_EVENT_HEAD = struct.Struct('=IIQ')         # what, cpu, timestamp_ns
+_EVENT_PIDS = struct.Struct('=II')          # pid, tgid (exec / exit 事件的前两个字段)
+
+# 没有事件源时比对 PID 集合的间隔 (秒)
+POLL_INTERVAL = 0.2
+# 事件源连续出错这么多次后改用轮询
+MAX_EVENT_ERRORS = 3
+
+
+def normalize_path(path):
+    """规则表与进程路径统一的比较形式 (Windows 下不区分大小写)"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def compile_rules(cpu_configs):
+    """
+    把配置中的 cpu_affinity 编译为 {规范化路径: CPU 元组}，只在规则变化时做一次。
+    :param cpu_configs: {exe 路径: {'name': ..., 'cpus': [...]}}
+    """
+    rules = {}
+    for path, cfg in (cpu_configs or {}).items():
+        cpus = cfg.get('cpus') if isinstance(cfg, dict) else None
+        if path and cpus:
+            rules[normalize_path(path)] = tuple(sorted(set(cpus)))
+    return rules
+
+
+class ProcConnectorEvents:
+    """
+    Linux 内核的进程事件推送：进程 exec 时立刻收到通知，空闲时阻塞在 recv 上，不消耗 CPU。
+    需要 CAP_NET_ADMIN (通常即 root)，打不开时由调用方退回到轮询。
+    """
+
+    def __init__(self, timeout=1.0):
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_CONNECTOR)
+        try:
+            sock.bind((0, _CN_IDX_PROC))
+            op = struct.pack('=I', _PROC_CN_MCAST_LISTEN)
+            body = _CN_MSG_HEAD.pack(_CN_IDX_PROC, _CN_VAL_PROC, 0, 0, len(op), 0) + op
+            sock.send(_NLMSG_HEAD.pack(_NLMSG_HEAD.size + len(body), _NLMSG_DONE, 0, 0, 0) + body)
+            sock.settimeout(timeout)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+
+    def wait(self):
+        """
+        阻塞到有事件或超时。
+        :return: (新 exec 的 PID 列表, 退出的 PID 列表)
+        :raises OSError: 接收失败；事件过多时内核丢弃通知并报告 ENOBUFS
+        """
+        started, exited = [], []
+        try:
+            data = self._sock.recv(65536)
+        except socket.timeout:
+            return started, exited
+        pos = 0
+        while pos + _NLMSG_HEAD.size <= len(data):
+            length = _NLMSG_HEAD.unpack_from(data, pos)[0]
+            if length < _NLMSG_HEAD.size:
+                break
+            event = pos + _NLMSG_HEAD.size + _CN_MSG_HEAD.size
+            if event + _EVENT_HEAD.size + _EVENT_PIDS.size <= pos + length:
+                what = _EVENT_HEAD.unpack_from(data, event)[0]
+                pid, tgid = _EVENT_PIDS.unpack_from(data, event + _EVENT_HEAD.size)
+                # 线程的事件也会上报，只关心主线程 (pid == tgid)
+                if pid == tgid:
+                    if what == _PROC_EVENT_EXEC:
+                        started.append(pid)
+                    elif what == _PROC_EVENT_EXIT:
+                        exited.append(pid)
+            pos += (length + 3) & ~3
+        return started, exited
+
+    def close(self):
+        self._sock.close()
+
+
+class PidPollEvents:
+    """通用后备：定期比对 PID 集合 (Windows 下是一次 EnumProcesses，代价很小)"""
+
+    def __init__(self, interval=POLL_INTERVAL, list_pids=None):
+        self.interval = interval
+        self._list_pids = list_pids or (lambda: set(psutil.pids()))
+        self._pids = self._list_pids()
+        self._stop = threading.Event()
+
+    def wait(self):
+        if self._stop.wait(self.interval):
+            return [], []
+        current = self._list_pids()
+        started = list(current - self._pids)
+        exited = list(self._pids - current)
+        self._pids = current
+        return started, exited
+
+    def close(self):
+        self._stop.set()
+
+
+def open_process_events():
+    """优先使用内核推送的进程事件，不可用时退回轮询"""
+    if hasattr(socket, 'AF_NETLINK'):
+        try:
+            return ProcConnectorEvents()
+        except OSError:
+            pass
+    return PidPollEvents()
+
+
+class AffinityEnforcer:
+    """
+    按保存的规则自动设置进程的 CPU 相关性。
+    - 规则编译为 {规范化路径: CPU} 哈希表，每个新进程只查一次表；
+    - 已处理过的 (pid, create_time) 记录在 enforced 中，不会重复设置，用户之后手动修改也不会被覆盖；
+    - 新进程由进程事件驱动 (见 open_process_events)，启动后几毫秒内生效，空闲时几乎没有开销；
+    - 规则变化时在后台线程做一次全量扫描。
+    """
+
+    def __init__(self, events_factory=open_process_events):
+        self._events_factory = events_factory
+        self._rules = {}
+        self.enforced = set()          # {(pid, create_time)}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._resweep = threading.Event()
+        self._thread = None
+        # 统计
+        self.applied = 0
+        self.failures = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def set_rules(self, cpu_configs):
+        """替换规则并安排一次全量扫描；没有规则时停止监听"""
+        rules = compile_rules(cpu_configs)
+        with self._lock:
+            self._rules = rules
+            self.enforced.clear()
+        if not rules:
+            self.stop()
+            return
+        self._resweep.set()
+        if self.running and self._stop.is_set():
+            # 上一个监听线程正在退出 (最多一个事件等待周期)
+            self._thread.join(timeout=2.0)
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='AffinityEnforcer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """请求监听线程退出；事件源由线程自己关闭"""
+        self._stop.set()
+
+    def apply(self, pid, force=False):
+        """
+        检查单个进程，命中规则时设置相关性。
+        :param force: 忽略 enforced 记录 (exec 换了映像，同一进程可能对应新的规则)
+        :return: 是否设置了相关性
+        """
+        rules = self._rules
+        try:
+            proc = psutil.Process(pid)
+            key = (pid, proc.create_time())
+            if not force and key in self.enforced:
+                return False
+            exe = proc.exe()
+        except (psutil.Error, OSError):
+            # 已退出或无权读取路径的进程 (系统进程) 直接跳过
+            return False
+        cpus = rules.get(normalize_path(exe)) if exe else None
+        if cpus is None:
+            return False
+        with self._lock:
+            self.enforced.add(key)
+        try:
+            if tuple(sorted(proc.cpu_affinity())) == cpus:
+                return False
+            proc.cpu_affinity(list(cpus))
+        except (psutil.Error, OSError, AttributeError, ValueError):
+            self.failures += 1
+            return False
+        self.applied += 1
+        return True
+
+    def sweep(self):
+        """对当前所有进程检查一遍 (启动或规则变化时)"""
+        count = 0
+        for pid in psutil.pids():
+            if self._stop.is_set():
+                break
+            count += self.apply(pid)
+        return count
+
+    def _forget(self, pids):
+        if not pids or not self.enforced:
+            return
+        gone = set(pids)
+        with self._lock:
+            self.enforced = {key for key in self.enforced if key[0] not in gone}
+
+    def _run(self):
+        try:
+            events = self._events_factory()
+        except Exception as e:
+            print(f"Affinity watcher unavailable: {e}")
+            return
+        # 先开始监听再扫描，扫描期间启动的进程不会漏掉
+        errors = 0
+        try:
+            while not self._stop.is_set():
+                if self._resweep.is_set():
+                    self._resweep.clear()
+                    count = self.sweep()
+                    if count > 0: print(f"Applied CPU affinity to {count} process(es)")
+                try:
+                    started, exited = events.wait()
+                except OSError as e:
+                    # 丢失的事件无从得知是哪些进程，重新全量扫描一次补上
+                    self._resweep.set()
+                    if e.errno == errno.ENOBUFS:
+                        continue
+                    errors += 1
+                    if errors >= MAX_EVENT_ERRORS:
+                        print(f"Process events failed ({e}), falling back to polling")
+                        events.close()
+                        events = PidPollEvents()
+                        errors = 0
+                    continue
+                errors = 0
+                self._forget(exited)
+                for pid in started:
+                    self.apply(pid, force=True)
+        finally:
+            events.close()
+
+
+_enforcer = None
+
+def get_affinity_enforcer():
+    """进程级共享的相关性执行器"""
+    global _enforcer
+    if _enforcer is None:
+        _enforcer = AffinityEnforcer()
+    return _enforcer
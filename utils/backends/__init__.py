@@ -0,0 +1,27 @@
+import sys
+from utils.backends.base import PlatformBackend, PsutilBackend, ProcessRecord
+
+_backend = None
+
+def create_backend(platform=None):
+    """按平台创建采集后端"""
+    platform = platform or sys.platform
+    if platform == 'win32':
+        from utils.backends.windows import WindowsBackend
+        return WindowsBackend()
+    if platform.startswith('linux'):
+        from utils.backends.linux import LinuxBackend
+        return LinuxBackend()
+    return PsutilBackend()
+
+def get_backend():
+    """进程级共享的采集后端"""
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+def set_backend(backend):
+    """替换全局后端 (例如注入测试用的假后端)"""
+    global _backend
+    _backend = backend
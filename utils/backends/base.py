@@ -0,0 +1,126 @@
+import psutil
+
+
+class ProcessRecord:
+    """单个进程的持久状态：身份信息只在出生时读取一次，之后每个 tick 只刷新内存计数器"""
+    __slots__ = ('pid', 'ppid', 'name', 'create_time', 'rss', 'private', 'shared', 'handle')
+
+    def __init__(self, pid, ppid, name, create_time, handle=None):
+        self.pid = pid
+        self.ppid = ppid
+        self.name = name
+        self.create_time = create_time
+        self.rss = 0
+        self.private = 0
+        self.shared = 0
+        # 后端私有句柄 (psutil 后端为 psutil.Process，/proc 后端不需要)
+        self.handle = handle
+
+    @property
+    def vmem(self):
+        return max(0, self.private - self.rss)
+
+    @property
+    def key(self):
+        """(pid, create_time) 唯一标识一个进程实例，可抵御 PID 复用"""
+        return (self.pid, self.create_time)
+
+
+class PlatformBackend:
+    """
+    平台采集后端接口。
+    build_memory_items / GPUMonitor 只通过这里访问平台相关能力，
+    各字段统一映射到 rss (常驻物理内存) 与 private (私有提交，private - rss 即视为虚拟/换出部分)。
+    """
+    name = 'base'
+    # 进程树溯源终点 (桌面壳层 / 会话管理器)，小写
+    shell_process_names = ()
+
+    def list_pids(self):
+        """返回当前所有 PID 的集合"""
+        raise NotImplementedError
+
+    def open_process(self, pid):
+        """读取进程身份信息，返回 ProcessRecord；进程不存在或无权限时返回 None"""
+        raise NotImplementedError
+
+    def refresh_memory(self, records, check_identity=False):
+        """
+        批量刷新内存计数器。
+        :param check_identity: 为 True 时同时校验 create_time，识别被复用的 PID
+        :return: (changed, gone) 两个 ProcessRecord 列表
+        """
+        raise NotImplementedError
+
+    def system_memory(self):
+        """
+        系统内存概况，统一为字典：
+        total / available / used / percent / swap_total / swap_used / cached / shared
+        """
+        vm = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        return {
+            'total': vm.total,
+            'available': vm.available,
+            'used': vm.used,
+            'percent': vm.percent,
+            'swap_total': swap.total,
+            'swap_used': swap.used,
+            'cached': getattr(vm, 'cached', 0),
+            'shared': getattr(vm, 'shared', 0),
+        }
+
+    def begin_tick(self):
+        """每个采集周期开始时调用一次，用于批量预取 (如窗口标题)"""
+        pass
+
+    def process_display_name(self, record):
+        """进程在树图中显示的友好名称"""
+        return record.name
+
+    def gpu_process_memory(self, is_silent=False):
+        """平台级的按适配器 (LUID) 分组的进程显存: {luid: {pid: bytes}}"""
+        return {}
+
+    def generic_gpu_info(self):
+        """非 NVIDIA 专用通道可见的显卡 (核显 / AMD 等)，格式同 GPUMonitor.get_gpu_info"""
+        return []
+
+
+class PsutilBackend(PlatformBackend):
+    """基于 psutil 的通用后端，缓存 psutil.Process 对象以避免重复构造"""
+    name = 'psutil'
+
+    def list_pids(self):
+        return set(psutil.pids())
+
+    def open_process(self, pid):
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                return ProcessRecord(pid, proc.ppid(), proc.name(), proc.create_time(), proc)
+        except (psutil.Error, OSError):
+            return None
+
+    def refresh_memory(self, records, check_identity=False):
+        changed, gone = [], []
+        for record in records:
+            proc = record.handle
+            try:
+                # is_running() 会比对 create_time，能识别被复用的 PID
+                if check_identity and not proc.is_running():
+                    gone.append(record)
+                    continue
+                m_info = proc.memory_info()
+            except (psutil.Error, OSError):
+                gone.append(record)
+                continue
+            rss = m_info.rss
+            private = getattr(m_info, 'private', rss)
+            shared = getattr(m_info, 'shared', 0)
+            if rss != record.rss or private != record.private:
+                record.rss = rss
+                record.private = private
+                record.shared = shared
+                changed.append(record)
+        return changed, gone
@@ -0,0 +1,199 @@
+import os
+from collections import OrderedDict
+from utils.backends.base import PlatformBackend, ProcessRecord
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+_NAME_CACHE_SIZE = 4096
+
+
+def _read(path, size=4096):
+    """原始 os 读取，避免 open()/文本解码的开销"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+def _read_meminfo():
+    """解析 /proc/meminfo，返回 {字段: 字节数}"""
+    info = {}
+    for line in _read('/proc/meminfo', 16384).split(b'\n'):
+        key, _, rest = line.partition(b':')
+        parts = rest.split()
+        if parts:
+            info[key.decode()] = int(parts[0]) * 1024
+    return info
+
+
+def _read_boot_time():
+    try:
+        for line in _read('/proc/stat', 65536).split(b'\n'):
+            if line.startswith(b'btime'):
+                return float(line.split()[1])
+    except OSError:
+        pass
+    return 0.0
+
+
+def _parse_stat(data):
+    """
+    解析 /proc/<pid>/stat，返回 (name, ppid, starttime_ticks)。
+    comm 可能包含空格和括号，因此以最后一个 ')' 为界切分。
+    """
+    lpar = data.index(b'(')
+    rpar = data.rindex(b')')
+    name = data[lpar + 1:rpar].decode('utf-8', errors='replace')
+    fields = data[rpar + 2:].split()
+    # fields[0] 为 state，ppid 为第 4 列 (索引 1)，starttime 为第 22 列 (索引 19)
+    return name, int(fields[1]), int(fields[19])
+
+
+class LinuxBackend(PlatformBackend):
+    """
+    Linux /proc 原生采集后端，不构造 psutil.Process 对象。
+    映射关系：
+      rss     <- /proc/<pid>/statm resident
+      shared  <- /proc/<pid>/statm shared (文件页 + 共享内存)
+      private <- rss + VmSwap，因此 vmem (private - rss) 即为该进程被换出到 swap 的部分
+    系统层面的 page cache (Cached + Buffers) 与 Shmem 通过 system_memory() 的 cached / shared 字段提供。
+    """
+    name = 'linux'
+    shell_process_names = (
+        'systemd', 'init', 'kthreadd', 'login', 'sshd', 'tmux: server', 'screen',
+        'gnome-shell', 'plasmashell', 'kwin_x11', 'kwin_wayland', 'xfce4-session',
+        'gnome-session-binary', 'lightdm', 'gdm-session-worker', 'sddm', 'containerd-shim',
+    )
+
+    def __init__(self, proc_root='/proc'):
+        self.proc_root = proc_root
+        self._boot_time = _read_boot_time()
+        self._name_cache = OrderedDict()
+        # 未启用 swap 时不必读取 status 中的 VmSwap，每个进程少一次读取
+        try:
+            self._swap_enabled = _read_meminfo().get('SwapTotal', 0) > 0
+        except OSError:
+            self._swap_enabled = True
+
+    def _create_time(self, start_ticks):
+        return round(self._boot_time + start_ticks / _CLK_TCK, 2)
+
+    def list_pids(self):
+        return {int(d) for d in os.listdir(self.proc_root) if d.isdigit()}
+
+    def open_process(self, pid):
+        try:
+            name, ppid, start = _parse_stat(_read(f'{self.proc_root}/{pid}/stat'))
+        except (OSError, ValueError, IndexError):
+            return None
+        return ProcessRecord(pid, ppid, name, self._create_time(start))
+
+    def refresh_memory(self, records, check_identity=False):
+        changed, gone = [], []
+        root = self.proc_root
+        page = _PAGE_SIZE
+        read_swap = self._swap_enabled
+        for record in records:
+            base = f'{root}/{record.pid}/'
+            try:
+                if check_identity:
+                    _, _, start = _parse_stat(_read(base + 'stat'))
+                    if self._create_time(start) != record.create_time:
+                        gone.append(record)
+                        continue
+                statm = _read(base + 'statm', 256).split()
+                rss = int(statm[1]) * page
+                shared = int(statm[2]) * page
+                swap = 0
+                if rss and read_swap:
+                    status = _read(base + 'status')
+                    idx = status.find(b'VmSwap:')
+                    if idx >= 0:
+                        swap = int(status[idx + 7:status.index(b'kB', idx)]) * 1024
+            except (OSError, ValueError, IndexError):
+                gone.append(record)
+                continue
+            private = rss + swap
+            if rss != record.rss or private != record.private:
+                record.rss = rss
+                record.private = private
+                record.shared = shared
+                changed.append(record)
+        return changed, gone
+
+    def system_memory(self):
+        try:
+            info = _read_meminfo()
+        except OSError:
+            return super().system_memory()
+        total = info.get('MemTotal', 0)
+        available = info.get('MemAvailable', info.get('MemFree', 0))
+        cached = info.get('Cached', 0) + info.get('Buffers', 0)
+        swap_total = info.get('SwapTotal', 0)
+        self._swap_enabled = swap_total > 0
+        swap_used = max(0, swap_total - info.get('SwapFree', 0))
+        return {
+            'total': total,
+            'available': available,
+            'used': max(0, total - info.get('MemFree', 0) - cached),
+            'percent': round((total - available) / total * 100, 1) if total else 0.0,
+            'swap_total': swap_total,
+            'swap_used': swap_used,
+            'cached': cached,
+            'shared': info.get('Shmem', 0),
+        }
+
+    def process_display_name(self, record):
+        """优先使用 cmdline 的 argv[0] (comm 会被截断到 15 个字符)"""
+        key = record.key
+        name = self._name_cache.get(key)
+        if name is not None:
+            self._name_cache.move_to_end(key)
+            return name
+        name = record.name
+        try:
+            argv0 = _read(f'{self.proc_root}/{record.pid}/cmdline', 1024).split(b'\0', 1)[0]
+            if argv0:
+                # 解释器 / 带参数的 argv[0] (如 "nginx: worker process") 保留 comm
+                base = os.path.basename(argv0.split(b' ', 1)[0]).decode('utf-8', errors='replace')
+                if base.startswith(record.name):
+                    name = base
+        except OSError:
+            pass
+        self._name_cache[key] = name
+        if len(self._name_cache) > _NAME_CACHE_SIZE:
+            self._name_cache.popitem(last=False)
+        return name
+
+    def generic_gpu_info(self):
+        """通过 DRM sysfs 读取 AMD / Intel 显卡的显存 (NVIDIA 由 nvidia-smi / NVML 负责)"""
+        gpu_list = []
+        drm = '/sys/class/drm'
+        try:
+            cards = sorted(d for d in os.listdir(drm) if d.startswith('card') and '-' not in d)
+        except OSError:
+            return []
+        for card in cards:
+            dev = f'{drm}/{card}/device'
+            try:
+                total = int(_read(f'{dev}/mem_info_vram_total', 64))
+                used = int(_read(f'{dev}/mem_info_vram_used', 64))
+            except (OSError, ValueError):
+                continue
+            try:
+                vendor = _read(f'{dev}/vendor', 64).strip().decode()
+            except OSError:
+                vendor = ''
+            if vendor == '0x10de':
+                continue
+            gpu_list.append({
+                'index': 100 + len(gpu_list),
+                'name': f"{card} ({vendor or 'drm'})",
+                'total': total,
+                'used': used,
+                'free': max(0, total - used),
+                'processes': {},
+                'method': 'drm-sysfs'
+            })
+        return gpu_list
@@ -0,0 +1,23 @@
+from utils.backends.base import PsutilBackend
+
+
+class WindowsBackend(PsutilBackend):
+    """Windows 后端：psutil 采集 + 窗口标题/文件描述解析 + 性能计数器 / WMI 显卡信息"""
+    name = 'windows'
+    shell_process_names = ('explorer.exe',)
+
+    def begin_tick(self):
+        from utils.data_provider import refresh_window_titles
+        refresh_window_titles()
+
+    def process_display_name(self, record):
+        from utils.data_provider import get_process_name_extended
+        return get_process_name_extended(record.pid, record.create_time)
+
+    def gpu_process_memory(self, is_silent=False):
+        from utils.data_provider import GPUMonitor
+        return GPUMonitor.get_gpu_process_memory_windows(is_silent)
+
+    def generic_gpu_info(self):
+        from utils.data_provider import GPUMonitor
+        return GPUMonitor.get_generic_gpu_info()
@@ -2,11 +2,19 @@ import sys
 import os
 import psutil
 import subprocess
-import time
 import re
 import xml.etree.ElementTree as ET
 import traceback
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from utils.treemap_logic import TreeMapItem
+from utils.process_tree import get_process_tree
+from utils.process_table import NameTable, ProcessTable, top_n
+from utils.unique_memory import get_unique_sampler
+from utils.backends import get_backend
+from utils.gpu_sampler import get_sampler, nvidia_smi_sampler, gpu_counter_sampler, SamplerStalled
+from utils.fanout import DeadlineFanout
 from config import I18N
 
 try:
@@ -19,6 +27,15 @@ try:
 except ImportError:
     PYNVML_AVAILABLE = False
 
+def _hidden_startupinfo():
+    """Windows 下隐藏子进程控制台窗口；其他平台返回 None"""
+    if sys.platform != 'win32':
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    startupinfo.wShowWindow = subprocess.SW_HIDE
+    return startupinfo
+
 class GPUMonitor:
     """GPU显存监控类，支持NVIDIA和AMD显卡"""
     _nvml_initialized = False
@@ -38,67 +55,81 @@ class GPUMonitor:
             return False
     
     _gpu_counter_cache = {}
-    _last_gpu_counter_time = 0
-
-    @staticmethod
-    def get_gpu_process_memory_windows(is_silent=False):
-        """使用 PowerShell 获取 Windows 进程显存占用 (识别 LUID 并匹配)"""
-        if is_silent:
-            return GPUMonitor._gpu_counter_cache
+    # 首次读取长驻 nvidia-smi 时最多等待第一帧的时间 (秒)
+    _SAMPLER_WARMUP = 1.5
+    _sampler_warmed = False
+    _wmi_adapters = None
 
-        current_time = time.time()
-        # 强制 15 秒刷新一次 (之前是 30 秒，太长了)
-        if GPUMonitor._gpu_counter_cache and (current_time - GPUMonitor._last_gpu_counter_time < 15):
-            return GPUMonitor._gpu_counter_cache
+    # 匹配格式: ...\gpu process memory(pid_14188_luid_0x00000000_0x000122ec_phys_0)\local usage : 47484928
+    _counter_pattern = re.compile(r'pid_(\d+)_luid_(0x[0-9a-fA-F_]+).*?\s*:\s*(\d+)')
 
+    @staticmethod
+    def parse_gpu_counters(output):
+        """解析 Get-Counter 输出为 {luid: {pid: bytes}}"""
         proc_mem_by_luid = {}
+        for line in output.splitlines():
+            line = line.strip()
+            if not line: continue
+            match = GPUMonitor._counter_pattern.search(line)
+            if match:
+                pid = int(match.group(1))
+                luid = match.group(2).lower()
+                mem = int(match.group(3))
+                if mem > 0:
+                    if luid not in proc_mem_by_luid: proc_mem_by_luid[luid] = {}
+                    proc_mem_by_luid[luid][pid] = proc_mem_by_luid[luid].get(pid, 0) + mem
+        return proc_mem_by_luid
+
+    @staticmethod
+    def get_gpu_process_memory_windows(is_silent=False):
+        """
+        读取 Windows 进程显存占用 (识别 LUID 并匹配)。
+        数据来自一个长驻的 PowerShell Get-Counter -Continuous 子进程，读取不会阻塞也不会 fork，
+        因此静默模式下同样直接返回最新采样。
+        :raises SamplerStalled: 采样器已停止产出新帧 (看门狗会重启它)
+        """
+        if sys.platform != 'win32':
+            return {}
         try:
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = subprocess.SW_HIDE
-            creation_flags = subprocess.CREATE_NO_WINDOW | 0x00004000 
-
-            # 获取所有进程的 Local Usage (专用显存)
-            # 优化：通过 Format-List 强制获取完整 Path 和 CookedValue，防止被截断
-            cmd = "powershell -WindowStyle Hidden -Command \"Get-Counter '\\GPU Process Memory(*)\\Local Usage' -ErrorAction SilentlyContinue | Select-Object -ExpandProperty CounterSamples | ForEach-Object { $_.Path + ' : ' + $_.CookedValue }\""
-            output = subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL, timeout=8, startupinfo=startupinfo, creationflags=creation_flags).decode('utf-8', errors='ignore')
-            
-            # 匹配格式: ...\gpu process memory(pid_14188_luid_0x00000000_0x000122ec_phys_0)\local usage : 47484928
-            pattern = re.compile(r'pid_(\d+)_luid_(0x[0-9a-fA-F_]+).*?\s*:\s*(\d+)')
-            
-            for line in output.splitlines():
-                line = line.strip()
-                if not line: continue
-                match = pattern.search(line)
-                if match:
-                    pid = int(match.group(1))
-                    luid = match.group(2).lower()
-                    mem = int(match.group(3))
-                    if mem > 0:
-                        if luid not in proc_mem_by_luid: proc_mem_by_luid[luid] = {}
-                        proc_mem_by_luid[luid][pid] = proc_mem_by_luid[luid].get(pid, 0) + mem
-            
-            GPUMonitor._gpu_counter_cache = proc_mem_by_luid
-            GPUMonitor._last_gpu_counter_time = current_time
+            sampler = get_sampler('gpu-counter', lambda: gpu_counter_sampler(parser=GPUMonitor.parse_gpu_counters))
+            latest = sampler.latest(sampler.max_frame_age)
         except Exception as e:
             print(f"PowerShell GPU Counter Error: {e}")
-        return proc_mem_by_luid
+            return GPUMonitor._gpu_counter_cache
+        if latest is None and sampler.latest_raw() is not None:
+            raise SamplerStalled(sampler.name)
+        if latest is not None:
+            GPUMonitor._gpu_counter_cache = latest
+        return GPUMonitor._gpu_counter_cache
+
+    @staticmethod
+    def _latest_nvidia_smi_xml():
+        """从长驻 nvidia-smi 采样器取最新一帧 (已解析的 XML 根节点)"""
+        sampler = get_sampler('nvidia-smi', lambda: nvidia_smi_sampler(parser=ET.fromstring))
+        if not sampler.available:
+            return None
+        root = sampler.latest(sampler.max_frame_age)
+        if root is None and sampler.latest_raw() is not None:
+            # 有过帧但几个采样间隔内没有新帧：子进程挂起，由上层沿用上次结果并标记 stale
+            raise SamplerStalled(sampler.name)
+        if root is None and not GPUMonitor._sampler_warmed:
+            # 仅在程序启动后的第一次读取时等待第一帧
+            GPUMonitor._sampler_warmed = True
+            if sampler.wait_for_frame(GPUMonitor._SAMPLER_WARMUP):
+                root = sampler.latest(sampler.max_frame_age)
+        return root
 
     @staticmethod
     def get_gpu_info_xml(is_silent=False):
-        """使用 nvidia-smi -q -x 获取GPU信息，并智能匹配 PowerShell LUID 数据"""
+        """使用长驻 nvidia-smi -q -x 采样获取GPU信息，并智能匹配 PowerShell LUID 数据"""
         gpu_list = []
         try:
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = subprocess.SW_HIDE
+            root = GPUMonitor._latest_nvidia_smi_xml()
+            if root is None:
+                return gpu_list
 
             # 获取 Windows 性能计数器 (按 LUID 分组)
-            windows_proc_mem_by_luid = GPUMonitor.get_gpu_process_memory_windows(is_silent) if sys.platform == 'win32' else {}
-
-            cmd = "nvidia-smi -q -x"
-            output = subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL, timeout=5, startupinfo=startupinfo)
-            root = ET.fromstring(output)
+            windows_proc_mem_by_luid = get_backend().gpu_process_memory(is_silent)
 
             # 预先计算每个 LUID 的总占用，用于后续匹配
             luid_totals = {luid: sum(procs.values()) for luid, procs in windows_proc_mem_by_luid.items()}
@@ -169,8 +200,12 @@ class GPUMonitor:
                         'processes': proc_map,
                         'method': f'xml (luid:{best_luid or "none"})'
                     })
+                except SamplerStalled:
+                    raise
                 except Exception as e:
                     print(f"Error parsing GPU {i}: {e}")
+        except SamplerStalled:
+            raise
         except Exception as e:
             print(f"XML query error: {e}")
         
@@ -186,7 +221,7 @@ class GPUMonitor:
         gpu_list = []
         try:
             # 获取 PowerShell 显存统计 (按 LUID 分组)
-            windows_proc_mem_by_luid = GPUMonitor.get_gpu_process_memory_windows() if sys.platform == 'win32' else {}
+            windows_proc_mem_by_luid = get_backend().gpu_process_memory()
             luid_totals = {luid: sum(procs.values()) for luid, procs in windows_proc_mem_by_luid.items()}
             
             device_count = pynvml.nvmlDeviceGetCount()
@@ -241,6 +276,8 @@ class GPUMonitor:
                         'method': f'pynvml (luid:{best_luid or "none"})'
                     })
                 except: continue
+        except SamplerStalled:
+            raise
         except Exception as e:
             print(f"NVML Error: {e}")
         return gpu_list
@@ -250,9 +287,7 @@ class GPUMonitor:
         """使用nvidia-smi CSV格式作为备用方法 (增加 LUID 智能匹配)"""
         gpu_list = []
         try:
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = subprocess.SW_HIDE
+            startupinfo = _hidden_startupinfo()
 
             # 1. 先获取 GPU 列表和基础占用
             cmd_gpu = "nvidia-smi --query-gpu=index,name,memory.total,memory.used --format=csv,noheader,nounits"
@@ -260,11 +295,12 @@ class GPUMonitor:
             
             if not output_gpu.strip(): return []
             
-            windows_proc_mem_by_luid = GPUMonitor.get_gpu_process_memory_windows() if sys.platform == 'win32' else {}
+            windows_proc_mem_by_luid = get_backend().gpu_process_memory()
             luid_totals = {luid: sum(procs.values()) for luid, procs in windows_proc_mem_by_luid.items()}
             
             gpu_procs_map = {}
             def collect_procs(cmd):
+                rows = []
                 try:
                     out = subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL, timeout=5, startupinfo=startupinfo).decode('utf-8', errors='ignore')
                     for line in out.strip().split('\n'):
@@ -275,14 +311,20 @@ class GPUMonitor:
                                 g_idx = int(parts[0])
                                 pid = int(parts[1])
                                 mem_str = parts[-1].lower().replace('mib', '').replace('mb', '').strip()
-                                mem_val = int(mem_str) * 1024 * 1024
-                                if g_idx not in gpu_procs_map: gpu_procs_map[g_idx] = {}
-                                gpu_procs_map[g_idx][pid] = gpu_procs_map[g_idx].get(pid, 0) + mem_val
+                                rows.append((g_idx, pid, int(mem_str) * 1024 * 1024))
                             except: continue
                 except: pass
-
-            collect_procs("nvidia-smi --query-compute-apps=gpu_index,pid,process_name,used_memory --format=csv,noheader")
-            collect_procs("nvidia-smi --query-graphics-apps=gpu_index,pid,process_name,used_memory --format=csv,noheader")
+                return rows
+
+            # 计算类与图形类进程查询互不依赖，并发执行，结果在主线程合并
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                for rows in pool.map(collect_procs, [
+                    "nvidia-smi --query-compute-apps=gpu_index,pid,process_name,used_memory --format=csv,noheader",
+                    "nvidia-smi --query-graphics-apps=gpu_index,pid,process_name,used_memory --format=csv,noheader",
+                ]):
+                    for g_idx, pid, mem_val in rows:
+                        if g_idx not in gpu_procs_map: gpu_procs_map[g_idx] = {}
+                        gpu_procs_map[g_idx][pid] = gpu_procs_map[g_idx].get(pid, 0) + mem_val
 
             gpu_lines = output_gpu.strip().split('\n')
             for line in gpu_lines:
@@ -329,9 +371,11 @@ class GPUMonitor:
         if sys.platform != 'win32': return []
         
         try:
-            # 1. 通过 WMI 获取显卡列表
-            cmd = "wmic path Win32_VideoController get Name, AdapterRAM /format:csv"
-            output = subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL, timeout=5).decode('utf-8', errors='ignore')
+            # 1. 通过 WMI 获取显卡列表 (显卡列表与 AdapterRAM 在运行期间不变，只查询一次)
+            if GPUMonitor._wmi_adapters is None:
+                cmd = "wmic path Win32_VideoController get Name, AdapterRAM /format:csv"
+                GPUMonitor._wmi_adapters = subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL, timeout=5, startupinfo=_hidden_startupinfo()).decode('utf-8', errors='ignore')
+            output = GPUMonitor._wmi_adapters
             
             # 2. 获取 LUID 数据（通用，含核显）
             windows_proc_mem_by_luid = GPUMonitor.get_gpu_process_memory_windows()
@@ -381,34 +425,58 @@ class GPUMonitor:
                     'processes': windows_proc_mem_by_luid.get(best_luid, {}) if best_luid else {},
                     'method': f'wmi-igpu (luid:{best_luid or "none"})'
                 })
+        except SamplerStalled:
+            raise
         except:
             pass
         return gpu_list
 
+    # 各数据源的截止时间 (秒)，超时的源沿用上一次结果并标记为 stale
+    SOURCE_DEADLINES = {'xml': 2.0, 'nvml': 1.0, 'generic': 1.0}
+    _fanout = None
+
+    @staticmethod
+    def _get_fanout():
+        if GPUMonitor._fanout is None:
+            GPUMonitor._fanout = DeadlineFanout(max_workers=3, name='gpu-source')
+        return GPUMonitor._fanout
+
+    @staticmethod
+    def prefetch_gpu_info(is_silent=False):
+        """提前把各 GPU 数据源提交到线程池，让它们与进程采集并行执行"""
+        GPUMonitor._get_fanout().submit([
+            ('xml', lambda: GPUMonitor.get_gpu_info_xml(is_silent)),
+            ('nvml', GPUMonitor.get_nvidia_gpu_info),
+            ('generic', lambda: get_backend().generic_gpu_info()),
+        ])
+
+    @staticmethod
+    def _mark_stale(gpus, result):
+        if not result.stale:
+            return gpus
+        return [dict(g, stale=True) for g in gpus]
+
     @staticmethod
     def get_gpu_info(is_silent=False):
         """
         获取所有GPU信息，支持 NVIDIA 独显、Intel/AMD 核显等。
-        优先级：
-        1. NVIDIA 独显专用方案 (nvidia-smi / pynvml)
-        2. Windows WMI + 性能计数器方案 (适配核显)
+        所有数据源并发查询，各自有截止时间，合并时取按时返回的结果，其余沿用上次结果并标记 stale。
+        合并优先级：
+        1. NVIDIA 独显专用方案 (nvidia-smi XML，缺失时使用 pynvml)
+        2. 平台通用方案 (Windows WMI + 性能计数器 / Linux DRM，适配核显)
         """
         all_gpus = []
         try:
-            # 1. 尝试获取 NVIDIA 独显信息
-            nvidia_gpus = []
-            try:
-                nvidia_gpus = GPUMonitor.get_gpu_info_xml(is_silent)
-                if not nvidia_gpus:
-                    nvidia_gpus = GPUMonitor.get_nvidia_gpu_info()
-            except: 
-                pass
-            
-            all_gpus.extend(nvidia_gpus)
+            GPUMonitor.prefetch_gpu_info(is_silent)
+            results = GPUMonitor._get_fanout().collect(GPUMonitor.SOURCE_DEADLINES, default=[])
+
+            # 1. NVIDIA 独显信息
+            nvidia_result = results['xml'] if results['xml'].value else results['nvml']
+            all_gpus.extend(GPUMonitor._mark_stale(nvidia_result.value or [], nvidia_result))
             
-            # 2. 尝试获取核显或其他显卡信息
-            generic_gpus = GPUMonitor.get_generic_gpu_info()
-            for g in generic_gpus:
+            # 2. 核显或其他显卡信息
+            generic_result = results['generic']
+            for g in GPUMonitor._mark_stale(generic_result.value or [], generic_result):
                 # 修正去重逻辑：检查当前显卡名是否已在 all_gpus 中
                 is_duplicate = any(g['name'].lower() == eg['name'].lower() for eg in all_gpus)
                 is_nvidia = "NVIDIA" in g['name'].upper()
@@ -425,34 +493,46 @@ import ctypes
 from ctypes import wintypes
 
 _proc_description_cache = {}
-_proc_root_cache = {}
-
-def get_window_title_windows(pid):
-    """获取进程主窗口的标题"""
+# 进程名驻留表，供列式进程表使用
+_name_table = NameTable()
+
+# 名称解析缓存：(pid, create_time) -> (exe_path, 进程名)，PID 复用时 create_time 不同，不会串号
+_NAME_CACHE_SIZE = 4096
+_proc_name_cache = OrderedDict()
+# 每个 tick 一次 EnumWindows 扫描得到的 pid -> 窗口标题
+_window_title_map = {}
+
+def refresh_window_titles():
+    """一次 EnumWindows 扫描构建 pid -> 主窗口标题映射，每个 tick 调用一次"""
+    global _window_title_map
+    if sys.platform != 'win32':
+        _window_title_map = {}
+        return _window_title_map
+    titles = {}
     try:
-        # 这种方式比较轻量，虽然不一定能抓到所有窗口，但对 App 很有效
         WNDENUMPROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
-        titles = []
-        
+        user32 = ctypes.windll.user32
+        lpdw_pid = wintypes.DWORD()
+
         def enum_windows_proc(hwnd, lparam):
-            if not ctypes.windll.user32.IsWindowVisible(hwnd): return True
-            lpdw_pid = wintypes.DWORD()
-            ctypes.windll.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(lpdw_pid))
-            if lpdw_pid.value == lparam:
-                length = ctypes.windll.user32.GetWindowTextLengthW(hwnd)
-                if length > 0:
-                    buf = ctypes.create_unicode_buffer(length + 1)
-                    ctypes.windll.user32.GetWindowTextW(hwnd, buf, length + 1)
-                    titles.append(buf.value)
+            if not user32.IsWindowVisible(hwnd): return True
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(lpdw_pid))
+            pid = lpdw_pid.value
+            # 与逐进程扫描保持一致：每个进程只取遇到的第一个有标题的可见窗口
+            if pid in titles: return True
+            length = user32.GetWindowTextLengthW(hwnd)
+            if length > 0:
+                buf = ctypes.create_unicode_buffer(length + 1)
+                user32.GetWindowTextW(hwnd, buf, length + 1)
+                titles[pid] = buf.value
             return True
-        
-        ctypes.windll.user32.EnumWindows(WNDENUMPROC(enum_windows_proc), pid)
-        return titles[0] if titles else None
-    except: return None
 
-def get_file_description_windows(path):
-    """获取文件属性里的描述信息"""
-    if not path or not os.path.exists(path): return None
+        user32.EnumWindows(WNDENUMPROC(enum_windows_proc), 0)
+    except: pass
+    _window_title_map = titles
+    return titles
+
+def _read_file_description_windows(path):
     try:
         dwLen = ctypes.windll.version.GetFileVersionInfoSizeW(path, None)
         if dwLen == 0: return None
@@ -468,14 +548,55 @@ def get_file_description_windows(path):
     except: pass
     return None
 
-def get_process_name_extended(pid):
-    """获取进程的扩展名称 (窗口标题 > 文件描述 > 进程名)"""
+def get_file_description_windows(path):
+    """获取文件属性里的描述信息 (按路径缓存，文件 mtime 变化时失效)"""
+    if not path: return None
     try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    cached = _proc_description_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    desc = _read_file_description_windows(path)
+    _proc_description_cache[path] = (mtime, desc)
+    return desc
+
+def _resolve_static_name(pid, create_time):
+    """解析不随时间变化的部分 (exe 路径 + 进程名)，按 (pid, create_time) 做 LRU 缓存"""
+    p = None
+    if create_time is None:
         p = psutil.Process(pid)
+        create_time = p.create_time()
+    key = (pid, create_time)
+    cached = _proc_name_cache.get(key)
+    if cached is not None:
+        _proc_name_cache.move_to_end(key)
+        return cached
+    try:
+        p = p or psutil.Process(pid)
         exe_path = p.exe()
+        name = p.name()
+        entry = (exe_path, name[:-4] if name.lower().endswith('.exe') else name)
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        raise
+    except Exception:
+        # 无权限读取 exe 的进程，同样缓存结果，避免每个 tick 重复失败
+        entry = (None, None)
+    _proc_name_cache[key] = entry
+    if len(_proc_name_cache) > _NAME_CACHE_SIZE:
+        _proc_name_cache.popitem(last=False)
+    return entry
+
+def get_process_name_extended(pid, create_time=None):
+    """获取进程的扩展名称 (窗口标题 > 文件描述 > 进程名)"""
+    try:
+        exe_path, name = _resolve_static_name(pid, create_time)
+        if name is None:
+            return f"PID {pid}"
         
-        # 1. 窗口标题
-        win_title = get_window_title_windows(pid)
+        # 1. 窗口标题 (来自本 tick 的 EnumWindows 扫描结果)
+        win_title = _window_title_map.get(pid)
         if win_title: return win_title
         
         # 2. 文件描述
@@ -483,90 +604,82 @@ def get_process_name_extended(pid):
         if file_desc: return file_desc
         
         # 3. 进程名 (去掉 .exe)
-        name = p.name()
-        return name[:-4] if name.lower().endswith('.exe') else name
+        return name
     except:
         return f"PID {pid}"
 
-def get_memory_data(show_free=True, show_gpu_free=True, show_gpu_used=True, lang='zh', view_mode='process', is_silent=False):
-    vm = psutil.virtual_memory(); t = I18N[lang]; root_items = []
-    total_used_bytes = vm.total - vm.available
-    if show_free: root_items.append(TreeMapItem(t['free_mem'], vm.available, "free"))
+def build_memory_items(snapshot, show_free=True, lang='zh', view_mode='process', memory_metric='private', sample_budget_ms=20):
+    """
+    内存部分 (可用内存 + 系统内存下的进程 / 程序组)，只依赖本 tick 的快照，不等待任何 GPU 数据源。
+    会把快照的增量应用到进程树，因此同一个快照只能调用一次。
+    """
+    backend = get_backend()
+    sys_mem = snapshot.memory; t = I18N[lang]; root_items = []
+    total_used_bytes = sys_mem['total'] - sys_mem['available']
+    if show_free: root_items.append(TreeMapItem(t['free_mem'], sys_mem['available'], "free"))
     sys_group = TreeMapItem(t['sys_mem'], total_used_bytes, "system")
-    procs = []; total_proc_private = 0
-    
-    # 获取桌面壳层 PID 作为溯源终点
-    explorer_pid = None
-    for p in psutil.process_iter(['pid', 'name']):
-        if p.info['name'].lower() == 'explorer.exe':
-            explorer_pid = p.info['pid']; break
-
-    # 1. 采集基础数据
-    pid_map = {}
-    for p in psutil.process_iter(['pid', 'name', 'memory_info', 'exe', 'ppid']):
-        time.sleep(0.001)
-        try:
-            m_info = p.info['memory_info']
-            if not m_info: continue
-            m_rss = m_info.rss
-            m_private = getattr(m_info, 'private', m_rss)
-            m_total = m_private
-            
-            if m_total > 2 * 1024 * 1024:
-                pid = p.info['pid']
-                real_name = get_process_name_extended(pid)
-                
-                item = TreeMapItem(real_name, m_total, "system", data={
-                    'pid': pid, 'ppid': p.info.get('ppid'), 'rss': m_rss, 
-                    'vmem': max(0, m_private - m_rss), 'exe_name': p.info['name']
-                })
-                procs.append(item)
-                pid_map[pid] = item
-                total_proc_private += m_private
-        except: continue
+    tree = get_process_tree()
+    tree.apply(snapshot.delta)
 
+    # 获取桌面壳层 PID 作为溯源终点
+    shell_names = backend.shell_process_names
+    records = snapshot.records
+    root_pids = {record.pid for record in records.values() if record.name.lower() in shell_names}
+
+    # 列式进程表：筛选、聚合、Top-N、gap 统计都是向量化运算，只为最终显示的项目创建 TreeMapItem
+    table = ProcessTable.from_records(records.values(), _name_table)
+    if memory_metric in ('pss', 'uss'):
+        # 采样在后台按预算进行，这里只读缓存；还没采样到的进程沿用 RSS
+        sampler = get_unique_sampler()
+        sampler.submit(records.values(), sample_budget_ms)
+        resident = sampler.column(records.values(), memory_metric, table.rss)
+        table.private = resident + table.vmem
+        table.rss = resident
+    procs = table.take(table.private > 2 * 1024 * 1024)
+
+    # 创建视图时按行读取，先整体转成 Python 列表，避免逐个元素访问 NumPy 标量
+    col = procs.to_lists()
+
+    def make_proc_item(row, name):
+        return TreeMapItem(name, col['private'][row], "system", data={
+            'pid': col['pid'][row], 'ppid': col['ppid'][row], 'rss': col['rss'][row], 
+            'vmem': col['vmem'][row], 'shared': col['shared'][row], 'exe_name': procs.names[col['name_id'][row]]
+        })
+
+    # 友好名称 (需要 exe 路径、窗口标题) 只为真正显示出来的进程解析
     if view_mode == 'program':
-        aggregated = {}
-        # 智能溯源算法
-        for p in procs:
-            curr_pid = p.data['pid']
-            family_path = []
-            
-            # 往上找爸爸
-            while True:
-                parent_pid = pid_map[curr_pid].data.get('ppid') if curr_pid in pid_map else None
-                if not parent_pid or parent_pid == explorer_pid or parent_pid not in pid_map:
-                    break
-                if parent_pid in family_path: break # 死循环保护
-                family_path.append(curr_pid)
-                curr_pid = parent_pid
-            
-            # curr_pid 现在是该全家桶的“祖宗”
-            root_item = pid_map.get(curr_pid, p)
-            # 组名用祖宗的友好名称
-            group_key = curr_pid
-            group_name = root_item.data.get('file_desc') or root_item.data.get('exe_name') or root_item.name
-            
-            if group_key not in aggregated:
-                aggregated[group_key] = TreeMapItem(group_name, 0, "system", data={'is_group': True, 'rss': 0, 'vmem': 0})
-            
-            group = aggregated[group_key]
-            group.value += p.value
-            group.data['rss'] += p.data.get('rss', 0)
-            group.data['vmem'] += p.data.get('vmem', 0)
-            
-            # 子项保留自己的名字，但带上 PID
-            p.name = f"{p.name} (PID: {p.data['pid']})"
-            group.children.append(p)
-        final_procs = list(aggregated.values())
+        # 智能溯源算法：只经过参与聚合的进程向上找祖宗，到桌面壳层为止
+        pids = procs.pid.tolist()
+        tree.set_scope(pids, root_pids)
+        family = np.fromiter((tree.root_of(pid) for pid in pids), dtype=np.int64, count=len(pids))
+        group_pids, group_index = procs.group_by(family)
+        n_groups = len(group_pids)
+        group_value = ProcessTable.group_sum(group_index, procs.private, n_groups)
+        group_rss = ProcessTable.group_sum(group_index, procs.rss, n_groups)
+        group_vmem = ProcessTable.group_sum(group_index, procs.vmem, n_groups)
+        # 每个分组的成员按原有顺序连续排列，bounds[g]:bounds[g+1] 即第 g 组的成员
+        members = np.argsort(group_index, kind='stable')
+        bounds = np.searchsorted(group_index[members], np.arange(n_groups + 1))
+        row_of_pid = dict(zip(pids, range(len(pids))))
+
+        top_procs = []
+        for g in top_n(group_value, 150).tolist():
+            root_pid = int(group_pids[g])
+            # 组名用祖宗的进程名
+            group = TreeMapItem(procs.name(row_of_pid[root_pid]), int(group_value[g]), "system", data={
+                'is_group': True, 'root_pid': root_pid, 'rss': int(group_rss[g]), 'vmem': int(group_vmem[g])
+            })
+            for row in members[bounds[g]:bounds[g + 1]].tolist():
+                # 子项保留自己的名字，但带上 PID
+                pid = col['pid'][row]
+                group.children.append(make_proc_item(row, f"{backend.process_display_name(records[pid])} (PID: {pid})"))
+            top_procs.append(group)
     else:
-        final_procs = procs
-
-    final_procs.sort(key=lambda x: x.value, reverse=True)
-    top_procs = final_procs[:150] 
+        top_procs = [make_proc_item(row, backend.process_display_name(records[col['pid'][row]]))
+                     for row in top_n(procs.private, 150).tolist()]
     
     # 此时总占用统计 (基于物理内存 rss 计算 gap)
-    total_rss_allocated = sum(p.data.get('rss', 0) for p in procs)
+    total_rss_allocated = int(procs.rss.sum())
     other_gap = total_used_bytes - total_rss_allocated
     
     if other_gap > 0:
@@ -579,16 +692,20 @@ def get_memory_data(show_free=True, show_gpu_free=True, show_gpu_used=True, lang
     sys_group.data['rss'] = sum(p.data.get('rss', 0) for p in top_procs)
     sys_group.data['vmem'] = sum(p.data.get('vmem', 0) for p in top_procs)
     root_items.append(sys_group)
-
-    # 获取 GPU 数据
+    return root_items
+
+def build_gpu_items(gpu_list, snapshot, show_gpu_free=True, show_gpu_used=True, lang='zh', view_mode='process'):
+    """
+    GPU 部分：由 GPUMonitor.get_gpu_info 的结果构建顶级块，快照只用于解析进程名。
+    :return: (GPU 顶级项目列表, 状态栏显存占用百分比)
+    """
+    backend = get_backend()
+    t = I18N[lang]; root_items = []
     total_gpu_total = 0
     total_gpu_used_corrected = 0
     
     if show_gpu_free or show_gpu_used:
         try:
-            # 传入静默模式标志
-            gpu_list = GPUMonitor.get_gpu_info(is_silent)
-            
             if gpu_list:
                 for gpu_info in gpu_list:
                     g_idx = gpu_info['index']
@@ -605,16 +722,19 @@ def get_memory_data(show_free=True, show_gpu_free=True, show_gpu_used=True, lang
                     display_used_bytes = max(used_bytes, current_proc_sum)
                     total_gpu_used_corrected += display_used_bytes
 
+                    # 数据源超时、沿用上一次结果的显卡，界面上以暗色和 "未更新" 标注
+                    stale = gpu_info.get('stale', False)
+
                     # 1. GPU 可用部分 (顶级块，模仿内存分析)
                     if show_gpu_free and free_bytes > 0:
                         g_free_name = f"{g_name} - {t['gpu_free']}" if len(gpu_list) > 1 else t['gpu_free']
-                        root_items.append(TreeMapItem(g_free_name, free_bytes, "gpu_free"))
+                        root_items.append(TreeMapItem(g_free_name, free_bytes, "gpu_free", data={'stale': True} if stale else None))
                     
                     # 2. GPU 使用部分 (顶级块)
                     if show_gpu_used:
                         g_used_name = f"{g_name} - {t['gpu_used']}" if len(gpu_list) > 1 else t['gpu_used']
                         # TreeMap 绘图依然使用 display_used_bytes (保持原样)
-                        gpu_used_group = TreeMapItem(g_used_name, display_used_bytes, "gpu")
+                        gpu_used_group = TreeMapItem(g_used_name, display_used_bytes, "gpu", data={'stale': stale})
                         
                         # 构建进程列表
                         current_gpu_procs = []
@@ -624,7 +744,8 @@ def get_memory_data(show_free=True, show_gpu_free=True, show_gpu_used=True, lang
                             if isinstance(data, dict) and data.get('name'):
                                 proc_name = os.path.basename(data['name'])
                             if not proc_name:
-                                proc_name = get_process_name_extended(pid)
+                                record = snapshot.records.get(pid)
+                                proc_name = backend.process_display_name(record) if record else get_process_name_extended(pid)
                             current_gpu_procs.append(TreeMapItem(proc_name, used_mem, "gpu", data={'pid': pid}))
                         
                         if view_mode == 'program':
@@ -655,6 +776,9 @@ def get_memory_data(show_free=True, show_gpu_free=True, show_gpu_used=True, lang
                             ))
                         
                         gpu_used_group.children = sorted(final_gpu_procs, key=lambda x: x.value, reverse=True)
+                        if stale:
+                            for p in gpu_used_group.children:
+                                p.data['stale'] = True
                         if gpu_used_group.value > 0:
                             root_items.append(gpu_used_group)
         except Exception as e:
@@ -0,0 +1,107 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class SourceResult:
+    """单个数据源在本轮的结果"""
+    __slots__ = ('name', 'value', 'stale', 'error', 'timestamp')
+
+    def __init__(self, name, value, stale, error=None, timestamp=0.0):
+        self.name = name
+        self.value = value
+        self.stale = stale
+        self.error = error
+        self.timestamp = timestamp
+
+    @property
+    def age(self):
+        return time.time() - self.timestamp if self.timestamp else float('inf')
+
+
+class DeadlineFanout:
+    """
+    多数据源并发查询，每个源有独立的截止时间。
+    - submit() 把各数据源提交到小线程池；上一轮尚未返回的源不会重复提交，避免慢源越积越多；
+      刚完成、还没被 collect() 取走的结果也直接留给下一次 collect()，同一轮重复调用 submit() 不会让源再跑一遍。
+    - collect() 在各自的截止时间内收集结果，超时的源返回上一次的值并标记为 stale，
+      它的任务继续在后台运行，完成后的结果留给下一轮使用。
+    """
+
+    def __init__(self, max_workers=4, name='fanout', reuse_window=5.0):
+        """:param reuse_window: 已完成但未取走的结果在提交后多少秒内仍可直接使用，更旧的会重新查询"""
+        self.reuse_window = reuse_window
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._inflight = {}   # name -> (future, submitted_at)
+        self._last = {}       # name -> (timestamp, value)
+
+    def submit(self, sources):
+        """
+        :param sources: [(name, fn), ...]
+        """
+        now = time.monotonic()
+        with self._lock:
+            for name, fn in sources:
+                entry = self._inflight.get(name)
+                if entry is not None and not entry[0].done():
+                    continue
+                if entry is not None and now - entry[1] < self.reuse_window:
+                    continue
+                if entry is not None:
+                    self._harvest(name, entry[0])
+                self._inflight[name] = (self._executor.submit(fn), now)
+
+    def _harvest(self, name, future):
+        """把已完成任务的结果记为该源的最新值"""
+        try:
+            self._last[name] = (time.time(), future.result(timeout=0))
+        except Exception:
+            pass
+
+    def collect(self, deadlines, default=None):
+        """
+        :param deadlines: {name: 截止秒数 (从提交时刻算起)}
+        :return: {name: SourceResult}
+        """
+        results = {}
+        for name, deadline in deadlines.items():
+            with self._lock:
+                entry = self._inflight.get(name)
+            if entry is None:
+                results[name] = self._stale(name, default)
+                continue
+            future, submitted_at = entry
+            remaining = max(0.0, submitted_at + deadline - time.monotonic())
+            try:
+                value = future.result(timeout=remaining)
+            except FutureTimeout:
+                results[name] = self._stale(name, default)
+                continue
+            except Exception as e:
+                with self._lock:
+                    if self._inflight.get(name) is entry:
+                        del self._inflight[name]
+                results[name] = self._stale(name, default, error=e)
+                continue
+            ts = time.time()
+            with self._lock:
+                self._last[name] = (ts, value)
+                if self._inflight.get(name) is entry:
+                    del self._inflight[name]
+            results[name] = SourceResult(name, value, False, timestamp=ts)
+        return results
+
+    def run(self, sources, deadlines, default=None):
+        self.submit(sources)
+        return self.collect(deadlines, default)
+
+    def _stale(self, name, default, error=None):
+        with self._lock:
+            last = self._last.get(name)
+        if last is None:
+            return SourceResult(name, default, True, error=error)
+        return SourceResult(name, last[1], True, error=error, timestamp=last[0])
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,289 @@
+import sys
+import time
+import atexit
+import threading
+import subprocess
+from collections import deque
+
+
+def _default_spawn(cmd):
+    """启动长驻子进程，stdout 按行读取"""
+    kwargs = {}
+    if sys.platform == 'win32':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        startupinfo.wShowWindow = subprocess.SW_HIDE
+        kwargs['startupinfo'] = startupinfo
+        kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW | 0x00004000  # BELOW_NORMAL_PRIORITY_CLASS
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                            text=True, encoding='utf-8', errors='ignore', bufsize=1, **kwargs)
+
+
+class XmlDocumentFramer:
+    """把 `nvidia-smi -q -x -l` 的连续输出切分成一个个完整的 XML 文档"""
+
+    def __init__(self, end_tag='</nvidia_smi_log>'):
+        self.end_tag = end_tag
+        self._lines = []
+
+    def feed(self, line):
+        self._lines.append(line)
+        if self.end_tag in line:
+            frame = ''.join(self._lines)
+            self._lines = []
+            return frame
+        return None
+
+    def reset(self):
+        self._lines = []
+
+
+class MarkerFramer:
+    """以单独一行的分隔标记结束一帧 (用于 PowerShell Get-Counter -Continuous)"""
+
+    def __init__(self, marker='---'):
+        self.marker = marker
+        self._lines = []
+
+    def feed(self, line):
+        if line.strip() == self.marker:
+            frame = ''.join(self._lines)
+            self._lines = []
+            return frame
+        self._lines.append(line)
+        return None
+
+    def reset(self):
+        self._lines = []
+
+
+class SamplerStalled(RuntimeError):
+    """采样器产出过帧，但最新一帧已超过 max_frame_age (子进程挂起)；数据源据此让上层沿用旧值并标记 stale"""
+
+
+class StreamSampler:
+    """
+    长驻子进程采样器。
+    一个读线程持续读取子进程输出，按帧写入环形缓冲区；消费方 (DataWorker) 通过 latest() 非阻塞地取最新一帧。
+    - 失败重启：子进程退出后按指数退避重启；连续 max_failures 次没有产出任何帧则判定不可用。
+    - 停滞看门狗：给定采样间隔 interval 时，超过 stall_intervals 个间隔没有新帧 (子进程活着但不再输出)
+      即视为挂起，消费方下一次读取时杀掉子进程，由读线程按失败重启的流程拉起新的。
+    - 背压：缓冲区满时丢弃最旧的帧；原始帧只有在被消费时才解析，消费慢于产出时多余的帧不付出解析成本。
+    - spawn 可替换为脚本化的假进程 (需提供 stdout 行迭代、poll()、kill()、wait())，便于在无 GPU 的机器上测试。
+    """
+
+    def __init__(self, name, cmd, framer, parser=None, spawn=None, maxlen=8,
+                 restart_delay=1.0, max_restart_delay=60.0, max_failures=5, interval=None, stall_intervals=3):
+        self.name = name
+        self.cmd = cmd
+        self.framer = framer
+        self.parser = parser
+        self.spawn = spawn or _default_spawn
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.max_failures = max_failures
+        # 超过该秒数没有新帧：latest(max_frame_age) 返回 None，看门狗重启子进程
+        self.max_frame_age = interval * stall_intervals if interval else None
+
+        self._buffer = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread = None
+        self._proc = None
+        self._seq = 0
+        self._parsed = (None, None)  # (seq, result)
+        self._last_activity = time.monotonic()   # 最近一次启动子进程或收到帧的时刻
+
+        self.available = True
+        self.failures = 0
+        self.restarts = 0
+        self.dropped = 0
+        self.stalls = 0
+
+    # ---------------- 生命周期 ----------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self.available = True
+        self._thread = threading.Thread(target=self._run, name=f"sampler-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._kill_proc()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def _kill_proc(self):
+        proc = self._proc
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait(timeout=2)
+        except Exception:
+            pass
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            # 唤醒 wait_for_frame，避免采样器不可用时调用方白等到超时
+            with self._lock:
+                self._new_frame.notify_all()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            produced = False
+            self._last_activity = time.monotonic()
+            try:
+                self._proc = self.spawn(self.cmd)
+            except (FileNotFoundError, PermissionError):
+                # 可执行文件不存在：重启也无济于事
+                self.available = False
+                break
+            except Exception:
+                self._proc = None
+            if self._proc is not None:
+                self.framer.reset()
+                try:
+                    for line in self._proc.stdout:
+                        if self._stop.is_set():
+                            break
+                        frame = self.framer.feed(line)
+                        if frame is not None:
+                            self._push(frame)
+                            produced = True
+                except Exception:
+                    pass
+                self._kill_proc()
+            if self._stop.is_set():
+                break
+
+            self.failures = 0 if produced else self.failures + 1
+            if self.failures >= self.max_failures:
+                self.available = False
+                break
+            self.restarts += 1
+            delay = min(self.max_restart_delay, self.restart_delay * (2 ** self.failures))
+            self._stop.wait(delay)
+
+    def _push(self, frame):
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._seq += 1
+            self._buffer.append((self._seq, time.time(), frame))
+            self._last_activity = time.monotonic()
+            self._new_frame.notify_all()
+
+    def _check_stall(self):
+        """看门狗：子进程仍在运行却长时间没有输出时杀掉它，读线程随后重启"""
+        if self.max_frame_age is None or time.monotonic() - self._last_activity <= self.max_frame_age:
+            return
+        proc = self._proc
+        if proc is None or proc.poll() is not None:
+            return
+        self.stalls += 1
+        self._last_activity = time.monotonic()
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+    # ---------------- 消费端 ----------------
+    def latest_raw(self, max_age=None):
+        """返回最新的原始帧 (seq, timestamp, text)，没有或已过期时返回 None，永不阻塞"""
+        self._check_stall()
+        with self._lock:
+            if not self._buffer:
+                return None
+            entry = self._buffer[-1]
+        if max_age is not None and time.time() - entry[1] > max_age:
+            return None
+        return entry
+
+    def latest(self, max_age=None):
+        """返回最新一帧的解析结果；同一帧只解析一次"""
+        entry = self.latest_raw(max_age)
+        if entry is None:
+            return None
+        seq, _, frame = entry
+        cached_seq, cached = self._parsed
+        if cached_seq == seq:
+            return cached
+        result = self.parser(frame) if self.parser else frame
+        self._parsed = (seq, result)
+        return result
+
+    def wait_for_frame(self, timeout):
+        """等待第一帧到达 (只应在启动阶段调用一次)"""
+        with self._lock:
+            if not self._buffer and self.available:
+                self._new_frame.wait(timeout)
+            return bool(self._buffer)
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'available': self.available,
+            'running': self.is_running(),
+            'frames': self._seq,
+            'buffered': len(self._buffer),
+            'dropped': self.dropped,
+            'restarts': self.restarts,
+            'stalls': self.stalls,
+        }
+
+
+# ---------------------------------------------------------
+# 内置采样源
+# ---------------------------------------------------------
+NVIDIA_SMI_INTERVAL_MS = 2000
+GPU_COUNTER_INTERVAL_S = 5
+
+GPU_COUNTER_SCRIPT = (
+    "Get-Counter '\\GPU Process Memory(*)\\Local Usage' -Continuous -SampleInterval %d -ErrorAction SilentlyContinue | "
+    "ForEach-Object { foreach ($s in $_.CounterSamples) { [Console]::Out.WriteLine($s.Path + ' : ' + $s.CookedValue) }; "
+    "[Console]::Out.WriteLine('---'); [Console]::Out.Flush() }"
+) % GPU_COUNTER_INTERVAL_S
+
+def nvidia_smi_sampler(parser=None, spawn=None, interval_ms=NVIDIA_SMI_INTERVAL_MS):
+    """一个长驻的 `nvidia-smi -q -x -lms N` 子进程，每帧是一份完整的 XML 文档"""
+    return StreamSampler('nvidia-smi', ['nvidia-smi', '-q', '-x', '-lms', str(interval_ms)],
+                         XmlDocumentFramer(), parser=parser, spawn=spawn, interval=interval_ms / 1000.0)
+
+def gpu_counter_sampler(parser=None, spawn=None):
+    """一个长驻的 PowerShell `Get-Counter -Continuous` 子进程 (Windows 进程显存计数器)"""
+    return StreamSampler('gpu-counter', ['powershell', '-NoProfile', '-WindowStyle', 'Hidden', '-Command', GPU_COUNTER_SCRIPT],
+                         MarkerFramer(), parser=parser, spawn=spawn, interval=GPU_COUNTER_INTERVAL_S)
+
+
+_samplers = {}
+_samplers_lock = threading.Lock()
+
+def get_sampler(name, factory):
+    """按名称获取 (必要时创建并启动) 进程级共享的采样器"""
+    with _samplers_lock:
+        sampler = _samplers.get(name)
+        if sampler is None:
+            sampler = factory().start()
+            _samplers[name] = sampler
+        return sampler
+
+def stop_all_samplers():
+    """退出时终止所有长驻子进程"""
+    with _samplers_lock:
+        samplers = list(_samplers.values())
+        _samplers.clear()
+    for sampler in samplers:
+        sampler.stop()
+
+atexit.register(stop_all_samplers)
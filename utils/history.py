@@ -0,0 +1,242 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 每个序列记录的列
+COLUMNS = ('rss', 'vmem', 'gpu')
+
+# 分层降采样：第 0 层保存原始采样 (默认刷新间隔下约 2 秒一个点)，
+# 之后每层按固定时间桶取平均；(桶宽秒数, 容量)
+TIERS = ((0, 300), (60, 180), (600, 144))
+
+# 序列的初始容量，按需倍增到层容量；短命进程只占很少的内存
+_INITIAL_CAPACITY = 16
+
+
+class RingBuffer:
+    """定长环形缓冲：时间戳与数值各一个 NumPy 数组，追加 O(1)，按时间区间查询用二分"""
+    __slots__ = ('capacity', 'times', 'values', 'start', 'size')
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        n = min(capacity, _INITIAL_CAPACITY)
+        self.times = np.empty(n, dtype=np.float64)
+        self.values = np.empty((n, width), dtype=np.float64)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, row):
+        n = len(self.times)
+        if self.size == n and n < self.capacity:
+            # 数组未满容量时倍增 (此时 start 必然为 0，数据是连续的)
+            grow = min(self.capacity, n * 2)
+            self.times = np.resize(self.times, grow)
+            self.values = np.resize(self.values, (grow, self.values.shape[1]))
+            n = grow
+        if self.size < n:
+            idx = (self.start + self.size) % n
+            self.size += 1
+        else:
+            # 已满：覆盖最旧的一项
+            idx = self.start
+            self.start = (self.start + 1) % n
+        self.times[idx] = timestamp
+        self.values[idx] = row
+
+    def first_time(self):
+        return self.times[self.start] if self.size else None
+
+    def last_time(self):
+        return self.times[(self.start + self.size - 1) % len(self.times)] if self.size else None
+
+    def _ordered(self):
+        end = self.start + self.size
+        n = len(self.times)
+        if end <= n:
+            return self.times[self.start:end], self.values[self.start:end]
+        wrap = end - n
+        return (np.concatenate((self.times[self.start:], self.times[:wrap])),
+                np.concatenate((self.values[self.start:], self.values[:wrap])))
+
+    def range(self, t0=None, t1=None):
+        """[t0, t1) 内的 (时间戳数组, 数值数组)，按时间升序"""
+        times, values = self._ordered()
+        lo = 0 if t0 is None else np.searchsorted(times, t0, side='left')
+        hi = len(times) if t1 is None else np.searchsorted(times, t1, side='left')
+        return times[lo:hi], values[lo:hi]
+
+
+class TieredSeries:
+    """
+    单个对象 (进程或程序组) 的分层历史。
+    原始采样进入第 0 层；同时累加到各粗粒度层的当前时间桶，时间桶结束时写入桶内平均值。
+    """
+    __slots__ = ('tiers', '_buckets', 'last_seen', 'name')
+
+    def __init__(self, width=len(COLUMNS)):
+        self.tiers = [RingBuffer(capacity, width) for _, capacity in TIERS]
+        # 每个粗粒度层当前桶：[桶编号, 累加值, 样本数]
+        self._buckets = [None] * len(TIERS)
+        self.last_seen = 0.0
+        # 显示名称，只作为元数据 (程序组的名称可能是会变化的窗口标题)
+        self.name = None
+
+    def append(self, timestamp, row):
+        self.last_seen = timestamp
+        self.tiers[0].append(timestamp, row)
+        buckets = self._buckets
+        for level in range(1, len(TIERS)):
+            width = TIERS[level][0]
+            bucket_id = timestamp // width
+            bucket = buckets[level]
+            if bucket is None or bucket[0] != bucket_id:
+                if bucket is not None:
+                    count = bucket[2]
+                    self.tiers[level].append(bucket[0] * width, [v / count for v in bucket[1]])
+                buckets[level] = [bucket_id, list(row), 1]
+            else:
+                # 逐个标量累加比小数组运算快得多 (每个 tick 有上千个序列)
+                acc = bucket[1]
+                for i, v in enumerate(row):
+                    acc[i] += v
+                bucket[2] += 1
+
+    def query(self, t0=None, t1=None):
+        """
+        [t0, t1) 内的历史，从细到粗拼接：细层覆盖不到的更早部分由下一层补上。
+        :return: (时间戳数组, (n, 列数) 数组)
+        """
+        parts = []
+        end = t1
+        for ring in self.tiers:
+            first = ring.first_time()
+            if first is None:
+                continue
+            if end is not None and first >= end:
+                continue
+            times, values = ring.range(t0, end)
+            if len(times):
+                parts.append((times, values))
+            if t0 is not None and first <= t0:
+                break
+            end = first
+        if not parts:
+            return np.empty(0), np.empty((0, len(COLUMNS)))
+        parts.reverse()
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def nbytes(self):
+        return sum(r.times.nbytes + r.values.nbytes for r in self.tiers)
+
+
+class HistoryStore:
+    """
+    内存中的时间序列历史，键为 ('proc', pid, create_time) 或 ('group', 根进程 pid, 根进程 create_time)。
+    程序组按根进程区分：同名的两个进程树 (两个独立的 chrome、都叫 Electron 的应用) 各有自己的序列，
+    组名 (Windows 下可能是窗口标题) 变化也不会把序列拆开；组名记录在序列的 name 中。
+    已经消失的对象保留一段时间以便回看，序列总数超过上限时淘汰最久未更新的。
+    """
+
+    def __init__(self, max_series=4000):
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, key):
+        return key in self._series
+
+    def append(self, key, timestamp, row):
+        self._append_rows(timestamp, {key: row})
+
+    def _append_rows(self, timestamp, rows, names=None):
+        with self._lock:
+            series_map = self._series
+            for key, row in rows.items():
+                series = series_map.get(key)
+                if series is None:
+                    series = series_map[key] = TieredSeries()
+                else:
+                    series_map.move_to_end(key)
+                series.append(timestamp, row)
+                if names:
+                    series.name = names.get(key, series.name)
+            # 已经消失的对象不再被 move_to_end，自然排在前面先被淘汰
+            while len(series_map) > self.max_series:
+                series_map.popitem(last=False)
+
+    def record(self, timestamp, snapshot_records, root_items):
+        """
+        记录一个 tick：所有存活进程的 rss / vmem，树图中 GPU 进程的显存，以及各程序组的合计。
+        :param snapshot_records: {pid: ProcessRecord}
+        :param root_items: 本 tick 的顶层项目 (build_memory_items + build_gpu_items)
+        """
+        gpu = {}
+        groups = {}
+        for root in root_items:
+            for item in root.children:
+                data = item.data
+                if root.type == 'gpu':
+                    members = item.children if data.get('is_group') else [item]
+                    for member in members:
+                        pid = member.data.get('pid')
+                        if pid is not None:
+                            gpu[pid] = gpu.get(pid, 0) + member.value
+                elif data.get('is_group'):
+                    leader = snapshot_records.get(data.get('root_pid'))
+                    if leader is not None:
+                        key = ('group', leader.pid, leader.create_time)
+                        groups[key] = (item.name, data.get('rss', 0), data.get('vmem', 0))
+        rows = {}
+        for pid, record in snapshot_records.items():
+            rows[('proc', pid, record.create_time)] = (record.rss, record.vmem, gpu.get(pid, 0))
+        names = {}
+        for key, (name, rss, vmem) in groups.items():
+            rows[key] = (rss, vmem, 0)
+            names[key] = name
+        self._append_rows(timestamp, rows, names)
+
+    def query(self, key, t0=None, t1=None, column=None):
+        """
+        :param column: 列名 (见 COLUMNS)；None 时返回全部列
+        :return: (时间戳数组, 数值数组)；没有记录时为空数组
+        """
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                times, values = np.empty(0), np.empty((0, len(COLUMNS)))
+            else:
+                times, values = series.query(t0, t1)
+        if column is not None:
+            values = values[:, COLUMNS.index(column)]
+        return times, values
+
+    def name(self, key):
+        """序列最近一次记录的显示名称"""
+        with self._lock:
+            series = self._series.get(key)
+            return series.name if series is not None else None
+
+    def keys(self, kind=None):
+        with self._lock:
+            return [k for k in self._series if kind is None or k[0] == kind]
+
+    def nbytes(self):
+        with self._lock:
+            return sum(s.nbytes() for s in self._series.values())
+
+
+_store = None
+
+def get_history_store():
+    """进程级共享的历史存储 (worker 写入，界面读取)"""
+    global _store
+    if _store is None:
+        _store = HistoryStore()
+    return _store
@@ -0,0 +1,294 @@
+import os
+import time
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import psutil
+
+from utils.treemap_logic import TreeMapItem
+from utils.process_tree import get_process_tree
+from config import I18N
+
+# 映射类型：堆、线程栈、匿名内存、映射文件、共享库 (.so / .dll)
+KIND_HEAP, KIND_STACK, KIND_ANON, KIND_FILE, KIND_LIB = 'heap', 'stack', 'anon', 'file', 'lib'
+KINDS = (KIND_HEAP, KIND_STACK, KIND_ANON, KIND_FILE, KIND_LIB)
+
+# 单个映射区段 (字节)；psutil 后备路径拿不到的字段为 0
+MapRegion = namedtuple('MapRegion', 'path kind size rss pss private shared swap')
+
+_SMAPS_FIELDS = {
+    b'Size': 'size', b'Rss': 'rss', b'Pss': 'pss', b'Swap': 'swap',
+    b'Private_Clean': 'private', b'Private_Dirty': 'private',
+    b'Shared_Clean': 'shared', b'Shared_Dirty': 'shared',
+}
+_LIB_SUFFIXES = ('.so', '.dll', '.dylib', '.pyd', '.drv', '.ocx')
+
+
+def classify(path):
+    """按映射路径判断类型"""
+    if not path:
+        return KIND_ANON
+    if path.startswith('['):
+        if path == '[heap]':
+            return KIND_HEAP
+        if path.startswith('[stack'):
+            return KIND_STACK
+        # [anon:...]、[vdso]、[vvar] 等内核/匿名区段
+        return KIND_ANON
+    base = os.path.basename(path.replace('\\', '/')).lower()
+    if base.endswith(' (deleted)'):
+        base = base[:-10]
+    if base.endswith(_LIB_SUFFIXES) or '.so.' in base:
+        return KIND_LIB
+    return KIND_FILE
+
+
+def _is_header(line):
+    """smaps 中每个区段以 "起始-结束 权限 偏移 设备 inode [路径]" 开头，字段行则是 "名称: 值" """
+    head = line.split(b' ', 1)[0]
+    return b'-' in head and not head.endswith(b':')
+
+
+def iter_smaps(pid, proc_root='/proc'):
+    """
+    流式解析 /proc/<pid>/smaps：逐行读取，每读完一个区段产出一个 MapRegion，
+    几万个映射的进程也不需要把整个文件读入内存。
+    """
+    with open(f'{proc_root}/{pid}/smaps', 'rb') as f:
+        path = None
+        values = None
+        for line in f:
+            if _is_header(line):
+                if path is not None:
+                    yield MapRegion(path, classify(path), **values)
+                parts = line.split(None, 5)
+                path = parts[5].strip().decode('utf-8', errors='replace') if len(parts) > 5 else ''
+                values = dict.fromkeys(('size', 'rss', 'pss', 'private', 'shared', 'swap'), 0)
+                continue
+            if path is None:
+                continue
+            key, _, rest = line.partition(b':')
+            field = _SMAPS_FIELDS.get(key)
+            if field is not None:
+                values[field] += int(rest.split()[0]) * 1024
+        if path is not None:
+            yield MapRegion(path, classify(path), **values)
+
+
+def iter_psutil_maps(pid):
+    """后备路径 (Windows / macOS / 读不到 smaps)：psutil 按路径聚合的映射"""
+    for m in psutil.Process(pid).memory_maps(grouped=True):
+        path = m.path or ''
+        rss = getattr(m, 'rss', 0)
+        private = getattr(m, 'private', None)
+        if private is None:
+            private = getattr(m, 'private_clean', 0) + getattr(m, 'private_dirty', 0)
+        shared = getattr(m, 'shared_clean', 0) + getattr(m, 'shared_dirty', 0)
+        yield MapRegion(path, classify(path), getattr(m, 'size', rss), rss,
+                        getattr(m, 'pss', rss), private, shared, getattr(m, 'swap', 0))
+
+
+def iter_memory_maps(pid, proc_root='/proc'):
+    """优先使用 smaps 流式解析，不可用时退回 psutil"""
+    if os.path.exists(f'{proc_root}/{pid}/smaps'):
+        try:
+            yield from iter_smaps(pid, proc_root)
+            return
+        except PermissionError:
+            pass
+    yield from iter_psutil_maps(pid)
+
+
+class MemoryMap:
+    """一个进程的映射明细，按 (类型, 路径) 聚合"""
+
+    def __init__(self, pid, create_time):
+        self.pid = pid
+        self.create_time = create_time
+        self.timestamp = time.time()
+        self.entries = {}   # (kind, path) -> [size, rss, pss, private, shared, swap]
+        self.regions = 0
+
+    def add(self, region):
+        self.regions += 1
+        entry = self.entries.get((region.kind, region.path))
+        if entry is None:
+            self.entries[(region.kind, region.path)] = list(region[2:])
+        else:
+            for i, v in enumerate(region[2:]):
+                entry[i] += v
+
+    def totals(self):
+        """{kind: [size, rss, pss, private, shared, swap]}"""
+        result = {}
+        for (kind, _), values in self.entries.items():
+            total = result.setdefault(kind, [0] * 6)
+            for i, v in enumerate(values):
+                total[i] += v
+        return result
+
+    def to_tree_items(self, lang='zh', limit=60):
+        """
+        转换为两级树图：每种类型一个分组，分组内按路径列出映射 (每组最多 limit 项，其余合并)。
+        面积为常驻 + 换出，data 的 rss / vmem 与主界面进程块的 "物理 | 虚拟" 含义一致。
+        """
+        t = I18N[lang]
+        labels = {
+            KIND_HEAP: t.get('map_heap', "Heap"), KIND_STACK: t.get('map_stack', "Stacks"),
+            KIND_ANON: t.get('map_anon', "Anonymous"), KIND_FILE: t.get('map_file', "Mapped Files"),
+            KIND_LIB: t.get('map_lib', "Shared Libraries"),
+        }
+        by_kind = {}
+        for (kind, path), (size, rss, pss, private, shared, swap) in self.entries.items():
+            if rss + swap > 0:
+                by_kind.setdefault(kind, []).append((rss + swap, rss, swap, path))
+        groups = []
+        for kind in KINDS:
+            rows = sorted(by_kind.get(kind, ()), key=lambda r: r[0], reverse=True)
+            if not rows:
+                continue
+            item_type = 'shared' if kind in (KIND_FILE, KIND_LIB) else 'system'
+            group = TreeMapItem(labels[kind], sum(r[0] for r in rows), item_type, data={
+                'is_group': True, 'kind': kind,
+                'rss': sum(r[1] for r in rows), 'vmem': sum(r[2] for r in rows),
+            })
+            for value, rss, swap, path in rows[:limit]:
+                name = os.path.basename(path.replace('\\', '/')) if path and not path.startswith('[') else (path or labels[kind])
+                group.children.append(TreeMapItem(name, value, item_type, data={
+                    'rss': rss, 'vmem': swap, 'path': path, 'kind': kind,
+                }))
+            rest = rows[limit:]
+            if rest:
+                group.children.append(TreeMapItem(t.get('map_others', "Other Mappings"), sum(r[0] for r in rest), item_type, data={
+                    'rss': sum(r[1] for r in rest), 'vmem': sum(r[2] for r in rest), 'kind': kind,
+                }))
+            groups.append(group)
+        return groups
+
+
+class MemoryMapAnalyzer:
+    """
+    映射明细的缓存：以 (pid, create_time) 为键，PID 复用后不会命中旧进程的结果。
+    同一进程重复打开详情窗口 / 下钻时不必再次解析 smaps。
+    界面线程通过 submit() 在后台线程中解析 (浏览器、IDE 等有上千个映射，解析可能需要数百毫秒)。
+    """
+
+    def __init__(self, capacity=32, proc_root='/proc'):
+        self.capacity = capacity
+        self.proc_root = proc_root
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._inflight = {}        # (pid, create_time) -> 正在后台解析的 Future
+
+    @staticmethod
+    def _create_time(pid):
+        record = get_process_tree().records.get(pid)
+        if record is not None:
+            return record.create_time
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+
+    def get(self, pid, create_time=None, max_age=None):
+        """
+        :param max_age: 缓存超过该秒数时重新解析；None 表示进程存活期间一直复用
+        :return: MemoryMap；进程不存在或无权限时返回 None
+        """
+        if create_time is None:
+            create_time = self._create_time(pid)
+        key = (pid, create_time)
+        cached = self._cached(key, max_age)
+        if cached is not None:
+            return cached
+        result = MemoryMap(pid, create_time)
+        try:
+            for region in iter_memory_maps(pid, self.proc_root):
+                result.add(region)
+        except (psutil.Error, OSError, NotImplementedError, ValueError):
+            return None
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+        return result
+
+    def _cached(self, key, max_age):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and (max_age is None or time.time() - cached.timestamp <= max_age):
+                self._cache.move_to_end(key)
+                return cached
+        return None
+
+    def submit(self, pid, create_time=None, max_age=None):
+        """
+        在后台线程中执行 get()，不阻塞调用方。
+        :return: Future[MemoryMap 或 None]；缓存命中时返回已完成的 Future，同一进程正在解析时返回同一个 Future
+        """
+        if create_time is None:
+            create_time = self._create_time(pid)
+        key = (pid, create_time)
+        cached = self._cached(key, max_age)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='memory-maps')
+            future = self._executor.submit(self.get, pid, create_time, max_age)
+            self._inflight[key] = future
+        future.add_done_callback(lambda f: self._finished(key, f))
+        return future
+
+    def _finished(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate(self, pid=None):
+        with self._lock:
+            if pid is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0] == pid]:
+                    del self._cache[key]
+
+
+_analyzer = None
+
+def get_memory_map_analyzer():
+    """进程级共享的映射分析器 (详情窗口与树图下钻共用缓存)"""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = MemoryMapAnalyzer()
+    return _analyzer
+
+
+def memory_map_children(item, lang='zh', max_age=None):
+    """
+    树图下钻的子项提供者：进程块 -> 按类型分组的映射明细。
+    :return: Future[子项列表]，解析在后台线程中进行；缓存命中时已完成
+    """
+    children = Future()
+    pid = item.data.get('pid')
+    if pid is None:
+        children.set_result([])
+        return children
+
+    def done(future):
+        try:
+            result = future.result()
+            children.set_result(result.to_tree_items(lang) if result is not None else [])
+        except Exception as e:
+            children.set_exception(e)
+
+    get_memory_map_analyzer().submit(pid, max_age=max_age).add_done_callback(done)
+    return children
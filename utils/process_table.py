@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class NameTable:
+    """进程名驻留表：同名进程共享一个整数 id，跨 tick 保留"""
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def intern(self, name):
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.ids[name] = name_id
+            self.names.append(name)
+        return name_id
+
+    def __getitem__(self, name_id):
+        return self.names[name_id]
+
+
+class ProcessTable:
+    """
+    列式 (struct-of-arrays) 进程表。
+    每个 tick 由快照记录一次性填充，排序、Top-N、按家族聚合、gap 统计都是向量化运算，
+    只有最终要绘制的那一百多个项目才会创建 TreeMapItem。
+    """
+    COLUMNS = ('pid', 'ppid', 'rss', 'private', 'vmem', 'shared', 'name_id')
+
+    def __init__(self, columns, names):
+        self.names = names
+        for key in self.COLUMNS:
+            setattr(self, key, columns[key])
+
+    def __len__(self):
+        return len(self.pid)
+
+    @classmethod
+    def from_records(cls, records, names):
+        """
+        :param records: ProcessRecord 序列
+        :param names: NameTable
+        """
+        records = list(records)
+        data = np.array([(r.pid, r.ppid or 0, r.rss, r.private, r.shared) for r in records],
+                        dtype=np.int64).reshape(-1, 5)
+        ids = names.ids
+        intern = names.intern
+        name_id = np.fromiter((ids.get(r.name) if r.name in ids else intern(r.name) for r in records),
+                              dtype=np.int64, count=len(records))
+        rss, private = data[:, 2], data[:, 3]
+        return cls({
+            'pid': data[:, 0], 'ppid': data[:, 1], 'rss': rss, 'private': private,
+            'vmem': np.maximum(private - rss, 0), 'shared': data[:, 4], 'name_id': name_id,
+        }, names)
+
+    def take(self, index):
+        """按布尔掩码或下标数组取子表"""
+        return ProcessTable({key: getattr(self, key)[index] for key in self.COLUMNS}, self.names)
+
+    def to_lists(self):
+        """{列名: Python 列表}，用于批量创建少量视图对象"""
+        return {key: getattr(self, key).tolist() for key in self.COLUMNS}
+
+    def name(self, row):
+        return self.names[int(self.name_id[row])]
+
+    def group_by(self, keys):
+        """
+        :param keys: 每行所属分组的键 (如家族根 PID)
+        :return: (分组键数组, 每行的分组下标)，分组按首次出现的顺序编号
+        """
+        uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        # np.unique 按键排序；重新编号为首次出现的顺序，与逐个遍历建组的结果一致
+        order = np.argsort(first, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return uniq[order], rank[inverse.reshape(-1)]
+
+    @staticmethod
+    def group_sum(group_index, values, n_groups):
+        return np.bincount(group_index, weights=values, minlength=n_groups).astype(np.int64)
+
+
+def top_n(values, n):
+    """降序排列的前 n 个下标；相等的值保持原有顺序 (与稳定排序后截取前 n 个的结果一致)"""
+    if len(values) > n:
+        kth = np.partition(values, len(values) - n)[len(values) - n]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:n - len(above)]
+        index = np.sort(np.concatenate((above, ties)))
+    else:
+        index = np.arange(len(values))
+    return index[np.argsort(-values[index], kind='stable')]
@@ -0,0 +1,142 @@
+import threading
+
+
+class ProcessTree:
+    """
+    跨 tick 保留的进程树索引 (parent / children 映射)，由快照引擎的增量结果更新。
+    - 父子关系以 create_time 校验：父 PID 被复用成更晚启动的进程时不算作父进程。
+    - root_of() 带记忆化与路径压缩，同一家族的兄弟进程共享溯源结果，
+      整个程序聚合是一次线性遍历。
+    - 溯源范围 (参与聚合的进程、溯源终点) 变化或树结构变化时才清空记忆。
+    """
+
+    def __init__(self):
+        self.records = {}       # pid -> ProcessRecord
+        self.parent = {}        # pid -> 父 pid (仅限树中存在且通过校验的父进程)
+        self.children = {}      # pid -> set(子 pid)
+        self._lock = threading.Lock()
+        self._roots = {}
+        self._eligible = frozenset()
+        self._stop = frozenset()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, pid):
+        return pid in self.records
+
+    # ---------------- 维护 ----------------
+    def apply(self, delta):
+        """应用一次 SnapshotDelta；与快照不一致时整体重建"""
+        with self._lock:
+            for record in delta.removed:
+                self._remove(record)
+            for record in delta.added:
+                if record.pid in self.records:
+                    self._remove(self.records[record.pid])
+                self.records[record.pid] = record
+            # 同一 tick 出生的父子进程：全部登记后再建立关系
+            for record in delta.added:
+                self._link(record)
+            if len(self.records) != len(delta.records):
+                self._rebuild(delta.records.values())
+            if delta.added or delta.removed:
+                self._roots.clear()
+
+    def _rebuild(self, records):
+        self.records.clear(); self.parent.clear(); self.children.clear()
+        for record in records:
+            self.records[record.pid] = record
+        for record in records:
+            self._link(record)
+
+    def _link(self, record):
+        parent = self.records.get(record.ppid)
+        if parent is None or parent.pid == record.pid:
+            return
+        if parent.create_time and record.create_time and parent.create_time > record.create_time:
+            return
+        self.parent[record.pid] = parent.pid
+        self.children.setdefault(parent.pid, set()).add(record.pid)
+
+    def _remove(self, record):
+        pid = record.pid
+        if self.records.get(pid) is not record:
+            return
+        del self.records[pid]
+        ppid = self.parent.pop(pid, None)
+        if ppid is not None:
+            siblings = self.children.get(ppid)
+            if siblings:
+                siblings.discard(pid)
+                if not siblings:
+                    del self.children[ppid]
+        # 孤儿进程：不再有父进程
+        for child in self.children.pop(pid, ()):
+            self.parent.pop(child, None)
+
+    # ---------------- 溯源 ----------------
+    def set_scope(self, eligible, stop):
+        """
+        :param eligible: 参与聚合的 PID；溯源只经过这些进程
+        :param stop: 溯源终点 (桌面壳层等)，它们的子进程各自成为家族的根
+        """
+        eligible, stop = frozenset(eligible), frozenset(stop)
+        with self._lock:
+            if eligible != self._eligible or stop != self._stop:
+                self._eligible, self._stop = eligible, stop
+                self._roots.clear()
+
+    def root_of(self, pid):
+        """沿父链向上找到家族的祖先，途经的节点全部记下同一个根 (路径压缩)"""
+        roots = self._roots
+        root = roots.get(pid)
+        if root is not None:
+            return root
+        eligible, stop, parent = self._eligible, self._stop, self.parent
+        path = []
+        visited = set()
+        curr = pid
+        while True:
+            known = roots.get(curr)
+            if known is not None:
+                root = known
+                break
+            path.append(curr)
+            visited.add(curr)
+            ppid = parent.get(curr)
+            if ppid is None or ppid in stop or ppid not in eligible or ppid in visited:
+                root = curr
+                break
+            curr = ppid
+        for node in path:
+            roots[node] = root
+        return root
+
+    # ---------------- 查询 (可在 UI 线程调用) ----------------
+    def ancestors(self, pid):
+        """从最顶层祖先到 pid 本身的 ProcessRecord 列表；pid 不在树中时返回空列表"""
+        with self._lock:
+            chain = []
+            seen = set()
+            curr = pid
+            while curr is not None and curr not in seen and curr in self.records:
+                seen.add(curr)
+                chain.append(self.records[curr])
+                curr = self.parent.get(curr)
+            chain.reverse()
+            return chain
+
+    def children_of(self, pid):
+        with self._lock:
+            return [self.records[c] for c in sorted(self.children.get(pid, ())) if c in self.records]
+
+
+_tree = None
+
+def get_process_tree():
+    """进程级共享的进程树 (由 worker 线程随快照更新)"""
+    global _tree
+    if _tree is None:
+        _tree = ProcessTree()
+    return _tree
@@ -0,0 +1,424 @@
+import os
+import glob
+import mmap
+import bisect
+import time
+import queue
+import struct
+import threading
+
+from utils.treemap_logic import TreeMapItem
+
+# 快照录制文件格式 (*.msr)：
+#   文件头   MAGIC
+#   帧       u32 负载长度 + 负载
+#   负载     varint 标志 (bit0 = 关键帧) | f64 时间戳 | 新增字符串 | vm_info | 项目行
+# 整数一律为 zigzag varint；数值列 (value / rss / vmem 与 vm_info 的整数项) 记录相对上一帧同一项目的差值，
+# 关键帧清空差值基准和字符串表，因此从任意关键帧开始都能独立解码。
+# 每个录制文件旁有一个 .idx 索引：定长记录 (f64 时间戳, u64 帧偏移, u8 是否关键帧)，
+# 按时间戳二分即可在 O(log n) 内定位任意时刻。
+MAGIC = b'MSXREC1\n'
+FRAME_HEAD = struct.Struct('<I')
+F64 = struct.Struct('<d')
+INDEX_RECORD = struct.Struct('<dQB')
+
+# 项目行的标志位
+_F_GROUP, _F_STALE, _F_PID, _F_ROOT_PID, _F_EXE = 1, 2, 4, 8, 16
+
+# vm_info 中按浮点数记录的字段，其余按整数差值记录
+_VM_FLOAT_KEYS = ('percent', 'gpu_percent')
+
+
+# ---------------- varint ----------------
+def write_varint(buf, value):
+    """无符号 LEB128"""
+    while value > 0x7F:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def write_svarint(buf, value):
+    """有符号整数：zigzag 后按 varint 写入"""
+    write_varint(buf, (value << 1) ^ (value >> 63) if value < 0 else value << 1)
+
+
+def read_varint(data, pos):
+    result = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def read_svarint(data, pos):
+    value, pos = read_varint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+# ---------------- 编解码 ----------------
+def flatten_items(root_items, rows=None):
+    """
+    把项目树展开成行 (先序)，在 worker 线程执行：
+    行 = (父行号 + 1, 类型, 名称, 标志, pid, root_pid, exe_name, value, rss, vmem)
+    :param rows: 追加到已有的行列表 (分阶段产生的顶级项目可以分批展开)
+    """
+    if rows is None:
+        rows = []
+
+    def visit(item, parent):
+        data = item.data
+        flags = 0
+        if data.get('is_group'): flags |= _F_GROUP
+        if data.get('stale'): flags |= _F_STALE
+        pid = data.get('pid')
+        if pid is not None: flags |= _F_PID
+        root_pid = data.get('root_pid')
+        if root_pid is not None: flags |= _F_ROOT_PID
+        exe_name = data.get('exe_name')
+        if exe_name is not None: flags |= _F_EXE
+        index = len(rows)
+        rows.append((parent, item.type, item.name, flags, pid or 0, root_pid or 0, exe_name,
+                     int(item.value), int(data.get('rss', 0)), int(data.get('vmem', 0))))
+        for child in item.children:
+            visit(child, index + 1)
+
+    for item in root_items:
+        visit(item, 0)
+    return rows
+
+
+class FrameEncoder:
+    """有状态的帧编码器：字符串表与差值基准在关键帧之间累积"""
+
+    def __init__(self, keyframe_interval=30):
+        self.keyframe_interval = keyframe_interval
+        self._since_key = keyframe_interval
+        self.reset()
+
+    def reset(self):
+        """下一帧强制为关键帧 (轮换到新文件时调用)"""
+        self._strings = {}
+        self._last = {}
+        self._since_key = self.keyframe_interval
+
+    def _sid(self, text, new_strings):
+        sid = self._strings.get(text)
+        if sid is None:
+            sid = self._strings[text] = len(self._strings)
+            new_strings.append(text)
+        return sid
+
+    def encode(self, timestamp, rows, vm_info):
+        """:return: (负载 bytes, 是否关键帧)"""
+        keyframe = self._since_key >= self.keyframe_interval
+        if keyframe:
+            self._strings = {}
+            self._last = {}
+            self._since_key = 0
+        self._since_key += 1
+        last = self._last
+        new_strings = []
+        body = bytearray()
+
+        vm_keys = sorted(vm_info)
+        write_varint(body, len(vm_keys))
+        for key in vm_keys:
+            sid = self._sid(key, new_strings)
+            write_varint(body, sid)
+            value = vm_info[key]
+            if key in _VM_FLOAT_KEYS:
+                body += F64.pack(float(value))
+            else:
+                value = int(value)
+                state_key = ('vm', sid)
+                write_svarint(body, value - last.get(state_key, 0))
+                last[state_key] = value
+
+        write_varint(body, len(rows))
+        for parent, item_type, name, flags, pid, root_pid, exe_name, value, rss, vmem in rows:
+            type_sid = self._sid(item_type, new_strings)
+            name_sid = self._sid(name, new_strings)
+            write_varint(body, parent)
+            write_varint(body, type_sid)
+            write_varint(body, name_sid)
+            write_varint(body, flags)
+            if flags & _F_PID: write_svarint(body, pid)
+            if flags & _F_ROOT_PID: write_svarint(body, root_pid)
+            if flags & _F_EXE: write_varint(body, self._sid(exe_name, new_strings))
+            # 同一项目 (类型 + 名称 + PID) 相对上一帧的差值；同键重复出现时解码端按同样的顺序更新，结果一致
+            state_key = (type_sid, name_sid, pid)
+            prev = last.get(state_key)
+            if prev is None:
+                prev = (0, 0, 0)
+            write_svarint(body, value - prev[0])
+            write_svarint(body, rss - prev[1])
+            write_svarint(body, vmem - prev[2])
+            last[state_key] = (value, rss, vmem)
+
+        head = bytearray()
+        write_varint(head, 1 if keyframe else 0)
+        head += F64.pack(timestamp)
+        write_varint(head, len(new_strings))
+        for text in new_strings:
+            raw = text.encode('utf-8')
+            write_varint(head, len(raw))
+            head += raw
+        return bytes(head + body), keyframe
+
+
+class FrameDecoder:
+    """与 FrameEncoder 对称；必须从关键帧开始按顺序喂入帧"""
+
+    def __init__(self):
+        self._strings = []
+        self._last = {}
+
+    def decode(self, payload):
+        """:return: (时间戳, root_items, vm_info)"""
+        data = payload
+        flags, pos = read_varint(data, 0)
+        if flags & 1:
+            self._strings = []
+            self._last = {}
+        timestamp = F64.unpack_from(data, pos)[0]
+        pos += F64.size
+        strings = self._strings
+        last = self._last
+        count, pos = read_varint(data, pos)
+        for _ in range(count):
+            length, pos = read_varint(data, pos)
+            strings.append(bytes(data[pos:pos + length]).decode('utf-8'))
+            pos += length
+
+        vm_info = {}
+        count, pos = read_varint(data, pos)
+        for _ in range(count):
+            sid, pos = read_varint(data, pos)
+            key = strings[sid]
+            if key in _VM_FLOAT_KEYS:
+                vm_info[key] = F64.unpack_from(data, pos)[0]
+                pos += F64.size
+            else:
+                delta, pos = read_svarint(data, pos)
+                state_key = ('vm', sid)
+                value = last.get(state_key, 0) + delta
+                last[state_key] = value
+                vm_info[key] = value
+
+        count, pos = read_varint(data, pos)
+        items = []
+        roots = []
+        for _ in range(count):
+            parent, pos = read_varint(data, pos)
+            type_sid, pos = read_varint(data, pos)
+            name_sid, pos = read_varint(data, pos)
+            flags, pos = read_varint(data, pos)
+            item_data = {}
+            pid = 0
+            if flags & _F_PID:
+                pid, pos = read_svarint(data, pos)
+                item_data['pid'] = pid
+            if flags & _F_ROOT_PID:
+                item_data['root_pid'], pos = read_svarint(data, pos)
+            if flags & _F_EXE:
+                sid, pos = read_varint(data, pos)
+                item_data['exe_name'] = strings[sid]
+            if flags & _F_GROUP: item_data['is_group'] = True
+            if flags & _F_STALE: item_data['stale'] = True
+            state_key = (type_sid, name_sid, pid)
+            prev = last.get(state_key) or (0, 0, 0)
+            d_value, pos = read_svarint(data, pos)
+            d_rss, pos = read_svarint(data, pos)
+            d_vmem, pos = read_svarint(data, pos)
+            value, rss, vmem = prev[0] + d_value, prev[1] + d_rss, prev[2] + d_vmem
+            last[state_key] = (value, rss, vmem)
+            item_data['rss'] = rss
+            item_data['vmem'] = vmem
+            item = TreeMapItem(strings[name_sid], value, strings[type_sid], data=item_data)
+            items.append(item)
+            if parent:
+                items[parent - 1].children.append(item)
+            else:
+                roots.append(item)
+        return timestamp, roots, vm_info
+
+
+# ---------------- 写入 ----------------
+class SnapshotRecorder:
+    """
+    追加式快照录制器。
+    worker 线程只负责把项目树展开成行并放入队列；编码、批量写盘、索引与文件轮换都在后台线程完成，
+    界面和采集线程都不会等待磁盘。
+    目录中最多保留 max_files 个文件，每个不超过 max_bytes，总占用有上限。
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, max_files=8, keyframe_interval=30,
+                 flush_interval=1.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self.encoder = FrameEncoder(keyframe_interval)
+        self.path = None
+        self._file = None
+        self._index = None
+        self._size = 0
+        self._queue = queue.Queue(maxsize=256)
+        self.dropped = 0
+        self.frames = 0
+        self._thread = threading.Thread(target=self._run, name='SnapshotRecorder', daemon=True)
+        self._thread.start()
+
+    def record(self, timestamp, root_items, vm_info):
+        """在 worker 线程调用；队列满 (磁盘太慢) 时丢弃该帧而不是阻塞采集"""
+        self.record_rows(timestamp, flatten_items(root_items), vm_info)
+
+    def record_rows(self, timestamp, rows, vm_info):
+        """记录已经由 flatten_items 展开的帧"""
+        try:
+            self._queue.put_nowait((timestamp, rows, dict(vm_info)))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                continue
+            # 把已经排队的帧一起取出，一次写入
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stop = True
+                batch = [b for b in batch if b is not None]
+            try:
+                self._write_batch(batch)
+            except OSError as e:
+                print(f"Recorder Error: {e}")
+        self._close_file()
+
+    def _write_batch(self, batch):
+        data = bytearray()
+        index = bytearray()
+        for timestamp, rows, vm_info in batch:
+            if self._file is None or self._size + len(data) >= self.max_bytes:
+                if data:
+                    self._flush(data, index)
+                    data, index = bytearray(), bytearray()
+                self._rotate()
+            payload, keyframe = self.encoder.encode(timestamp, rows, vm_info)
+            index += INDEX_RECORD.pack(timestamp, self._size + len(data), 1 if keyframe else 0)
+            data += FRAME_HEAD.pack(len(payload))
+            data += payload
+            self.frames += 1
+        if data:
+            self._flush(data, index)
+
+    def _flush(self, data, index):
+        self._file.write(data)
+        self._file.flush()
+        self._index.write(index)
+        self._index.flush()
+        self._size += len(data)
+
+    def _rotate(self):
+        self._close_file()
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f'snapshots-{stamp}.msr')
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f'snapshots-{stamp}-{n}.msr')
+            n += 1
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._index = open(path + '.idx', 'wb')
+        self._size = len(MAGIC)
+        # 新文件必须从关键帧开始
+        self.encoder.reset()
+        self._prune()
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(self.directory, 'snapshots-*.msr')), key=os.path.getmtime)
+        for old in files[:-self.max_files]:
+            for p in (old, old + '.idx'):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    def _close_file(self):
+        for f in (self._file, self._index):
+            if f is not None:
+                f.close()
+        self._file = self._index = None
+
+
+class RecordingIndex:
+    """
+    录制文件的时间戳索引 (内存映射 .idx，不整体读入)。
+    记录定长，按下标随机访问，定位任意时刻是一次二分查找。
+    """
+
+    def __init__(self, index_path):
+        self._file = open(index_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self.count = size // INDEX_RECORD.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        """(时间戳, 帧偏移, 是否关键帧)"""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return INDEX_RECORD.unpack_from(self._map, i * INDEX_RECORD.size)
+
+    def timestamp(self, i):
+        return self[i][0]
+
+    def find(self, timestamp):
+        """时间戳不晚于 timestamp 的最后一帧的下标 (早于第一帧时为 0)"""
+        keys = _IndexKeys(self)
+        return max(0, bisect.bisect_right(keys, timestamp) - 1)
+
+    def keyframe_before(self, i):
+        """第 i 帧之前 (含) 最近的关键帧下标"""
+        while i > 0 and not self[i][2]:
+            i -= 1
+        return i
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class _IndexKeys:
+    """让 bisect 直接在内存映射的索引上按时间戳查找"""
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        return self.index.timestamp(i)
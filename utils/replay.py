@@ -0,0 +1,194 @@
+import os
+import mmap
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from utils.recorder import MAGIC, FRAME_HEAD, F64, RecordingIndex, FrameDecoder, read_varint
+
+# 回放速度：倍数；0 表示不等待，界面能画多快就放多快 (用于渲染基准测试)
+SPEEDS = (1, 10, 0)
+
+
+class _ScannedIndex(RecordingIndex):
+    """没有 .idx (或与录制文件不一致) 时，顺序扫描帧头重建的内存索引"""
+
+    def __init__(self, records):
+        self._records = records
+        self.count = len(records)
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self._records[i]
+
+    def close(self):
+        pass
+
+
+class RecordingReader:
+    """
+    录制文件的只读访问。
+    文件整体内存映射，打开时只映射、不解码；读取某一帧时才从最近的关键帧开始解码，
+    顺序播放时直接接着上一帧解码。几 GB 的录制也可以立即打开、随意拖动。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(MAGIC):
+            raise ValueError(f"not a snapshot recording: {path}")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"not a snapshot recording: {path}")
+        self.index = self._open_index(path + '.idx', size)
+        self._decoder = FrameDecoder()
+        self._position = -1
+
+    def _open_index(self, index_path, size):
+        if os.path.exists(index_path):
+            index = RecordingIndex(index_path)
+            # 录制中途退出时索引可能多出写了一半的帧，截掉越界的记录
+            while index.count and index[index.count - 1][1] + FRAME_HEAD.size > size:
+                index.count -= 1
+            if index.count:
+                return index
+            index.close()
+        return self._scan(size)
+
+    def _scan(self, size):
+        data = self._map
+        records = []
+        pos = len(MAGIC)
+        while pos + FRAME_HEAD.size <= size:
+            (length,) = FRAME_HEAD.unpack_from(data, pos)
+            start = pos + FRAME_HEAD.size
+            if start + length > size:
+                break
+            flags, body = read_varint(data, start)
+            records.append((F64.unpack_from(data, body)[0], pos, flags & 1))
+            pos = start + length
+        return _ScannedIndex(records)
+
+    def __len__(self):
+        return len(self.index)
+
+    def timestamp(self, i):
+        return self.index.timestamp(i)
+
+    def find(self, timestamp):
+        return self.index.find(timestamp)
+
+    def _payload(self, i):
+        offset = self.index[i][1]
+        (length,) = FRAME_HEAD.unpack_from(self._map, offset)
+        start = offset + FRAME_HEAD.size
+        return memoryview(self._map)[start:start + length]
+
+    def frame(self, i):
+        """:return: (时间戳, root_items, vm_info)"""
+        if i != self._position + 1:
+            # 跳转：从最近的关键帧开始重放差值
+            start = self.index.keyframe_before(i)
+            self._decoder = FrameDecoder()
+            for j in range(start, i):
+                payload = self._payload(j)
+                self._decoder.decode(payload)
+                payload.release()
+        payload = self._payload(i)
+        result = self._decoder.decode(payload)
+        payload.release()
+        self._position = i
+        return result
+
+    def close(self):
+        if getattr(self, 'index', None) is not None:
+            self.index.close()
+        self._map.close()
+        self._file.close()
+
+
+class ReplayWorker(QObject):
+    """
+    回放数据源：与 DataWorker 相同的 data_ready(list, dict) 信号，
+    MainWindow.on_data_received 不需要区分实时数据与回放。
+    按录制时的时间间隔除以速度倍数出帧；速度为 0 时每次事件循环空闲就出下一帧。
+    """
+    data_ready = pyqtSignal(list, dict)
+    position_changed = pyqtSignal(int, int)     # (当前帧, 总帧数)
+    state_changed = pyqtSignal(bool)            # 是否正在播放
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.reader = RecordingReader(path)
+        self.speed = 1
+        self.position = -1
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._advance)
+
+    def __len__(self):
+        return len(self.reader)
+
+    @property
+    def is_playing(self):
+        return self._timer.isActive()
+
+    def play(self):
+        if not len(self.reader):
+            return
+        if self.position >= len(self.reader) - 1:
+            self.position = -1
+        self._schedule()
+        self.state_changed.emit(True)
+
+    def pause(self):
+        self._timer.stop()
+        self.state_changed.emit(False)
+
+    def toggle(self):
+        if self.is_playing:
+            self.pause()
+        else:
+            self.play()
+
+    def set_speed(self, speed):
+        self.speed = speed
+        if self.is_playing:
+            self._schedule()
+
+    def seek(self, i):
+        if not len(self.reader):
+            return
+        i = max(0, min(len(self.reader) - 1, i))
+        self._emit(i)
+        if self.is_playing:
+            self._schedule()
+
+    def _emit(self, i):
+        _, root_items, vm_info = self.reader.frame(i)
+        self.position = i
+        self.data_ready.emit(root_items, vm_info)
+        self.position_changed.emit(i, len(self.reader))
+
+    def _schedule(self):
+        nxt = self.position + 1
+        if nxt >= len(self.reader):
+            self.pause()
+            return
+        if self.speed and self.position >= 0:
+            gap = self.reader.timestamp(nxt) - self.reader.timestamp(self.position)
+            # 录制中的长时间空档 (休眠、程序关闭) 不按原样等待
+            interval = int(max(0.0, min(gap, 60.0)) * 1000 / self.speed)
+        else:
+            interval = 0
+        self._timer.start(interval)
+
+    def _advance(self):
+        self._emit(self.position + 1)
+        self._schedule()
+
+    def close(self):
+        self._timer.stop()
+        self.reader.close()
@@ -0,0 +1,114 @@
+import time
+
+from utils.backends import get_backend
+
+# 每隔多少个 tick 对存活进程做一次 PID 复用校验 (比对 create_time)
+_REUSE_CHECK_INTERVAL = 15
+
+
+class SnapshotDelta:
+    """一次 tick 的变化集合 + 完整视图"""
+    __slots__ = ('added', 'removed', 'changed', 'records', 'pid_count')
+
+    def __init__(self, added, removed, changed, records, pid_count=None):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.records = records
+        self.pid_count = len(records) if pid_count is None else pid_count
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+class ProcessSnapshotEngine:
+    """
+    增量进程快照引擎。
+    跨 tick 保留每个 PID 的 ProcessRecord，通过 PID 集合差分发现进程的出生与死亡，
+    对存活进程只刷新内存计数器，具体读取方式由平台后端决定。
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or get_backend()
+        self.records = {}
+        self.tick_count = 0
+
+    def tick(self):
+        """采集一次快照，返回 SnapshotDelta"""
+        self.tick_count += 1
+        check_reuse = self.tick_count % _REUSE_CHECK_INTERVAL == 0
+        backend = self.backend
+        records = self.records
+
+        current = backend.list_pids()
+        removed = [records.pop(pid) for pid in set(records) - current]
+
+        survivors = list(records.values())
+        changed, gone = backend.refresh_memory(survivors, check_reuse)
+        for record in gone:
+            del records[record.pid]
+            removed.append(record)
+
+        # 新出现的 PID (含被复用的 PID) 作为新生进程登记；已退出的进程在这里自然被跳过
+        added = []
+        for pid in current - records.keys():
+            record = backend.open_process(pid)
+            if record is None:
+                continue
+            _, dead = backend.refresh_memory([record])
+            if dead:
+                continue
+            records[pid] = record
+            added.append(record)
+
+        return SnapshotDelta(added, removed, changed, records, len(current))
+
+    def collect(self):
+        """一次完整的采集：系统内存 + 进程增量，返回供所有消费方共用的 SystemSnapshot"""
+        memory = self.backend.system_memory()
+        delta = self.tick()
+        self.backend.begin_tick()
+        return SystemSnapshot(delta, memory)
+
+
+class SystemSnapshot:
+    """
+    一个 tick 的共享采集结果 (进程、系统内存、交换区、PID 数)。
+    树图数据、状态栏统计等都从这里读取，不再各自调用 psutil。
+    """
+    __slots__ = ('delta', 'memory', 'timestamp')
+
+    def __init__(self, delta, memory, timestamp=None):
+        self.delta = delta
+        self.memory = memory
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @property
+    def records(self):
+        return self.delta.records
+
+    @property
+    def pid_count(self):
+        return self.delta.pid_count
+
+    @property
+    def swap_total(self):
+        return self.memory.get('swap_total', 0)
+
+    @property
+    def swap_used(self):
+        return self.memory.get('swap_used', 0)
+
+
+_engine = None
+
+def get_snapshot_engine():
+    """进程级共享的快照引擎 (在 worker 线程中使用)"""
+    global _engine
+    if _engine is None:
+        _engine = ProcessSnapshotEngine()
+    return _engine
+
+def collect_system_snapshot():
+    """采集本 tick 的共享快照 (在 worker 线程中调用)"""
+    return get_snapshot_engine().collect()
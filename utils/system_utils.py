@@ -1,7 +1,11 @@
 import sys
 import os
 import psutil
-import winreg
+try:
+    import winreg
+except ImportError:
+    # 非 Windows 平台 (如 Linux 后端) 没有注册表
+    winreg = None
 
 def check_startup_status():
     """检查注册表确认是否已设置开机启动"""
@@ -55,3 +59,17 @@ def set_process_priority():
             p.nice(10)
     except: pass
 
+
+def get_foreground_pid():
+    """前台窗口所属进程的 PID；非 Windows 平台或获取失败时返回 None"""
+    if sys.platform != 'win32': return None
+    try:
+        import ctypes
+        from ctypes import wintypes
+        hwnd = ctypes.windll.user32.GetForegroundWindow()
+        if not hwnd: return None
+        pid = wintypes.DWORD()
+        ctypes.windll.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        return pid.value or None
+    except:
+        return None
@@ -1,101 +1,413 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
 from PyQt6.QtCore import QRectF
 
 class TreeMapItem:
+    """
+    树图节点。使用 __slots__ 与普通浮点坐标，QRectF 只在绘制/命中测试第一次访问 rect 时创建。
+    布局结果不逐项写入：节点只记住 (布局结果, 行号)，第一次读取坐标或面积时才从数组中取出，
+    十万个节点中只有真正被绘制 / 命中测试的那部分需要付出这一步的代价。
+    """
+    __slots__ = ('name', 'value', 'type', 'data', 'children',
+                 '_x', '_y', '_w', '_h', '_area', '_geom', '_rect', '_size_cache')
+
     def __init__(self, name, value, item_type="process", data=None):
         self.name = name
         self.value = value
         self.type = item_type
         self.data = data or {}
-        self.rect = QRectF(0, 0, 0, 0)
         self.children = [] # 如果有子节点，则它是分组
+        self._area = 0.0
+        self._x = self._y = self._w = self._h = 0.0
+        self._geom = None
+        self._rect = None
+        self._size_cache = None
+
+    def _load_geometry(self):
+        block, row = self._geom
+        self._geom = None
+        self._x, self._y, self._w, self._h = block.rects[row].tolist()
+        self._area = float(block.areas[row])
+        self._rect = None
+
+    @property
+    def x(self):
+        if self._geom is not None: self._load_geometry()
+        return self._x
+
+    @property
+    def y(self):
+        if self._geom is not None: self._load_geometry()
+        return self._y
+
+    @property
+    def w(self):
+        if self._geom is not None: self._load_geometry()
+        return self._w
+
+    @property
+    def h(self):
+        if self._geom is not None: self._load_geometry()
+        return self._h
+
+    @property
+    def area(self):
+        if self._geom is not None: self._load_geometry()
+        return self._area
+
+    @property
+    def rect(self):
+        if self._geom is not None: self._load_geometry()
+        rect = self._rect
+        if rect is None:
+            rect = self._rect = QRectF(self._x, self._y, self._w, self._h)
+        return rect
+
+    @rect.setter
+    def rect(self, rect):
+        self.set_geometry(rect.x(), rect.y(), rect.width(), rect.height())
+
+    def set_geometry(self, x, y, w, h):
+        self._x, self._y, self._w, self._h = x, y, w, h
+        self._geom = None
+        self._rect = None
 
     def formatted_size(self):
+        # value 在聚合、缩放时会被修改，缓存以 value 为准
+        cache = self._size_cache
+        if cache is not None and cache[0] == self.value:
+            return cache[1]
         val = self.value
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
             if val < 1024.0:
-                return f"{val:.2f} {unit}"
+                text = f"{val:.2f} {unit}"
+                break
             val /= 1024.0
-        return f"{val:.2f} PB"
+        else:
+            text = f"{val:.2f} PB"
+        self._size_cache = (self.value, text)
+        return text
+
+# 行扩展时一次向量化评估的初始窗口大小，窗口不够时按倍数扩大
+_ROW_WINDOW = 32
+
+class _LayoutBlock:
+    """一次布局的结果数组，按布局顺序的第 row 行对应结果列表中的第 row 个节点"""
+    __slots__ = ('rects', 'areas')
+
+    def __init__(self, rects, areas):
+        self.rects = rects
+        self.areas = areas
 
-def squarify_layout(items, x, y, width, height):
+
+def _item_values(items, values=None):
+    if values is None:
+        return np.fromiter((item.value for item in items), dtype=np.float64, count=len(items))
+    return np.asarray(values, dtype=np.float64)
+
+
+def _attach_layout(items, index, rects, areas):
+    """
+    把布局结果挂到节点上 (延迟取值，见 TreeMapItem)。
+    :param index: 按布局顺序排列的 items 下标
+    """
+    block = _LayoutBlock(rects, areas)
+    result_items = [items[i] for i in index.tolist()]
+    for row, item in enumerate(result_items):
+        item._geom = (block, row)
+    return result_items
+
+
+def squarify_layout(items, x, y, width, height, values=None):
     """
     对一组 items 进行 squarify 布局计算。
+    :param values: 可选，与 items 同顺序的数值数组；调用方已经有数值列时传入，省去逐项读取 value
+    :return: 按面积降序排列的有效项目 (value 为 0 的项被跳过)
     """
+    if not items or width <= 0 or height <= 0:
+        return []
+    values = _item_values(items, values)
     # 过滤掉 value 为 0 的项，避免后续计算出现除以零错误
-    valid_items = [i for i in items if i.value > 0]
-    
-    if not valid_items or width <= 0 or height <= 0:
+    valid = np.flatnonzero(values > 0)
+    if valid.size == 0:
         return []
+    values = values[valid]
 
-    total_value = sum(item.value for item in valid_items)
-    if total_value == 0: return []
+    # 归一化：将 value 映射到面积 (cumsum 顺序累加，与逐项 sum() 结果一致)
+    areas = (values / values.cumsum()[-1]) * (width * height)
+    # 稳定排序，与 sorted(..., reverse=True) 对相等面积的处理一致
+    order = np.argsort(-areas, kind='stable')
+    sorted_areas = areas[order]
+    rects = squarify_rects(sorted_areas, x, y, width, height)
+    return _attach_layout(items, valid[order], rects, sorted_areas)
 
-    # 归一化：将 value 映射到面积
-    total_area = width * height
-    for item in valid_items:
-        item.area = (item.value / total_value) * total_area
-
-    result_items = []
-    _squarify_recursive(sorted(valid_items, key=lambda x: x.area, reverse=True), [], x, y, width, height, result_items)
-    return result_items
-
-def _squarify_recursive(children, row, x, y, width, height, result):
-    if not children:
-        _layout_row(row, x, y, width, height, result)
-        return
-
-    child = children[0]
-    side = min(width, height)
-    
-    if not row:
-        _squarify_recursive(children[1:], [child], x, y, width, height, result)
-    else:
-        current_worst = _worst(row, side)
-        next_worst = _worst(row + [child], side)
-        
-        if current_worst >= next_worst:
-            _squarify_recursive(children[1:], row + [child], x, y, width, height, result)
-        else:
-            _layout_row(row, x, y, width, height, result)
-            row_area = sum(n.area for n in row)
+def squarify_rects(areas, x, y, width, height, rects=None, rows=None, start=0, ordered=False):
+    """
+    迭代式 squarify 布局引擎。
+    :param areas: 已按降序排列的面积数组 (float64)；ordered=True 时可以是任意顺序，
+                  按给定顺序切行 (有序 squarify)，元素的相对位置不随数值变化而跳动
+    :param rows: 可选列表，每布局一行追加 (行起点, 行终点, x, y, width, height)，供增量重排使用
+    :param rects, start: 增量重排时传入上一次的结果，从第 start 个元素、剩余区域 (x, y, width, height) 处继续，
+                         rects[:start] 保持不变
+    :return: 预分配的 (n, 4) 数组，第 k 行为 areas[k] 对应矩形的 [x, y, w, h]
+    每一行的累计面积用 cumsum 顺序累加得到，行内最大值即首元素、最小值即末元素，
+    因此每个候选的 worst 都是 O(1)，且结果与逐项递归的实现逐位一致。
+    """
+    n = len(areas)
+    if rects is None:
+        rects = np.empty((n, 4), dtype=np.float64)
+    window = _ROW_WINDOW
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        while start < n:
+            end, row_area = _row_end(areas, start, min(width, height), window, ordered)
+            _layout_row(rects, areas, start, end, row_area, x, y, width, height)
+            if rows is not None:
+                rows.append((start, end, x, y, width, height))
+            if end >= n:
+                break
+            # 相邻行的长度相近，用上一行的长度估计下一次的评估窗口
+            window = max(_ROW_WINDOW, 2 * (end - start))
             if width < height:
                 # 垂直剩余
                 h_used = row_area / width
-                _squarify_recursive(children, [], x, y + h_used, width, height - h_used, result)
+                y, height = y + h_used, height - h_used
             else:
                 # 水平剩余
                 w_used = row_area / height
-                _squarify_recursive(children, [], x + w_used, y, width - w_used, height, result)
-
-def _worst(row, side):
-    if not row or side == 0: return float('inf')
-    row_area = sum(n.area for n in row)
-    if row_area == 0: return float('inf')
-    
-    max_area = max(n.area for n in row)
-    min_area = min(n.area for n in row)
-    
-    if min_area == 0: return float('inf')
-    
-    return max((side**2 * max_area) / (row_area**2), (row_area**2) / (side**2 * min_area))
-
-def _layout_row(row, x, y, width, height, result):
-    if not row: return
-    row_area = sum(n.area for n in row)
+                x, width = x + w_used, width - w_used
+            start = end
+    return rects
+
+def _row_end(areas, start, side, window=_ROW_WINDOW, ordered=False):
+    """
+    从 start 开始贪心扩展一行，返回 (行结束位置(不含), 行面积)。
+    只要加入下一个元素后最差长宽比不变差就继续加入。
+    """
+    n = len(areas)
+    if side == 0:
+        return n, float(areas[start:].cumsum()[-1])
+    side_sq = side ** 2
+    head = side_sq * areas[start]
+    while True:
+        stop = min(n, start + window)
+        seg = areas[start:stop]
+        row_sums = seg.cumsum()
+        # float_power 与 Python 的 ** 结果逐位一致 (x * x 在少数情况下差 1 ULP)
+        sums_sq = np.float_power(row_sums, 2.0)
+        if ordered:
+            # 任意顺序时行内最大/最小值取前缀极值；0 面积不参与最小值，只随所在的行一起排布
+            hi = np.maximum.accumulate(seg)
+            lo = np.minimum.accumulate(np.where(seg > 0, seg, np.inf))
+            worst = np.maximum(side_sq * hi / sums_sq, sums_sq / (side_sq * lo))
+        else:
+            worst = np.maximum(head / sums_sq, sums_sq / (side_sq * seg))
+            if seg[-1] == 0:
+                # 降序排列，只有末尾可能出现 0 面积
+                worst[(row_sums == 0) | (seg == 0)] = np.inf
+        worse = worst[:-1] < worst[1:]
+        if worse.size:
+            k = int(worse.argmax())
+            if worse[k]:
+                return start + k + 1, float(row_sums[k])
+        if stop == n:
+            return n, float(row_sums[-1])
+        window *= 4
+
+def _layout_row(rects, areas, start, end, row_area, x, y, width, height):
+    seg = areas[start:end]
+    out = rects[start:end]
+    # 与逐项 curr += step 的累加顺序一致：对 [起点, step0, step1, ...] 做顺序累加
+    offsets = np.empty(end - start)
     if width < height:
         row_height = row_area / width if width > 0 else 0
-        curr_x = x
-        for node in row:
-            w = node.area / row_height if row_height > 0 else 0
-            node.rect = QRectF(curr_x, y, w, row_height)
-            curr_x += w
-            result.append(node)
+        widths = seg / row_height if row_height > 0 else np.zeros(len(seg))
+        offsets[0] = x
+        offsets[1:] = widths[:-1]
+        out[:, 0] = offsets.cumsum()
+        out[:, 1] = y
+        out[:, 2] = widths
+        out[:, 3] = row_height
     else:
         row_width = row_area / height if height > 0 else 0
-        curr_y = y
-        for node in row:
-            h = node.area / row_width if row_width > 0 else 0
-            node.rect = QRectF(x, curr_y, row_width, h)
-            curr_y += h
-            result.append(node)
+        heights = seg / row_width if row_width > 0 else np.zeros(len(seg))
+        offsets[0] = y
+        offsets[1:] = heights[:-1]
+        out[:, 0] = x
+        out[:, 1] = offsets.cumsum()
+        out[:, 2] = row_width
+        out[:, 3] = heights
+
+
+class _LayoutEntry:
+    __slots__ = ('geometry', 'ordered', 'quanta', 'order', 'areas', 'rects', 'rows')
+
+    def __init__(self, geometry, ordered, quanta, order, areas, rects, rows):
+        self.geometry = geometry
+        self.ordered = ordered
+        self.quanta = quanta    # 降序排列后的量化份额
+        self.order = order      # 布局顺序 -> 输入中的下标
+        self.areas = areas
+        self.rects = rects
+        self.rows = rows        # [(行起点, 行终点, x, y, width, height), ...]
+
+
+class LayoutCache:
+    """
+    squarify 结果的 LRU 缓存，以 (量化后的数值向量, 布局区域) 为键。
+    - 数值先按 resolution 份量化 (最大余数法，份额之和恒等于 resolution)，进程内存的微小抖动不会改变键，
+      命中时直接复用缓存的矩形。
+    - 未命中但同一区域上一次的布局仍在时走增量路径：比较降序后的份额，第一个变化元素之前已经确定的行
+      原样复用，只从受影响的行开始重新布局。
+    - 只要某个分组的数值不变，它就会命中，因此一个分组的变化只会让这个分组重排。
+    """
+
+    def __init__(self, maxsize=128, resolution=1 << 16):
+        self.maxsize = maxsize
+        self.resolution = resolution
+        self._entries = OrderedDict()   # (geometry, n, quanta bytes) -> _LayoutEntry
+        self._recent = OrderedDict()    # geometry -> 最近一次在该区域上的 _LayoutEntry
+        self.hits = 0
+        self.misses = 0
+        self.partial = 0
+        self.evictions = 0
+
+    def layout(self, items, x, y, width, height, ordered=False):
+        """
+        与 squarify_layout 相同的接口与返回值。
+        :param ordered: 保持 items 的给定顺序 (稳定布局模式)，不按面积排序
+        """
+        if not items or width <= 0 or height <= 0:
+            return []
+        values = _item_values(items)
+        valid = np.flatnonzero(values > 0)
+        if valid.size == 0:
+            return []
+        values = values[valid]
+        quanta = self._quantize(values)
+        geometry = (x, y, width, height)
+        key = (geometry, ordered, len(quanta), quanta.tobytes())
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            entry = self._build(quanta, geometry, ordered)
+            self._store(self._entries, key, entry, count=True)
+        self._store(self._recent, geometry, entry)
+
+        return _attach_layout(items, valid[entry.order], entry.rects, entry.areas)
+
+    def _quantize(self, values):
+        shares = values * (self.resolution / values.sum())
+        quanta = np.floor(shares).astype(np.int64)
+        remainder = self.resolution - int(quanta.sum())
+        if remainder > 0:
+            # 余下的份额分给小数部分最大的几项
+            quanta[np.argsort(quanta - shares, kind='stable')[:remainder]] += 1
+        return quanta
+
+    def _build(self, quanta, geometry, ordered):
+        x, y, width, height = geometry
+        order = np.arange(len(quanta)) if ordered else np.argsort(-quanta, kind='stable')
+        sorted_quanta = quanta[order]
+        areas = sorted_quanta * (width * height / self.resolution)
+
+        prev = self._recent.get(geometry)
+        if prev is not None and prev.ordered == ordered and len(prev.quanta) == len(sorted_quanta):
+            diff = np.flatnonzero(prev.quanta != sorted_quanta)
+            first = int(diff[0]) if diff.size else len(sorted_quanta)
+            # 行 [s, e) 的划分只取决于 areas[s..e]，这些元素都没变的行可以原样保留
+            keep = 0
+            while keep < len(prev.rows) and prev.rows[keep][1] < first:
+                keep += 1
+            if keep:
+                self.partial += 1
+                rows = prev.rows[:keep]
+                # 最后一行的终点是 n，不可能被保留，所以 prev.rows[keep] 一定存在
+                start, _, rx, ry, rw, rh = prev.rows[keep]
+                rects = prev.rects.copy()
+                squarify_rects(areas, rx, ry, rw, rh, rects=rects, rows=rows, start=start, ordered=ordered)
+                return _LayoutEntry(geometry, ordered, sorted_quanta, order, areas, rects, rows)
+
+        self.misses += 1
+        rows = []
+        rects = squarify_rects(areas, x, y, width, height, rows=rows, ordered=ordered)
+        return _LayoutEntry(geometry, ordered, sorted_quanta, order, areas, rects, rows)
+
+    def _store(self, table, key, entry, count=False):
+        table[key] = entry
+        table.move_to_end(key)
+        while len(table) > self.maxsize:
+            table.popitem(last=False)
+            if count:
+                self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._recent.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.partial
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'partial': self.partial,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class HitGrid:
+    """
+    布局完成后建立的均匀网格空间索引，用于命中测试。
+    每个矩形登记到它覆盖的所有格子里，查询时只检查坐标所在格子的候选项，
+    返回包含该点的最深层项目 (同一深度取登记顺序靠前的)，与逐个分组、逐个子项扫描的结果一致。
+    """
+
+    def __init__(self, width, height, count):
+        # 格子边长按 "平均每格约一个矩形" 估算
+        self.cell = max(8.0, math.sqrt(max(1.0, width * height) / max(1, count)))
+        self.cols = max(1, math.ceil(width / self.cell))
+        self.rows = max(1, math.ceil(height / self.cell))
+        self.cells = [[] for _ in range(self.cols * self.rows)]
+
+    @classmethod
+    def build(cls, roots, width, height):
+        """按层级广度优先登记所有有面积的项目"""
+        levels = []
+        level = [i for i in roots if i.w > 0 and i.h > 0]
+        while level:
+            levels.append(level)
+            level = [c for i in level for c in i.children if c.w > 0 and c.h > 0]
+        grid = cls(width, height, sum(len(l) for l in levels))
+        for depth, level in enumerate(levels):
+            for item in level:
+                grid.insert(item, depth)
+        return grid
+
+    def _col(self, x):
+        return min(self.cols - 1, max(0, int(x // self.cell)))
+
+    def _row(self, y):
+        return min(self.rows - 1, max(0, int(y // self.cell)))
+
+    def insert(self, item, depth):
+        x0, y0 = item.x, item.y
+        x1, y1 = x0 + item.w, y0 + item.h
+        entry = (depth, x0, y0, x1, y1, item)
+        cols, cells = self.cols, self.cells
+        for row in range(self._row(y0), self._row(y1) + 1):
+            base = row * cols
+            for col in range(self._col(x0), self._col(x1) + 1):
+                cells[base + col].append(entry)
 
+    def item_at(self, x, y):
+        best, best_depth = None, -1
+        for depth, x0, y0, x1, y1, item in self.cells[self._row(y) * self.cols + self._col(x)]:
+            if depth > best_depth and x0 <= x <= x1 and y0 <= y <= y1:
+                best, best_depth = item, depth
+        return best
@@ -0,0 +1,528 @@
+import os
+import sys
+import errno
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import psutil
+
+# 不参与释放的系统关键进程 (小写)：换出后会造成界面卡顿、音频爆音等
+PROTECTED_NAMES = frozenset({
+    'system', 'registry', 'memcompression', 'memory compression', 'csrss.exe', 'wininit.exe',
+    'winlogon.exe', 'smss.exe', 'lsass.exe', 'services.exe', 'dwm.exe', 'audiodg.exe',
+    'systemd', 'kthreadd', 'xorg', 'xwayland', 'gnome-shell', 'kwin_x11', 'kwin_wayland',
+    'pipewire', 'pulseaudio',
+})
+
+# 工作集小于此值的进程不值得释放
+MIN_WORKING_SET = 32 * 1024 * 1024
+# CPU 时间在这段时间内没有增长才视为空闲 (秒)
+MIN_IDLE = 30.0
+# 每一轮最多考察的候选数 (按工作集从大到小截取，只对这些进程读取 CPU 时间)
+MAX_CANDIDATES = 48
+
+# 释放后观察多久再结算回填比例 (秒)
+OBSERVE_WINDOW = 30.0
+# 回填比例的指数滑动平均系数
+REFAULT_ALPHA = 0.3
+# 回填比例 (滑动平均) 超过此值、且至少观察过这么多次的程序不再释放
+REFAULT_LIMIT = 0.8
+REFAULT_MIN_SAMPLES = 2
+# 被跳过的程序过这么久 (秒) 后重新试一次，程序的行为可能已经变了
+REFAULT_RETRY = 3600.0
+
+
+class TrimBackend:
+    """
+    释放进程工作集的平台接口。调度逻辑只依赖这里，可以在任意平台上用假后端验证。
+    """
+    name = 'base'
+
+    def trim(self, pid):
+        """
+        释放一个进程的工作集。
+        :return: (释放前, 释放后) 的常驻字节数
+        :raises OSError / psutil.Error: 打不开进程或调用失败
+        """
+        raise NotImplementedError
+
+    def page_faults(self, pid):
+        """进程累计的缺页次数；平台不提供时返回 None"""
+        try:
+            return getattr(psutil.Process(pid).memory_info(), 'num_page_faults', None)
+        except (psutil.Error, OSError):
+            return None
+
+
+class WindowsTrimBackend(TrimBackend):
+    """EmptyWorkingSet；只申请该调用需要的最小权限，不再使用 PROCESS_ALL_ACCESS"""
+    name = 'windows'
+
+    PROCESS_SET_QUOTA = 0x0100
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        self._ctypes = ctypes
+        self._counters = PROCESS_MEMORY_COUNTERS
+        self._kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._psapi = ctypes.WinDLL('psapi', use_last_error=True)
+        self._kernel32.OpenProcess.restype = wintypes.HANDLE
+        self._kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+        self._kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        self._psapi.EmptyWorkingSet.argtypes = (wintypes.HANDLE,)
+        self._psapi.GetProcessMemoryInfo.argtypes = (wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD)
+
+    def _working_set(self, handle):
+        counters = self._counters()
+        counters.cb = self._ctypes.sizeof(counters)
+        if not self._psapi.GetProcessMemoryInfo(handle, self._ctypes.byref(counters), counters.cb):
+            raise self._ctypes.WinError(self._ctypes.get_last_error())
+        return counters.WorkingSetSize
+
+    def page_faults(self, pid):
+        handle = self._kernel32.OpenProcess(self.PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            counters = self._counters()
+            counters.cb = self._ctypes.sizeof(counters)
+            if not self._psapi.GetProcessMemoryInfo(handle, self._ctypes.byref(counters), counters.cb):
+                return None
+            return counters.PageFaultCount
+        finally:
+            self._kernel32.CloseHandle(handle)
+
+    def trim(self, pid):
+        handle = self._kernel32.OpenProcess(self.PROCESS_SET_QUOTA | self.PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            raise self._ctypes.WinError(self._ctypes.get_last_error())
+        try:
+            before = self._working_set(handle)
+            if not self._psapi.EmptyWorkingSet(handle):
+                raise self._ctypes.WinError(self._ctypes.get_last_error())
+            return before, self._working_set(handle)
+        finally:
+            self._kernel32.CloseHandle(handle)
+
+
+class LinuxPageoutBackend(TrimBackend):
+    """
+    Linux 上与 EmptyWorkingSet 最接近的操作：process_madvise(MADV_PAGEOUT)，
+    把目标进程的私有映射换出 (内核 5.10+，需要 CAP_SYS_NICE 与 ptrace 权限)。
+    """
+    name = 'linux'
+
+    _SYS_PIDFD_OPEN = 434
+    _SYS_PROCESS_MADVISE = 440
+    _MADV_PAGEOUT = 21
+    _IOV_BATCH = 512
+
+    def __init__(self, proc_root='/proc'):
+        import ctypes
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._libc.syscall.restype = ctypes.c_long
+
+        class iovec(ctypes.Structure):
+            _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+        self._iovec = iovec
+        self.proc_root = proc_root
+        self._page = os.sysconf('SC_PAGE_SIZE')
+
+    def _rss(self, pid):
+        with open(f'{self.proc_root}/{pid}/statm', 'rb') as f:
+            return int(f.read().split()[1]) * self._page
+
+    def page_faults(self, pid):
+        """/proc/<pid>/stat 中的 minflt + majflt"""
+        try:
+            with open(f'{self.proc_root}/{pid}/stat', 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        # 进程名可能含空格，从最后一个 ')' 之后开始按字段解析
+        fields = data[data.rfind(b')') + 2:].split()
+        return int(fields[7]) + int(fields[9])
+
+    def _ranges(self, pid):
+        ranges = []
+        with open(f'{self.proc_root}/{pid}/maps', 'rb') as f:
+            for line in f:
+                fields = line.split(None, 5)
+                perms = fields[1]
+                # 只换出可读的私有映射；[vsyscall] 等特殊区域会让整个调用失败
+                if perms[0:1] != b'r' or perms[3:4] != b'p':
+                    continue
+                if len(fields) > 5 and fields[5].startswith(b'[v'):
+                    continue
+                start, _, end = fields[0].partition(b'-')
+                start, end = int(start, 16), int(end, 16)
+                ranges.append((start, end - start))
+        return ranges
+
+    def trim(self, pid):
+        ctypes = self._ctypes
+        syscall = self._libc.syscall
+        before = self._rss(pid)
+        pidfd = syscall(self._SYS_PIDFD_OPEN, ctypes.c_int(pid), ctypes.c_uint(0))
+        if pidfd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        try:
+            ranges = self._ranges(pid)
+            advised = False
+            for i in range(0, len(ranges), self._IOV_BATCH):
+                batch = ranges[i:i + self._IOV_BATCH]
+                vec = (self._iovec * len(batch))(*batch)
+                if syscall(self._SYS_PROCESS_MADVISE, ctypes.c_int(pidfd), vec, ctypes.c_size_t(len(batch)),
+                           ctypes.c_int(self._MADV_PAGEOUT), ctypes.c_uint(0)) >= 0:
+                    advised = True
+                elif not advised and ctypes.get_errno() in (errno.EPERM, errno.ENOSYS):
+                    # 没有权限或内核不支持，后面的批次也不会成功
+                    err = ctypes.get_errno()
+                    raise OSError(err, os.strerror(err))
+        finally:
+            os.close(pidfd)
+        return before, self._rss(pid)
+
+
+def create_trim_backend(platform=None):
+    """按平台创建释放后端；不支持的平台返回 None"""
+    platform = platform or sys.platform
+    try:
+        if platform == 'win32':
+            return WindowsTrimBackend()
+        if platform.startswith('linux'):
+            return LinuxPageoutBackend()
+    except (OSError, AttributeError):
+        pass
+    return None
+
+
+class TrimResult:
+    __slots__ = ('pid', 'key', 'name', 'before', 'after', 'faults', 'error')
+
+    def __init__(self, pid, name, before=0, after=0, error=None, key=None, faults=None):
+        self.pid = pid
+        self.key = key
+        self.name = name
+        self.before = before
+        self.after = after
+        self.faults = faults       # 释放完成时的累计缺页次数
+        self.error = error
+
+    @property
+    def reclaimed(self):
+        return max(0, self.before - self.after)
+
+
+class TrimReport:
+    """一轮释放的结果"""
+
+    def __init__(self, started):
+        self.started = started
+        self.elapsed = 0.0
+        self.results = []          # [TrimResult]
+        self.skipped = 0           # 被规则排除的进程数
+        self.deferred = 0          # 超出时间预算、留到下一轮的候选数
+
+    @property
+    def reclaimed(self):
+        return sum(r.reclaimed for r in self.results)
+
+    @property
+    def failures(self):
+        return sum(1 for r in self.results if r.error is not None)
+
+    def summary(self):
+        return (f"Trimmed {len(self.results) - self.failures}/{len(self.results)} process(es), "
+                f"reclaimed {self.reclaimed / 1024 / 1024:.1f} MB in {self.elapsed * 1000:.0f} ms "
+                f"(skipped {self.skipped}, deferred {self.deferred})")
+
+
+class RefaultStats:
+    """单个程序 (按进程名) 的释放效果"""
+    __slots__ = ('name', 'ratio', 'samples', 'reclaimed', 'refilled', 'faults', 'last_seen')
+
+    def __init__(self, name):
+        self.name = name
+        self.ratio = 0.0           # 回填比例的滑动平均：0 = 释放的内存没有被读回，1 = 全部读回
+        self.samples = 0
+        self.reclaimed = 0         # 累计释放字节数
+        self.refilled = 0          # 其中在观察窗口内又被读回的字节数
+        self.faults = 0            # 观察窗口内的累计缺页次数
+        self.last_seen = 0.0
+
+    def should_skip(self, now):
+        return (self.samples >= REFAULT_MIN_SAMPLES and self.ratio >= REFAULT_LIMIT
+                and now - self.last_seen < REFAULT_RETRY)
+
+
+class RefaultTracker:
+    """
+    跟踪释放之后的回填：记录每个被释放进程释放前后的常驻内存与缺页计数，
+    在之后的 tick 中观察，窗口结束时结算 "回填字节 / 释放字节"，按程序名做指数滑动平均。
+    释放后立刻读回的程序 (回填比例高) 释放只会带来额外的缺页开销，之后不再释放。
+    """
+
+    def __init__(self, window=OBSERVE_WINDOW, alpha=REFAULT_ALPHA):
+        self.window = window
+        self.alpha = alpha
+        self._pending = {}         # (pid, create_time) -> [TrimResult, 释放时间]
+        self._stats = {}           # 进程名 (小写) -> RefaultStats
+        self._lock = threading.Lock()
+
+    def track(self, result, now=None):
+        if result.error is not None or result.reclaimed <= 0 or result.key is None:
+            return
+        with self._lock:
+            self._pending[result.key] = [result, time.time() if now is None else now]
+
+    def observe(self, records, page_faults=None, now=None):
+        """
+        每个 tick 调用一次，结算观察窗口已经结束的进程。
+        :param records: {pid: ProcessRecord}
+        :param page_faults: pid -> 累计缺页次数 的函数 (可选)
+        """
+        if not self._pending:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            due = [(key, entry) for key, entry in self._pending.items() if now - entry[1] >= self.window]
+            for key, _ in due:
+                del self._pending[key]
+            # 已经退出的进程无法结算，直接丢弃
+            for key in [k for k in self._pending if k[0] not in records]:
+                del self._pending[key]
+        for key, (result, _) in due:
+            record = records.get(key[0])
+            if record is None or record.key != key:
+                continue
+            faults = page_faults(record.pid) if page_faults is not None else None
+            fault_delta = faults - result.faults if faults is not None and result.faults is not None else 0
+            self._settle(result, record.rss, max(0, fault_delta), now)
+
+    def _settle(self, result, rss_now, fault_delta, now):
+        reclaimed = result.reclaimed
+        refilled = min(reclaimed, max(0, rss_now - result.after))
+        ratio = refilled / reclaimed
+        name = (result.name or '').lower()
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = RefaultStats(result.name)
+                stats.ratio = ratio
+            else:
+                stats.ratio = self.alpha * ratio + (1 - self.alpha) * stats.ratio
+            stats.samples += 1
+            stats.reclaimed += reclaimed
+            stats.refilled += refilled
+            stats.faults += fault_delta
+            stats.last_seen = now
+
+    def should_skip(self, name, now=None):
+        stats = self._stats.get((name or '').lower())
+        return stats is not None and stats.should_skip(time.time() if now is None else now)
+
+    def stats(self):
+        """按累计释放量从大到小排列的 [RefaultStats]"""
+        with self._lock:
+            return sorted(self._stats.values(), key=lambda s: s.reclaimed, reverse=True)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+
+class WorkingSetTrimmer:
+    """
+    有选择的工作集释放。
+    - 候选按 "工作集 × 空闲时间" 排序：大而久未活动的进程优先，正在忙的进程释放后会马上缺页读回；
+    - 跳过前台进程、正在使用显存的进程 (游戏 / 3D 应用)、系统关键进程、用户排除列表与本程序自身；
+    - 释放效果由 RefaultTracker 在之后的 tick 中观察，释放后马上读回的程序不再释放；
+    - 在有界线程池中并行调用后端，每轮有时间预算，超出预算的候选留到下一轮；
+    - 整轮在后台线程中进行，不阻塞数据采集。
+    """
+
+    def __init__(self, backend=None, max_workers=4, budget_ms=500.0,
+                 min_working_set=MIN_WORKING_SET, min_idle=MIN_IDLE, max_candidates=MAX_CANDIDATES):
+        self.backend = backend if backend is not None else create_trim_backend()
+        self.max_workers = max_workers
+        self.budget = budget_ms / 1000.0
+        self.min_working_set = min_working_set
+        self.min_idle = min_idle
+        self.max_candidates = max_candidates
+        self._pool = None
+        self._thread = None
+        # (pid, create_time) -> (CPU 时间, 最后一次观察到 CPU 时间增长的时刻)
+        self._activity = {}
+        self.last_report = None
+        self.total_reclaimed = 0
+        self.passes = 0
+        self.tracker = RefaultTracker()
+
+    @property
+    def supported(self):
+        return self.backend is not None
+
+    @property
+    def busy(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, records, exclude=(), skip_pids=()):
+        """
+        在后台开始一轮释放；上一轮还没结束时忽略本次请求。
+        :param records: 本 tick 存活的 ProcessRecord
+        :param exclude: 用户排除的程序 (路径或文件名)
+        :param skip_pids: 额外跳过的 PID (前台、使用显存的进程等)
+        :return: 是否开始了新的一轮
+        """
+        if not self.supported or self.busy:
+            return False
+        records = list(records)
+        self._thread = threading.Thread(target=self._run, args=(records, exclude, set(skip_pids)),
+                                        name='WorkingSetTrimmer', daemon=True)
+        self._thread.start()
+        return True
+
+    def run_pass(self, records, exclude=(), skip_pids=()):
+        """同步执行一轮，返回 TrimReport"""
+        report = TrimReport(time.time())
+        begin = time.perf_counter()
+        candidates = self.rank(records, exclude, set(skip_pids), report)
+        if candidates:
+            self._trim_all(candidates, begin, report)
+        report.elapsed = time.perf_counter() - begin
+        for result in report.results:
+            self.tracker.track(result)
+        self.total_reclaimed += report.reclaimed
+        self.passes += 1
+        self.last_report = report
+        return report
+
+    def observe(self, records):
+        """
+        每个 tick 由 worker 调用：结算释放后的回填情况，并记录大进程的 CPU 活动。
+        空闲时间在平时就开始累计，开启自动释放后的第一轮即可按空闲时间挑选候选。
+        :param records: {pid: ProcessRecord}
+        """
+        if not self.supported:
+            return
+        self.tracker.observe(records, self.backend.page_faults)
+        now = time.time()
+        alive = {r.key for r in records.values()}
+        if len(self._activity) > len(alive):
+            self._activity = {k: v for k, v in self._activity.items() if k in alive}
+        large = [r for r in records.values() if r.rss >= self.min_working_set]
+        large.sort(key=lambda r: r.rss, reverse=True)
+        for record in large[:self.max_candidates]:
+            self._idle_seconds(record, now)
+
+    def _run(self, records, exclude, skip_pids):
+        try:
+            report = self.run_pass(records, exclude, skip_pids)
+            if report.results:
+                print(report.summary())
+        except Exception as e:
+            print(f"Trimmer Error: {e}")
+
+    # ---------------- 候选排序 ----------------
+    def _skipped(self, record, exclude, skip_pids):
+        if record.pid in skip_pids or record.pid == os.getpid() or record.pid <= 4:
+            return True
+        name = (record.name or '').lower()
+        return name in PROTECTED_NAMES or name in exclude or self.tracker.should_skip(name)
+
+    def _idle_seconds(self, record, now):
+        """距离上次观察到 CPU 时间增长的秒数；第一次见到的进程返回 0"""
+        try:
+            times = (record.handle or psutil.Process(record.pid)).cpu_times()
+        except (psutil.Error, OSError):
+            return None
+        cpu = times.user + times.system
+        previous = self._activity.get(record.key)
+        if previous is None or cpu > previous[0] + 0.01:
+            self._activity[record.key] = (cpu, now)
+            return 0.0
+        return now - previous[1]
+
+    def rank(self, records, exclude=(), skip_pids=(), report=None):
+        """
+        :return: 按 "工作集 × 空闲时间" 从高到低排序的 [(record, idle)]
+        """
+        exclude = {str(e).lower() for e in exclude}
+        # 排除列表里可能是完整路径，统一按文件名比较 (兼容两种路径分隔符)
+        exclude |= {e.replace('\\', '/').rsplit('/', 1)[-1] for e in exclude}
+        now = time.time()
+        large = []
+        skipped = 0
+        for record in records:
+            if record.rss < self.min_working_set:
+                continue
+            if self._skipped(record, exclude, skip_pids):
+                skipped += 1
+                continue
+            large.append(record)
+        large.sort(key=lambda r: r.rss, reverse=True)
+        large = large[:self.max_candidates]
+
+        ranked = []
+        for record in large:
+            idle = self._idle_seconds(record, now)
+            if idle is None:
+                continue
+            if idle < self.min_idle:
+                skipped += 1
+                continue
+            ranked.append((record, idle))
+        ranked.sort(key=lambda c: c[0].rss * c[1], reverse=True)
+        if report is not None:
+            report.skipped = skipped
+        return ranked
+
+    # ---------------- 并行释放 ----------------
+    def _trim_one(self, record):
+        try:
+            before, after = self.backend.trim(record.pid)
+        except (psutil.Error, OSError) as e:
+            return TrimResult(record.pid, record.name, error=e, key=record.key)
+        return TrimResult(record.pid, record.name, before, after, key=record.key,
+                          faults=self.backend.page_faults(record.pid))
+
+    def _trim_all(self, candidates, begin, report):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='Trim')
+        pending = {self._pool.submit(self._trim_one, record) for record, _ in candidates}
+        while pending:
+            remaining = self.budget - (time.perf_counter() - begin)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            report.results.extend(f.result() for f in done)
+        # 预算用完：还没开始的候选取消，已经在执行的调用无法中断，等它们完成后计入结果
+        running = [f for f in pending if not f.cancel()]
+        report.deferred = len(pending) - len(running)
+        if running:
+            report.results.extend(f.result() for f in running)
+
+
+_trimmer = None
+
+def get_trimmer():
+    """进程级共享的工作集释放器"""
+    global _trimmer
+    if _trimmer is None:
+        _trimmer = WorkingSetTrimmer()
+    return _trimmer
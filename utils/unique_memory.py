@@ -0,0 +1,167 @@
+import os
+import time
+import threading
+
+import numpy as np
+import psutil
+
+# 从未采样过的进程按这个"陈旧秒数"参与排序，保证新进程尽快拿到第一次采样
+_UNSAMPLED_AGE = 3600.0
+
+
+def read_smaps_rollup(pid, proc_root='/proc'):
+    """
+    解析 /proc/<pid>/smaps_rollup (内核已汇总好的单条记录，比逐段 smaps 便宜得多)。
+    :return: (uss, pss, swap) 字节
+    """
+    with open(f'{proc_root}/{pid}/smaps_rollup', 'rb') as f:
+        data = f.read()
+    uss = pss = swap = 0
+    for line in data.split(b'\n'):
+        key, _, rest = line.partition(b':')
+        if key == b'Pss':
+            pss = int(rest.split()[0]) * 1024
+        elif key in (b'Private_Clean', b'Private_Dirty'):
+            uss += int(rest.split()[0]) * 1024
+        elif key == b'Swap':
+            swap = int(rest.split()[0]) * 1024
+    return uss, pss, swap
+
+
+def read_full_info(pid):
+    """psutil 后备路径；Windows 没有 PSS，以 USS 代替"""
+    info = psutil.Process(pid).memory_full_info()
+    uss = info.uss
+    return uss, getattr(info, 'pss', uss), getattr(info, 'swap', 0)
+
+
+class UniqueMemorySampler:
+    """
+    USS / PSS 的后台采样器。
+    这两个值需要遍历进程的页表，代价比 RSS 高几个数量级，因此不在采集线程里同步读取：
+    - 每个 tick 由 worker 提交一次候选 (进程键与当前大小)，唤醒后台线程；
+    - 后台线程按 "大小 × 距上次采样的时间" 排序，大进程刷新得最频繁；
+    - 每个 tick 消耗的线程 CPU 时间不超过预算，剩下的进程留到下一个 tick；
+    - 树图读取时使用缓存值，还没有采样到的进程沿用 RSS。
+    """
+
+    def __init__(self, budget_ms=20.0, proc_root='/proc'):
+        self.budget = budget_ms / 1000.0
+        self.proc_root = proc_root
+        self._rollup = os.path.exists(f'{proc_root}/self/smaps_rollup')
+        self._values = {}          # (pid, create_time) -> (uss, pss, swap, 采样时间)
+        self._failed = {}          # (pid, create_time) -> 上次读取失败的时间 (无权限等)
+        self._candidates = []      # [(key, pid, size)]
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        # 统计
+        self.samples = 0
+        self.failures = 0
+        self.last_cost = 0.0
+
+    def submit(self, records, budget_ms=None):
+        """
+        :param records: 本 tick 存活的 ProcessRecord
+        :param budget_ms: 每个 tick 的 CPU 时间预算 (毫秒)
+        """
+        if budget_ms is not None:
+            self.budget = max(1.0, float(budget_ms)) / 1000.0
+        candidates = [(r.key, r.pid, r.private) for r in records if r.private > 0]
+        alive = {c[0] for c in candidates}
+        with self._lock:
+            self._candidates = candidates
+            # 已经退出的进程不再保留缓存
+            if len(self._values) > len(alive):
+                self._values = {k: v for k, v in self._values.items() if k in alive}
+            if self._failed:
+                self._failed = {k: v for k, v in self._failed.items() if k in alive}
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='UniqueMemorySampler', daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+
+    def column(self, records, metric, fallback):
+        """
+        :param records: 与 fallback 同顺序的 ProcessRecord
+        :param metric: 'uss' 或 'pss'
+        :param fallback: 未采样进程使用的数组 (通常是 RSS 列)
+        :return: int64 数组
+        """
+        index = 0 if metric == 'uss' else 1
+        # submit() 会整体替换字典、后台线程会插入新值，在锁内取一份快照
+        with self._lock:
+            values = dict(self._values)
+        result = np.array(fallback, dtype=np.int64, copy=True)
+        for row, record in enumerate(records):
+            cached = values.get(record.key)
+            if cached is not None:
+                result[row] = cached[index]
+        return result
+
+    def get(self, key):
+        """(uss, pss, swap, 采样时间)；未采样时为 None"""
+        with self._lock:
+            return self._values.get(key)
+
+    def stats(self):
+        return {'cached': len(self._values), 'samples': self.samples,
+                'failures': self.failures, 'last_cost_ms': self.last_cost * 1000.0}
+
+    # ---------------- 后台线程 ----------------
+    def _read(self, pid):
+        if self._rollup:
+            try:
+                return read_smaps_rollup(pid, self.proc_root)
+            except PermissionError:
+                pass
+        return read_full_info(pid)
+
+    def _ranked(self):
+        now = time.time()
+        with self._lock:
+            values, failed = dict(self._values), dict(self._failed)
+            candidates = self._candidates
+        def priority(candidate):
+            key = candidate[0]
+            cached = values.get(key)
+            if cached is not None:
+                age = now - cached[3]
+            elif key in failed:
+                # 读不了的进程按失败时间排队，不会每个 tick 都占用预算
+                age = now - failed[key]
+            else:
+                age = _UNSAMPLED_AGE
+            return candidate[2] * age
+        return sorted(candidates, key=priority, reverse=True)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            start = time.thread_time()
+            for key, pid, _ in self._ranked():
+                try:
+                    uss, pss, swap = self._read(pid)
+                except (psutil.Error, OSError, ValueError, IndexError):
+                    with self._lock:
+                        self._failed[key] = time.time()
+                    self.failures += 1
+                else:
+                    with self._lock:
+                        self._values[key] = (uss, pss, swap, time.time())
+                    self.samples += 1
+                # 预算用完，剩下的留到下一个 tick (至少完成一次采样)
+                if time.thread_time() - start >= self.budget:
+                    break
+            self.last_cost = time.thread_time() - start
+
+
+_sampler = None
+
+def get_unique_sampler():
+    """进程级共享的 USS / PSS 采样器"""
+    global _sampler
+    if _sampler is None:
+        _sampler = UniqueMemorySampler()
+    return _sampler
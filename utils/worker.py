@@ -1,79 +1,245 @@
-import sys
-import psutil
 import time
-import ctypes
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PyQt6.QtCore import QObject, pyqtSignal
-from .data_provider import get_memory_data, GPUMonitor
+from .data_provider import build_memory_items, build_gpu_items, GPUMonitor
+from .snapshot import collect_system_snapshot
+from .history import get_history_store
+from .recorder import SnapshotRecorder, flatten_items
+from .trimmer import get_trimmer
+from .system_utils import get_foreground_pid
+from config import RECORDINGS_DIR
+
+# 影响输出内容的设置；采集过程中这些设置变化时，正在进行的 tick 作废并立即按新设置重来
+_OUTPUT_KEYS = ('lang', 'show_free', 'show_gpu_free', 'show_gpu_used', 'view_mode', 'memory_metric')
 
 class DataWorker(QObject):
+    """
+    采集流水线：worker 线程上运行一个 asyncio 事件循环，每个 tick 是一个可取消的任务。
+    - 内存阶段 (进程快照 + 树图项目) 与 GPU 数据源 (nvidia-smi / WMI 等子进程) 并发执行，
+      阻塞调用都在各自的执行器线程中，事件循环本身从不等待子进程；
+    - 内存结果先发给界面 (沿用上一次的 GPU 块)，GPU 数据到达后再发送完整结果；
+    - 采集期间收到的请求不再丢弃，而是合并为一次：当前 tick 结束后按最新设置再采集一次；
+      影响输出的设置变化时取消当前 tick。
+    """
     data_ready = pyqtSignal(list, dict) # 发送 (root_items, vm_info)
-    finished = pyqtSignal()
 
     def __init__(self):
         super().__init__()
-        self._is_running = True
-        self.is_busy = False
+        self.loop = None
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._pending = None          # 尚未处理的最新请求 (设置副本)
+        self._task = None
+        self._task_signature = None
+        # 内存阶段依赖快照引擎与进程树的状态，必须串行；GPU 数据源单独一个线程，与之并行
+        self._memory_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='collect-memory')
+        self._gpu_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='collect-gpu')
+        # 上一次完整结果中的 GPU 块，内存先行发送时沿用
+        self._gpu_items = []
+        self._gpu_percent = 0
+        self._gpu_signature = None
         self.last_optimize_time = 0
+        # 工作集释放在释放器自己的线程池中进行，不阻塞下一次采集
+        self.trimmer = get_trimmer()
+        # 每个 tick 的进程 / 程序组内存写入历史存储，供回看内存增长趋势
+        self.history = get_history_store()
+        # 快照录制 (设置中开启时创建)，写盘在录制器自己的线程中进行
+        self.recorder = None
 
-    def fetch_data(self, settings):
-        """执行耗时的 I/O 操作"""
-        if self.is_busy:
-            return
-        
-        # 进一步优化：如果开启了全屏游戏，则极大幅度降低采集频率
-        # 这里虽然没有自动检测，但我们可以通过 worker 的忙碌状态和 nice 值配合
-        self.is_busy = True
+    # ---------------- 线程与事件循环 ----------------
+    def run(self):
+        """worker 线程的入口 (连接到 QThread.started)：运行事件循环直到 stop()"""
+        with self._lock:
+            if self._stopped:
+                return
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self.loop = loop
+        # 线程启动前已经到达的请求
+        loop.call_soon(self._kick)
         try:
-            lang = settings['lang']
-            show_free = settings['show_free']
-            show_gpu_free = settings.get('show_gpu_free', True)
-            show_gpu_used = settings.get('show_gpu_used', True)
-            view_mode = settings.get('view_mode', 'process')
-            auto_optimize = settings.get('auto_optimize', False)
-            opt_interval = settings.get('optimize_interval', 30000) / 1000.0
-            is_silent = settings.get('_is_silent_mode', False)
-            
-            # 如果开启了自动优化，且达到了间隔时间，则执行
-            current_time = time.time()
-            if auto_optimize and (current_time - self.last_optimize_time >= opt_interval):
-                self.optimize_memory()
-                self.last_optimize_time = current_time
-
-            root_items, gpu_percent = get_memory_data(show_free, show_gpu_free, show_gpu_used, lang, view_mode, is_silent)
-            
-            vm = psutil.virtual_memory()
-            swap = psutil.swap_memory()
-            vm_info = {
-                'used': vm.used,
-                'total': vm.total,
-                'percent': vm.percent,
-                'v_used': swap.used,
-                'v_total': swap.total,
-                'sw_used': max(0, swap.used - vm.used),
-                'sw_total': max(0, swap.total - vm.total),
-                'gpu_percent': gpu_percent,
-                'pids': len(psutil.pids())
-            }
-            
-            self.data_ready.emit(root_items, vm_info)
-        except Exception as e:
-            print(f"Worker Error: {e}")
+            loop.run_forever()
         finally:
-            self.is_busy = False
-            self.finished.emit()
-
-    def optimize_memory(self):
-        """调用 Windows API 释放进程工作集内存"""
-        if sys.platform != 'win32': return
-        
-        # 遍历所有进程并尝试 EmptyWorkingSet
-        # 需要管理员权限才能处理所有进程，否则只能处理当前权限下的进程
-        for proc in psutil.process_iter(['pid']):
+            with self._lock:
+                self.loop = None
+            # 取消的 tick 不会打断执行器中正在运行的采集 / 录制，等它们结束后再关闭录制器
+            self._memory_executor.shutdown(wait=True, cancel_futures=True)
+            self._gpu_executor.shutdown(wait=True, cancel_futures=True)
+            if self.recorder is not None:
+                self.recorder.close()
+                self.recorder = None
+            loop.close()
+
+    def stop(self):
+        """可在任意线程调用：取消当前 tick，等它退出后结束事件循环"""
+        with self._lock:
+            self._stopped = True
+            loop = self.loop
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop)
+
+    async def _shutdown(self):
+        task = self._task
+        if task is not None and not task.done():
+            task.cancel()
             try:
-                handle = ctypes.windll.kernel32.OpenProcess(0x001F0FFF, False, proc.info['pid'])
-                if handle:
-                    ctypes.windll.psapi.EmptyWorkingSet(handle)
-                    ctypes.windll.kernel32.CloseHandle(handle)
-            except:
-                continue
+                await task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                print(f"Worker Error: {e}")
+        self.loop.stop()
+
+    def fetch_data(self, settings):
+        """
+        请求一次采集 (可在界面线程直接调用，不会阻塞)。
+        只保存最新的设置并唤醒事件循环，连续的请求自然合并为一次。
+        """
+        with self._lock:
+            self._pending = dict(settings)
+            loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._kick)
+
+    @staticmethod
+    def _signature(settings):
+        return tuple(settings.get(key) for key in _OUTPUT_KEYS)
+
+    def _kick(self):
+        with self._lock:
+            settings = self._pending
+            if settings is None or self._stopped:
+                return
+            signature = self._signature(settings)
+            if self._task is not None and not self._task.done():
+                if signature == self._task_signature:
+                    # 合并：当前 tick 结束后 (_on_tick_done) 按最新设置再采集一次
+                    return
+                # 设置变了：正在进行的 tick 的结果已经过时
+                self._task.cancel()
+            self._pending = None
+        self._task_signature = signature
+        self._task = self.loop.create_task(self._tick(settings))
+        self._task.add_done_callback(self._on_tick_done)
+
+    def _on_tick_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Worker Error: {task.exception()}")
+        if task is self._task:
+            self._kick()
+
+    # ---------------- 一次采集 ----------------
+    async def _tick(self, settings):
+        loop = asyncio.get_running_loop()
+        show_gpu = settings.get('show_gpu_free', True) or settings.get('show_gpu_used', True)
+        signature = self._signature(settings)
+        if signature != self._gpu_signature:
+            # 语言 / 视图等变化后，上一次的 GPU 块不能再沿用
+            self._gpu_items, self._gpu_percent = [], 0
+        # GPU 数据源 (含子进程等待) 与进程采集同时开始
+        gpu_future = None
+        if show_gpu:
+            gpu_future = loop.run_in_executor(self._gpu_executor, GPUMonitor.get_gpu_info,
+                                              settings.get('_is_silent_mode', False))
+        try:
+            snapshot, memory_items, rows = await loop.run_in_executor(self._memory_executor, self._collect_memory, settings)
+            vm_info = self._vm_info(snapshot, self._gpu_percent)
+            if gpu_future is not None and not gpu_future.done():
+                # 1. 内存先行：界面不必等待较慢的显卡数据源
+                self.data_ready.emit(memory_items + self._gpu_items, dict(vm_info, partial=True))
+            gpu_list = []
+            if gpu_future is not None:
+                try:
+                    gpu_list = await gpu_future
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"GPU Data Error: {e}")
+        except asyncio.CancelledError:
+            if gpu_future is not None:
+                gpu_future.cancel()
+            raise
+
+        # 2. GPU 块 (进程名解析依赖快照，与内存阶段在同一线程中串行)
+        gpu_items, gpu_percent = await loop.run_in_executor(
+            self._memory_executor, build_gpu_items, gpu_list, snapshot,
+            settings.get('show_gpu_free', True), settings.get('show_gpu_used', True),
+            settings['lang'], settings.get('view_mode', 'process'))
+        self._gpu_items, self._gpu_percent, self._gpu_signature = gpu_items, gpu_percent, signature
+        root_items = memory_items + gpu_items
+        vm_info['gpu_percent'] = gpu_percent
+
+        # 3. 历史、录制与内存释放只处理完整结果
+        await loop.run_in_executor(self._memory_executor, self._record, snapshot, root_items, gpu_items, rows, vm_info, settings)
+        self.data_ready.emit(root_items, vm_info)
+
+    def _collect_memory(self, settings):
+        # 每个 tick 只采集一次，树图与状态栏统计共用同一份快照
+        snapshot = collect_system_snapshot()
+        items = build_memory_items(snapshot, settings['show_free'], settings['lang'], settings.get('view_mode', 'process'),
+                                   settings.get('memory_metric', 'private'), settings.get('sample_budget_ms', 20))
+        # 录制必须在项目交给界面之前展开：界面下钻时会给项目挂上按需生成的子项
+        self._update_recorder(settings)
+        rows = flatten_items(items) if self.recorder is not None else None
+        return snapshot, items, rows
+
+    @staticmethod
+    def _vm_info(snapshot, gpu_percent):
+        mem = snapshot.memory
+        return {
+            'used': mem['used'],
+            'total': mem['total'],
+            'percent': mem['percent'],
+            'v_used': snapshot.swap_used,
+            'v_total': snapshot.swap_total,
+            'sw_used': max(0, snapshot.swap_used - mem['used']),
+            'sw_total': max(0, snapshot.swap_total - mem['total']),
+            'gpu_percent': gpu_percent,
+            'pids': snapshot.pid_count
+        }
+
+    def _record(self, snapshot, root_items, gpu_items, rows, vm_info, settings):
+        self.history.record(snapshot.timestamp, snapshot.records, root_items)
+
+        # 结算之前释放过的进程的回填情况 (没有待观察的进程时几乎没有开销)
+        self.trimmer.observe(snapshot.records)
+
+        # 如果开启了自动优化，且达到了间隔时间，则在后台开始一轮释放
+        current_time = time.time()
+        opt_interval = settings.get('optimize_interval', 30000) / 1000.0
+        if settings.get('auto_optimize', False) and (current_time - self.last_optimize_time >= opt_interval):
+            self.optimize_memory(snapshot.records, root_items, settings)
+            self.last_optimize_time = current_time
+
+        # 内存部分已在先行发送前展开，这里接着展开 GPU 部分 (录制中途开启时本帧没有内存部分的行，跳过)
+        if self.recorder is not None and rows is not None:
+            self.recorder.record_rows(snapshot.timestamp, flatten_items(gpu_items, rows), vm_info)
+
+    def _update_recorder(self, settings):
+        enabled = settings.get('record_snapshots', False)
+        directory = settings.get('record_dir') or RECORDINGS_DIR
+        if self.recorder is not None and (not enabled or self.recorder.directory != directory):
+            self.recorder.close()
+            self.recorder = None
+        if enabled and self.recorder is None:
+            self.recorder = SnapshotRecorder(directory,
+                                             max_bytes=int(settings.get('record_max_mb', 64)) * 1024 * 1024,
+                                             max_files=int(settings.get('record_max_files', 8)))
+
+    def optimize_memory(self, records, root_items, settings):
+        """
+        释放空闲进程的工作集 (Windows: EmptyWorkingSet；Linux: MADV_PAGEOUT)。
+        跳过前台进程与正在使用显存的进程，候选排序与并行调用见 WorkingSetTrimmer。
+        """
+        skip = set()
+        fg_pid = get_foreground_pid()
+        if fg_pid: skip.add(fg_pid)
+        for root in root_items:
+            if root.type != 'gpu': continue
+            for item in root.children:
+                members = item.children if item.data.get('is_group') else [item]
+                skip.update(m.data['pid'] for m in members if m.data.get('pid') is not None)
+        self.trimmer.start(records.values(), settings.get('trim_exclude', []), skip)
 